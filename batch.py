@@ -0,0 +1,235 @@
+"""Headless batch rendering of sample review reports from CSV/Excel.
+
+    python batch.py reports.xlsx --out-dir reports/ --language zh --workers 8
+    python batch.py reports.xlsx --bundle reports.pdf --contents
+
+Each row is one report. Column headers are matched to the report fields
+after normalization, so "Style No.", "style_no" and "STYLE NO" all map to
+style_no and "Ball Girth First" maps to ball_girth_first. Optional
+pdf_language / selected_city columns (or "language" / "city") override the
+command-line defaults per row.
+
+Translations for every Chinese or Vietnamese row are deduplicated per
+language across the whole batch and sent through the shared translation cache before rendering. PDFs are
+then rendered in parallel by a process pool; --fast draws the values onto
+a precompiled page skeleton instead of laying out every report.
+
+--bundle writes all reports into one PDF instead, one after the other with
+continuous page numbers and an optional table of contents (--contents).
+Each report's pages need the page count of the ones before it, so bundles
+are rendered in order in this process; see pdf_bundle.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from pdf_bundle import ReportBundle
+from report import render_report_pdf
+from report_data import (
+    CHINESE_CITIES, REPORT_TEXT_FIELDS, PDF_DETERMINISTIC, PDF_FAST_RENDER, PDF_LANGUAGES, SOURCE_LANGUAGE,
+    get_report_texts, payload_from_mapping
+)
+from translation import Translator
+
+PAYLOAD_COLUMNS = REPORT_TEXT_FIELDS + ["purpose", "review_date", "pdf_language", "selected_city"]
+
+COLUMN_ALIASES = {
+    "language": "pdf_language",
+    "city": "selected_city",
+    "location": "selected_city",
+    "factory_rep": "factory_representative",
+    "date": "review_date"
+}
+
+
+def normalize_column(name):
+    """Map a spreadsheet header to a payload key"""
+    key = re.sub(r"[^0-9a-z]+", "_", str(name).strip().lower()).strip("_")
+    return COLUMN_ALIASES.get(key, key)
+
+
+def read_rows(path, sheet=None):
+    """Read a CSV or Excel file into a DataFrame of strings"""
+    if path.lower().endswith(".csv"):
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    else:
+        df = pd.read_excel(path, sheet_name=sheet or 0, dtype=str, keep_default_na=False, engine="openpyxl")
+    df.columns = [normalize_column(column) for column in df.columns]
+    return df
+
+
+def row_to_payload(row, language, city):
+    """Convert one spreadsheet row to a report payload; raises ValueError"""
+    row = dict(row)
+    review_date = str(row.get("review_date", "") or "").strip()
+    if review_date:
+        # Spreadsheets hold dates in many formats; let pandas parse them
+        parsed = pd.to_datetime(review_date, errors="coerce")
+        if pd.isna(parsed):
+            raise ValueError(f"invalid review_date {review_date!r}")
+        row["review_date"] = parsed.date()
+    return payload_from_mapping(row, language, city)
+
+
+def translate_payloads(payloads, translator, batched=True):
+    """Translate every row that is not in the source language, one deduplicated pass per language
+
+    Returns ({row index: report_texts}, {language: TranslationResult},
+    {language: number of distinct non-empty texts}) for the translated rows.
+    """
+    texts_by_language = {}
+    for index, payload in payloads.items():
+        if payload["pdf_language"] != SOURCE_LANGUAGE:
+            texts = texts_by_language.setdefault(payload["pdf_language"], {})
+            texts.update(((index, key), value) for key, value in get_report_texts(payload).items())
+
+    translated = {}
+    results = {}
+    distinct = {}
+    for language, texts in texts_by_language.items():
+        results[language] = translator.translate_many(texts, language, batched=batched)
+        for (index, key), value in results[language].texts.items():
+            translated.setdefault(index, {})[key] = value
+        distinct[language] = len({text for text in texts.values() if text and text.strip()})
+    return translated, results, distinct
+
+
+def output_filename(payload, row_number):
+    """Build a filesystem-safe PDF name like the one offered by the app"""
+    style_no = re.sub(r"[^0-9A-Za-z._-]+", "_", payload["style_no"]).strip("_") or "report"
+    city = re.sub(r"[^0-9A-Za-z._-]+", "_", payload["selected_city"])
+    return f"Sample_Review_{style_no}_{city}_row{row_number}.pdf"
+
+
+def _render_job(payload, report_texts, out_path, deterministic, fast):
+    """Process-pool worker: render one report to a file"""
+    start = time.perf_counter()
+    data = render_report_pdf(payload, report_texts, deterministic, fast).getvalue()
+    with open(out_path, "wb") as f:
+        f.write(data)
+    return len(data), time.perf_counter() - start
+
+
+def render_files(out_dir, payloads, translated, failures, workers, deterministic, fast):
+    """Render one PDF per row into out_dir in a process pool; returns (reports rendered, bytes written)
+
+    Rows that fail are added to failures.
+    """
+    total_bytes = 0
+    rendered = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                _render_job, payload, translated.get(row_number),
+                os.path.join(out_dir, output_filename(payload, row_number)), deterministic, fast
+            ): row_number
+            for row_number, payload in payloads.items()
+        }
+        for future in as_completed(futures):
+            try:
+                size, _ = future.result()
+                total_bytes += size
+                rendered += 1
+            except Exception as e:
+                failures[futures[future]] = f"{type(e).__name__}: {e}"
+    return rendered, total_bytes
+
+
+def write_bundle(path, payloads, translated, failures, contents, deterministic):
+    """Render every row into one PDF at path, in row order; returns (reports rendered, bytes written)
+
+    Rows that fail are added to failures and left out of the bundle.
+    """
+    rendered = 0
+    with open(path, "wb") as f:
+        bundle = ReportBundle(f.write, contents, deterministic=deterministic)
+        for row_number, payload in payloads.items():
+            try:
+                bundle.add(payload, translated.get(row_number) or get_report_texts(payload))
+                rendered += 1
+            except Exception as e:
+                failures[row_number] = f"{type(e).__name__}: {e}"
+        bundle.close()
+        return rendered, f.tell()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render sample review PDFs from a CSV/Excel file")
+    parser.add_argument("input", help="CSV or XLSX file, one report per row")
+    parser.add_argument("--out-dir", default="reports", help="Directory for the generated PDFs")
+    parser.add_argument("--bundle", metavar="OUT.pdf", help="Write every report into this one PDF instead")
+    parser.add_argument("--contents", action="store_true", help="Open the --bundle PDF with a table of contents")
+    parser.add_argument("--sheet", help="Excel sheet name (default: first sheet)")
+    parser.add_argument("--language", default="en", choices=list(PDF_LANGUAGES), help="Default PDF language")
+    parser.add_argument("--city", default="Shanghai", choices=list(CHINESE_CITIES), help="Default assessment location")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Rendering processes")
+    parser.add_argument("--no-batch-translation", action="store_true", help="One translation request per text")
+    parser.add_argument("--translation-deadline", type=float, default=600, help="Seconds allowed for all translations")
+    parser.add_argument("--deterministic", action="store_true", default=PDF_DETERMINISTIC,
+                        help="Stable timestamps so identical rows give identical PDFs")
+    parser.add_argument("--fast", action="store_true", default=PDF_FAST_RENDER,
+                        help="Draw values onto a precompiled page skeleton when they fit")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    df = read_rows(args.input, args.sheet)
+    unknown = sorted(set(df.columns) - set(PAYLOAD_COLUMNS))
+    if unknown:
+        print(f"Ignoring unknown columns: {', '.join(unknown)}", file=sys.stderr)
+
+    # Spreadsheet row numbers: the header is row 1
+    failures = {}
+    payloads = {}
+    for index, row in enumerate(df.to_dict("records")):
+        try:
+            payloads[index + 2] = row_to_payload(row, args.language, args.city)
+        except ValueError as e:
+            failures[index + 2] = str(e)
+
+    translate_start = time.perf_counter()
+    translated, translation_results, distinct = {}, {}, {}
+    if any(payload["pdf_language"] != SOURCE_LANGUAGE for payload in payloads.values()):
+        translator = Translator.from_env(deadline=args.translation_deadline)
+        if not translator.available:
+            print("OPENAI_API_KEY not set - translated reports keep their source text", file=sys.stderr)
+        translated, translation_results, distinct = translate_payloads(
+            payloads, translator, batched=not args.no_batch_translation
+        )
+    translate_seconds = time.perf_counter() - translate_start
+
+    render_start = time.perf_counter()
+    if args.bundle:
+        rendered, total_bytes = write_bundle(
+            args.bundle, payloads, translated, failures, args.contents, args.deterministic
+        )
+    else:
+        os.makedirs(args.out_dir, exist_ok=True)
+        rendered, total_bytes = render_files(args.out_dir, payloads, translated, failures, args.workers,
+                                             args.deterministic, args.fast)
+    render_seconds = time.perf_counter() - render_start
+    elapsed = time.perf_counter() - start
+
+    print(f"Rendered {rendered}/{len(df)} reports into {args.bundle or args.out_dir} in {elapsed:.1f}s "
+          f"({rendered / render_seconds if render_seconds else 0:.1f} reports/s rendering, "
+          f"{total_bytes / 1024:.0f} KiB)")
+    if translation_results:
+        print(f"Translation: {translate_seconds:.1f}s")
+    for language, translation_result in translation_results.items():
+        print(f"  {PDF_LANGUAGES[language]}: {distinct[language]} distinct values, "
+              f"{len(translation_result.local)} answered locally, {len(translation_result.failed)} failed, "
+              f"{len(translation_result.timed_out)} timed out")
+    if any(translation_result.circuit_open for translation_result in translation_results.values()):
+        print("Translation API paused after repeated errors - the remaining values keep their source text",
+              file=sys.stderr)
+    for row_number in sorted(failures):
+        print(f"row {row_number}: {failures[row_number]}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
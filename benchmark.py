@@ -0,0 +1,380 @@
+"""Benchmarks for report generation and translation, without Streamlit.
+
+    python benchmark.py --iterations 20 --latency 0.2 --output bench.json
+    python benchmark.py --output new.json --compare bench.json
+
+Each scenario renders a synthetic report payload the way generate_pdf()
+does: Chinese and Vietnamese reports are translated with
+Translator.translate_many(), then render_report_pdf() lays out the PDF
+(--languages vi adds the Vietnamese runs). A fake OpenAI client answers with a
+configurable latency, so no API key is used and no cost is incurred. Every
+scenario starts with an empty in-memory translation cache and a translation
+memory holding only the glossary: the first iteration is the cold run, the
+rest hit the memory and the cache.
+
+--app also times the Streamlit script through streamlit.testing: the first
+run (first paint, including imports) and reruns after typing into a field.
+Those times include the test harness, so compare them between runs rather
+than reading them as absolute. The PDF stack is imported lazily here so the
+first run is measured cold.
+
+--strategies compares output strategies per language on the full report:
+the default output, compact output (binary page streams) and, for
+Chinese, compact output with an embedded TrueType subset instead of the
+STSong-Light CID font. It reports the output size, the embedded font bytes
+and the doc.build() time of each.
+
+Results are written as JSON (one entry per scenario plus the environment)
+so runs on different commits can be compared with --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from report_data import PDF_COMPACT, REPORT_TEXT_FIELDS, get_report_texts
+from translation import Translator
+from translation_cache import TranslationCache
+from translation_memory import TranslationMemory
+
+SCENARIOS = ("empty", "full", "long_conclusion")
+LANGUAGES = ("en", "zh", "vi")
+
+# Output strategies: compact output and the Chinese font (see report.py)
+STRATEGIES = {
+    "default": {"compact": False, "cjk_font": "cid"},
+    "compact": {"compact": True, "cjk_font": "cid"},
+    "compact-ttf": {"compact": True, "cjk_font": "ttf"},
+}
+
+# Stored length of each embedded TrueType font program
+FONT_FILE_LENGTH = re.compile(rb"/Length (\d+) /Length1 \d+")
+
+
+class FakeOpenAI:
+    """Stand-in for openai.OpenAI: chat.completions.create() sleeps, then echoes"""
+
+    def __init__(self, latency=0.1):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = self
+        self.completions = self
+
+    def create(self, model, messages, response_format=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        content = messages[-1]["content"]
+        if response_format and response_format.get("type") == "json_object":
+            content = json.dumps({key: f"译 {value}" for key, value in json.loads(content).items()}, ensure_ascii=False)
+        else:
+            content = f"译 {content}"
+        return FakeResponse(content)
+
+
+class FakeResponse:
+    def __init__(self, content):
+        message = type("Message", (), {"content": content})()
+        self.choices = [type("Choice", (), {"message": message})()]
+
+
+def make_payload(scenario, language):
+    """Build the payload generate_pdf() would read from session state"""
+    payload = dict.fromkeys(REPORT_TEXT_FIELDS, "")
+    if scenario != "empty":
+        for index, key in enumerate(REPORT_TEXT_FIELDS):
+            if key.endswith(("_first", "_second", "_third", "_fourth")):
+                # Mostly numbers with some remarks, as in real reports
+                payload[key] = "too tight" if index % 7 == 0 else f"{20 + index % 10}.5"
+        payload.update(
+            style_no="ST-2041", size="US 8", factory="Dongguan Footwear Co.", brand="Northwind",
+            last_no="L-118", sales="Spring line", new_old="New", outsole_no="OS-77",
+            sock_foam_after="4 mm", sock_foam_before="5 mm", grandstep_tech="Li Wei",
+            factory_representative="Chen Hao",
+            conclusion="Fit is acceptable, toe box slightly tight; please adjust the last before bulk production."
+        )
+    if scenario == "long_conclusion":
+        payload["conclusion"] = " ".join(
+            f"Point {index}: the heel counter needs to be reinforced and the lining re-stitched." for index in range(12)
+        )
+    payload.update(
+        purpose="Fit sample", review_date=date(2025, 1, 15), pdf_language=language, selected_city="Dongguan"
+    )
+    return payload
+
+
+@contextmanager
+def measure_builds(timings):
+    """Record the duration of every SampleReviewPDF.build() call"""
+    from report import SampleReviewPDF
+
+    original = SampleReviewPDF.build
+
+    def timed_build(self, flowables, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(self, flowables, **kwargs)
+        finally:
+            timings.append(time.perf_counter() - start)
+
+    SampleReviewPDF.build = timed_build
+    try:
+        yield
+    finally:
+        SampleReviewPDF.build = original
+
+
+def generate(payload, translator, batched, fast):
+    """What generate_pdf() does for one report, minus the session state"""
+    from report import render_report_pdf
+
+    report_texts = get_report_texts(payload)
+    if payload["pdf_language"] != "en":
+        report_texts = translator.translate_many(report_texts, payload["pdf_language"], batched=batched).texts
+    return render_report_pdf(payload, report_texts, deterministic=True, fast=fast).getvalue()
+
+
+def run_scenario(scenario, language, iterations, latency, batched=True, fast=False):
+    """Run one scenario and return its metrics"""
+    client = FakeOpenAI(latency)
+    # The shipped glossary; learned translations stay in memory
+    translator = Translator(client, TranslationCache(":memory:"), memory=TranslationMemory(memory_path=None))
+    payload = make_payload(scenario, language)
+
+    wall = []
+    builds = []
+    calls_per_run = []
+    prefiltered_per_run = []
+    with measure_builds(builds):
+        for _ in range(iterations):
+            calls_before = client.calls
+            prefiltered_before = translator.prefiltered
+            start = time.perf_counter()
+            data = generate(payload, translator, batched, fast)
+            wall.append(time.perf_counter() - start)
+            calls_per_run.append(client.calls - calls_before)
+            prefiltered_per_run.append(translator.prefiltered - prefiltered_before)
+
+    # Peak memory of one warm run, measured apart from the timings
+    tracemalloc.start()
+    generate(payload, translator, batched, fast)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    translator.executor.shutdown()
+
+    warm = wall[1:] or wall
+    cache_stats = translator.cache.stats()
+    return {
+        "scenario": scenario,
+        "language": language,
+        "iterations": iterations,
+        "cold_ms": round(wall[0] * 1000, 3),
+        "wall_ms_median": round(statistics.median(warm) * 1000, 3),
+        "wall_ms_p95": round(sorted(warm)[int(0.95 * (len(warm) - 1))] * 1000, 3),
+        "build_count": len(builds),
+        "build_ms_median": round(statistics.median(builds) * 1000, 3) if builds else None,
+        "api_calls": client.calls,
+        "api_calls_cold": calls_per_run[0],
+        # Distinct texts the local pre-filter answered in one report
+        "prefiltered_per_report": prefiltered_per_run[0],
+        "cache_hit_rate": round(cache_stats["hit_rate"], 4),
+        "memory_hit_rate": round(translator.memory.stats()["hit_rate"], 4),
+        "peak_memory_kib": round(peak / 1024, 1),
+        "output_bytes": len(data),
+    }
+
+
+def font_bytes(data):
+    """Bytes of the embedded font programs in a PDF"""
+    return sum(int(length) for length in FONT_FILE_LENGTH.findall(data))
+
+
+def run_strategy(language, strategy, iterations, fast=False):
+    """Render the full report with one output strategy and return its size and build time"""
+    from report import render_report_pdf, set_compact_output
+
+    options = STRATEGIES[strategy]
+    payload = make_payload("full", language)
+    report_texts = get_report_texts(payload)
+    if language != "en":
+        # Translated text, so the fonts get the glyphs a real report needs
+        translator = Translator(FakeOpenAI(0), TranslationCache(":memory:"), memory=TranslationMemory(memory_path=None))
+        report_texts = translator.translate_many(report_texts, language).texts
+        translator.executor.shutdown()
+
+    builds = []
+    wall = []
+    set_compact_output(options["compact"])
+    try:
+        with measure_builds(builds):
+            for _ in range(iterations):
+                start = time.perf_counter()
+                data = render_report_pdf(
+                    payload, report_texts, deterministic=True, fast=fast, cjk_font=options["cjk_font"]
+                ).getvalue()
+                wall.append(time.perf_counter() - start)
+    finally:
+        set_compact_output(PDF_COMPACT)
+
+    return {
+        "language": language,
+        "strategy": strategy,
+        "output_bytes": len(data),
+        "font_bytes": font_bytes(data),
+        "build_ms_median": round(statistics.median(builds) * 1000, 3) if builds else None,
+        "wall_ms_median": round(statistics.median(wall) * 1000, 3),
+    }
+
+
+def run_app(reruns):
+    """Time the first run and the reruns of the Streamlit script"""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), "f.py"), default_timeout=120)
+    start = time.perf_counter()
+    app.run()
+    first_run = time.perf_counter() - start
+    # What the first paint pulled in
+    loaded = {name: name in sys.modules for name in ("reportlab.platypus", "openai")}
+
+    times = []
+    for index in range(reruns):
+        app.text_input(key="style_no").input(f"ST-{index}")
+        start = time.perf_counter()
+        app.run()
+        times.append(time.perf_counter() - start)
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+
+    return {
+        "first_run_ms": round(first_run * 1000, 1),
+        "rerun_ms_median": round(statistics.median(times) * 1000, 2),
+        "rerun_ms_p95": round(sorted(times)[int(0.95 * (len(times) - 1))] * 1000, 2),
+        "reruns": reruns,
+        "loaded_on_first_run": loaded,
+    }
+
+
+def environment():
+    """Describe the run so results from different commits can be told apart"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import reportlab
+
+    return {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "reportlab": reportlab.Version,
+        "platform": platform.platform(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print wall-time ratios against a baseline file; return True on regression"""
+    previous = {(entry["scenario"], entry["language"]): entry for entry in baseline["results"]}
+    regressed = False
+    for entry in results:
+        old = previous.get((entry["scenario"], entry["language"]))
+        if old is None:
+            continue
+        ratio = entry["wall_ms_median"] / old["wall_ms_median"] if old["wall_ms_median"] else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            regressed = True
+        print(f"{entry['scenario']:>16} {entry['language']}: {old['wall_ms_median']:.2f} -> "
+              f"{entry['wall_ms_median']:.2f} ms (x{ratio:.2f}), api calls {old['api_calls']} -> "
+              f"{entry['api_calls']}{flag}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark PDF generation and translation")
+    parser.add_argument("--iterations", type=int, default=20, help="Reports per scenario (the first one is cold)")
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds per fake API call")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--languages", nargs="+", default=["en", "zh"], choices=LANGUAGES)
+    parser.add_argument("--no-batch-translation", action="store_true", help="One translation request per text")
+    parser.add_argument("--fast", action="store_true", help="Use the page-skeleton overlay renderer")
+    parser.add_argument("--app", action="store_true", help="Also time the Streamlit script's first run and reruns")
+    parser.add_argument("--strategies", action="store_true",
+                        help="Also compare output size, font bytes and build time of the output strategies")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare wall times against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Wall-time ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    app = None
+    if args.app:
+        # Before anything else, so the first run starts with cold imports
+        app = run_app(args.iterations)
+        print(f"app: first run {app['first_run_ms']:.0f} ms, rerun median {app['rerun_ms_median']:.1f} ms, "
+              f"loaded on first run: {', '.join(name for name, loaded in app['loaded_on_first_run'].items() if loaded) or 'none'}")
+
+    results = []
+    for language in args.languages:
+        for scenario in args.scenarios:
+            entry = run_scenario(
+                scenario, language, args.iterations, args.latency,
+                batched=not args.no_batch_translation, fast=args.fast
+            )
+            results.append(entry)
+            print(f"{scenario:>16} {language}: cold {entry['cold_ms']:.1f} ms, warm {entry['wall_ms_median']:.2f} ms "
+                  f"(build {entry['build_ms_median']} ms), {entry['api_calls']} api calls, "
+                  f"{entry['prefiltered_per_report']} prefiltered, "
+                  f"hit rate {entry['cache_hit_rate']:.0%} (memory {entry['memory_hit_rate']:.0%}), peak {entry['peak_memory_kib']:.0f} KiB, "
+                  f"{entry['output_bytes']} bytes")
+
+    strategies = []
+    if args.strategies:
+        for language in args.languages:
+            for strategy in STRATEGIES:
+                if STRATEGIES[strategy]["cjk_font"] != "cid" and language != "zh":
+                    continue
+                entry = run_strategy(language, strategy, args.iterations, fast=args.fast)
+                strategies.append(entry)
+                print(f"{strategy:>16} {language}: {entry['output_bytes']} bytes ({entry['font_bytes']} font), "
+                      f"build {entry['build_ms_median']} ms, wall {entry['wall_ms_median']:.2f} ms")
+
+    summary = {
+        "environment": environment(),
+        "options": {
+            "iterations": args.iterations,
+            "latency": args.latency,
+            "batched": not args.no_batch_translation,
+            "fast": args.fast,
+        },
+        "results": results,
+        "strategies": strategies,
+        "app": app,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,32 +1,36 @@
 import streamlit as st
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch, cm
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
-from reportlab.pdfgen import canvas
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfbase.cidfonts import UnicodeCIDFont
 from datetime import datetime
-import io
-import pytz
-from openai import OpenAI
 import os
-from dotenv import load_dotenv
-import base64
-from io import BytesIO
-
-# Load environment variables
-load_dotenv()
-
-# Initialize OpenAI client
-openai_api_key = os.getenv("OPENAI_API_KEY")
-if openai_api_key:
-    openai_client = OpenAI(api_key=openai_api_key)
-else:
-    openai_client = None
+import uuid
+from report_data import (
+    CHINA_TZ, CHINESE_CITIES, SAMPLE_TYPES_EN, SAMPLE_TYPES_ZH, MEASUREMENT_ITEMS_EN, MEASUREMENT_FIELDS,
+    MEASUREMENT_ROUNDS, SOCK_FOAM_FIELDS, REPORT_TEXT_FIELDS, PDF_DETERMINISTIC, PDF_LANGUAGES, SOURCE_LANGUAGE,
+    PHOTO_MAX_COUNT, get_report_texts
+)
+from i18n import ui_text
+from pdf_cache import PDFCache, report_cache_key
+from translation import BackgroundTranslator, Translator, openai_client
+from translation_cache import TranslationCache
+from translation_memory import TranslationMemory
+
+# Streamlit reruns this script on every interaction. Process-level
+# resources are created on the first run and reused by every rerun and
+# session; the OpenAI SDK is only imported for the first translation and
+# the PDF stack for the first report.
+@st.cache_resource
+def load_environment():
+    """Load environment variables once per process; True if an API key is set"""
+    from dotenv import load_dotenv
+    
+    load_dotenv()
+    return bool(os.getenv("OPENAI_API_KEY"))
+
+def create_openai_client():
+    """Create the OpenAI client; the shared translator calls this once, on its first request"""
+    return openai_client(os.getenv("OPENAI_API_KEY"))
+
+openai_available = load_environment()
+if not openai_available:
     st.warning("OpenAI API key not found. Translation features will be limited.")
 
 # Page config
@@ -37,64 +41,37 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Chinese cities dictionary
-CHINESE_CITIES = {
-    "Guangzhou": "广东",
-    "Shenzhen": "深圳",
-    "Dongguan": "东莞",
-    "Foshan": "佛山",
-    "Zhongshan": "中山",
-    "Huizhou": "惠州",
-    "Zhuhai": "珠海",
-    "Jiangmen": "江门",
-    "Zhaoqing": "肇庆",
-    "Shanghai": "上海",
-    "Beijing": "北京",
-    "Suzhou": "苏州",
-    "Hangzhou": "杭州",
-    "Ningbo": "宁波",
-    "Wenzhou": "温州",
-    "Wuhan": "武汉",
-    "Chengdu": "成都",
-    "Chongqing": "重庆",
-    "Tianjin": "天津",
-    "Nanjing": "南京",
-    "Xi'an": "西安",
-    "Qingdao": "青岛",
-    "Dalian": "大连",
-    "Shenyang": "沈阳",
-    "Changsha": "长沙",
-    "Zhengzhou": "郑州",
-    "Jinan": "济南",
-    "Harbin": "哈尔滨",
-    "Changchun": "长春",
-    "Taiyuan": "太原",
-    "Shijiazhuang": "石家庄",
-    "Lanzhou": "兰州",
-    "Xiamen": "厦门",
-    "Fuzhou": "福州",
-    "Nanning": "南宁",
-    "Kunming": "昆明",
-    "Guiyang": "贵阳",
-    "Haikou": "海口",
-    "Ürümqi": "乌鲁木齐",
-    "Lhasa": "拉萨"
+# Input modes for the report tabs (see render_input_section)
+INPUT_MODES = {
+    "live": "Live",
+    "form": "Apply per section",
+    "fragment": "Rerun section only"
 }
 
-# Sample types - separate for English and Chinese
-SAMPLE_TYPES_EN = {
-    "Dev.sample": "Development Sample",
-    "Cfm sample": "Confirmation Sample",
-    "Fit sample": "Fitting Sample"
-
+# Measurement input layouts (see measurements_section)
+MEASUREMENT_INPUTS = {
+    "fields": "Field per cell",
+    "grid": "Single grid"
 }
 
-SAMPLE_TYPES_ZH = {
-    "Dev.sample": "开发样",
-    "Cfm sample": "确认样",
-    "Fit sample": "试穿样"
+# Output of a report generated in several PDF languages (see generate_report_bundle)
+MULTI_LANGUAGE_OUTPUTS = {
+    "zip": "ZIP of PDFs",
+    "combined": "Combined PDF"
+}
 
+# Trends tab: group columns, statistic columns and the groups listed
+TREND_GROUP_LABELS = {"factory": "Factory", "last_no": "Last No.", "brand": "Brand", "style_no": "Style No."}
+TREND_STAT_LABELS = {
+    "reports": "Reports", "first": "First Round", "final": "Final Round", "mean_change": "Mean Change per Round",
+    "spread": "Spread", "converged": "Converged Share"
 }
+TREND_GROUP_ROWS = 200
+
+# Measurement grid: one row per check item, the four rounds, then Sock Foam's after/before
+GRID_ITEMS = [item for side in ("left", "right") for item in MEASUREMENT_ITEMS_EN[side]]
+GRID_ROUND_COLUMNS = [round_name.capitalize() for round_name in MEASUREMENT_ROUNDS]
+GRID_SOCK_FOAM_COLUMNS = ["After", "Before"]
 
 # Custom icons
 ICONS = {
@@ -285,730 +262,326 @@ if 'pdf_language' not in st.session_state:
     st.session_state.pdf_language = "en"
 if 'selected_city' not in st.session_state:
     st.session_state.selected_city = "Shanghai"
-if 'translations_cache' not in st.session_state:
-    st.session_state.translations_cache = {}
-
-# Translation function using GPT-4o mini
-def translate_text(text, target_language="zh"):
-    """Translate text using GPT-4o mini with caching"""
-    if not text or not text.strip():
-        return text
-    
-    # Check cache first
-    cache_key = f"{text}_{target_language}"
-    if cache_key in st.session_state.translations_cache:
-        return st.session_state.translations_cache[cache_key]
-    
-    # Don't translate numbers or alphanumeric codes
-    if text.strip().replace('.', '').replace(',', '').replace('-', '').isdigit():
-        st.session_state.translations_cache[cache_key] = text
-        return text
-    
-    if not openai_client:
-        # Fallback to simple translations if no API key
-        st.session_state.translations_cache[cache_key] = text
-        return text
-    
-    try:
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": f"You are a professional translator. Translate the following text to {'Chinese (Mandarin)' if target_language == 'zh' else 'English'}. Only return the translation, no explanations. Preserve any numbers, dates, and special formatting."},
-                {"role": "user", "content": text}
-            ],
-            temperature=0.1,
-            max_tokens=500
-        )
-        
-        translated_text = response.choices[0].message.content.strip()
-        st.session_state.translations_cache[cache_key] = translated_text
-        return translated_text
-    except Exception as e:
-        st.warning(f"Translation failed: {str(e)}. Using original text.")
-        st.session_state.translations_cache[cache_key] = text
-        return text
-
-# Helper function to translate user content
-def translate_user_content(text, target_language="zh"):
-    """Translate user-filled content to target language"""
-    if not text or not text.strip():
-        return text
-    
-    if target_language == "en":
-        # If target is English, return as is (assuming user entered in English)
-        return text
-    
-    # Translate to Chinese
-    return translate_text(text, target_language)
 
-# Helper function to get translated text with caching
-def get_text(key, fallback=None):
-    """Get translated text based on current UI language"""
-    lang = st.session_state.ui_language
-    
-    # Base English texts
-    texts = {
-        # Titles and Headers
-        "title": "Factory Sample Review Report",
-        "basic_info": "Basic Information",
-        "measurements": "Sample Measurements",
-        "sample_review": "Sample Review",
-        "conclusion": "Conclusion",
-        "signatures": "Signatures",
-        
-        # Buttons
-        "generate_pdf": "Generate PDF Report",
-        "download_pdf": "Download PDF Report",
-        
-        # Form Fields
-        "style_no": "Style No.",
-        "size": "Size",
-        "factory": "Factory",
-        "purpose": "Purpose",
-        "brand": "Brand",
-        "last_no": "Last No.",
-        "sales": "Sales",
-        "new_old": "New/Old",
-        "outsole_no": "Outsole NO.",
-        "review_date": "Review Date",
-        "check_items": "Check Items",
-        "first": "First",
-        "second": "Second",
-        "third": "Third",
-        "fourth": "Fourth",
-        "measurement_details": "Measurement Details",
-        "picture": "Picture",
-        
-        # Footer and Messages
-        "footer_text": "Factory Sample Review System",
-        "generate_success": "PDF Generated Successfully!",
-        "fill_required": "Please fill in at least Style No. and Factory!",
-        "creating_pdf": "Creating your sample review PDF report...",
-        "pdf_details": "PDF Details",
-        "report_language": "Report Language",
-        "generated": "Generated",
-        "location": "Location",
-        "error_generating": "Error generating PDF",
-        "select_location": "Select Location",
-        "user_interface_language": "User Interface Language",
-        "pdf_report_language": "PDF Report Language",
-        "test_location": "Assessment Location",
-        "local_time": "Local Time",
-        "quick_guide": "Quick Guide",
-        "powered_by": "Powered by Streamlit",
-        "copyright": "© 2025 - Factory Sample Review Platform",
-        "upload_photo": "Upload Sample Photo",
-        "conclusion_note": "Conclusion & Notes",
-        "disclaimer": "Disclaimer",
-        "disclaimer_text": "Note: This review information does not release the factory from any responsibilities in the event of claims being received from our customer.",
-        "measurement_check": "Measurement Check Items",
-        "add_measurement": "Add Measurement Point",
-        "grandstep_tech": "GrandStep Tech",
-        "factory_representative": "Factory Representative"
-    }
-    
-    text = texts.get(key, fallback or key)
-    
-    # Translate if needed
-    if lang == "zh" and openai_client:
-        return translate_text(text, "zh")
-    return text
-
-# PDF text based on selected language
-def get_pdf_text(key, pdf_lang):
-    """Get text for PDF based on selected language"""
-    # English texts for PDF
-    pdf_texts_en = {
-        "title": "Factory Sample Review Report",
-        "page_num": "Page# 1",
-        "style_no": "Style No.",
-        "size": "Size",
-        "factory": "Factory",
-        "purpose": "Purpose",
-        "brand": "Brand",
-        "last_no": "Last No.",
-        "sales": "Sales",
-        "new_old": "New/Old",
-        "outsole_no": "Outsole NO.",
-        "review": "Review",
-        "check_items": "Check Items",
-        "first": "First",
-        "second": "Second",
-        "third": "Third",
-        "fourth": "Fourth",
-        "conclusion": "Conclusion",
-        "disclaimer": "Note: This review information does not release the factory from any responsibilities in the event of claims being received from our customer.",
-        "grandstep_tech": "GrandStep Tech:",
-        "factory_rep": "Factory Representative:",
-        "after": "After",
-        "before": "Before",
-        "location": "Location:",
-        "header": "FACTORY SAMPLE REVIEW REPORT"
-    }
-    
-    # Chinese texts for PDF
-    pdf_texts_zh = {
-        "title": "样品技术核查表",
-        "page_num": "页码# 1",
-        "style_no": "型体",
-        "size": "码数",
-        "factory": "工厂",
-        "purpose": "类型",
-        "brand": "品牌",
-        "last_no": "楦号",
-        "sales": "业务",
-        "new_old": "新旧",
-        "outsole_no": "大底",
-        "review": "日期",
-        "check_items": "核查项目",
-        "first": "第一次",
-        "second": "第二次",
-        "third": "第三次",
-        "fourth": "第四次",
-        "conclusion": "结论",
-        "disclaimer": "以上不免除我客人收到货后索赔而引起的货物供应商(工厂)的任何责任.",
-        "grandstep_tech": "GrandStep技术代表:",
-        "factory_rep": "工厂代表:",
-        "after": "后置",
-        "before": "前置",
-        "location": "地点:",
-        "header": "样品技术核查报告"
-    }
-    
-    if pdf_lang == "en":
-        return pdf_texts_en.get(key, key)
-    else:
-        return pdf_texts_zh.get(key, key)
-
-# Measurement items in both languages
-MEASUREMENT_ITEMS_EN = {
-    "left": [
-        ("Last Length", "Last Length"),
-        ("Toe Girth", "Toe Girth"),
-        ("Ball Girth", "Ball Girth"),
-        ("Waist Girth", "Waist Girth"),
-        ("Instep Girth", "Instep Girth"),
-        ("Vamp length", "Vamp length"),
-        ("Back Height", "Back Height"),
-        ("Boot Height", "Boot Height"),
-        ("Boot top Width", "Boot top Width"),
-        ("Boot Calf Width", "Boot Calf Width"),
-        ("Ankle Width", "Ankle Width")
-    ],
-    "right": [
-        ("Toe Width", "Toe Width"),
-        ("Bottom Width", "Bottom Width"),
-        ("Heel Seat Width", "Heel Seat Width"),
-        ("Heel to Instep Girth", "Heel to Instep Girth"),
-        ("Toe Spring", "Toe Spring"),
-        ("Thickness", "Thickness"),
-        ("Shank", "Shank"),
-        ("Mid-sole", "Mid-sole"),
-        ("Outsole Degree", "Outsole Degree"),
-        ("Sock Foam", "Sock Foam")
-    ]
-}
-
-MEASUREMENT_ITEMS_ZH = {
-    "left": [
-        ("楦长", "楦长"),
-        ("趾围", "趾围"),
-        ("掌围", "掌围"),
-        ("腰围", "腰围"),
-        ("背围", "背围"),
-        ("鞋口长度", "鞋口长度"),
-        ("后跟高度", "后跟高度"),
-        ("靴筒高度", "靴筒高度"),
-        ("靴筒宽度", "靴筒宽度"),
-        ("小腿宽度", "小腿宽度"),
-        ("脚踝宽度", "脚踝宽度")
-    ],
-    "right": [
-        ("趾宽", "趾宽"),
-        ("掌宽", "掌宽"),
-        ("后跟宽度", "后跟宽度"),
-        ("后跟到脚背长度", "后跟到脚背长度"),
-        ("鞋头翘度", "鞋头翘度"),
-        ("厚度", "厚度"),
-        ("钢芯", "钢芯"),
-        ("中底", "中底"),
-        ("大底硬度", "大底硬度"),
-        ("鞋垫", "鞋垫")
-    ]
-}
+# Process-wide translation cache shared by all sessions and persisted on disk
+@st.cache_resource
+def get_translation_cache():
+    """Create the shared translation cache once per process"""
+    return TranslationCache.from_env()
 
-# PDF Generation with Headers and Footers
-class SampleReviewPDF(SimpleDocTemplate):
-    def __init__(self, *args, **kwargs):
-        self.header_text = kwargs.pop('header_text', '')
-        self.location = kwargs.pop('location', '')
-        self.pdf_language = kwargs.pop('pdf_language', 'en')
-        self.selected_city = kwargs.pop('selected_city', '')
-        self.chinese_city = kwargs.pop('chinese_city', '')
-        self.chinese_font = kwargs.pop('chinese_font', 'Helvetica')
-        super().__init__(*args, **kwargs)
-        
-    def afterFlowable(self, flowable):
-        """Add header and footer"""
-        # Add header on all pages except first
-        if self.page > 1:
-            self.canv.saveState()
-            # Header
-            self.canv.setFillColor(colors.HexColor('#667eea'))
-            self.canv.rect(0, self.pagesize[1] - 0.6*inch, self.pagesize[0], 0.6*inch, fill=1, stroke=0)
-            
-            # Use Chinese font if needed
-            font_size = 12
-            if self.pdf_language == "zh":
-                self.canv.setFont(self.chinese_font, font_size)
-            else:
-                self.canv.setFont('Helvetica-Bold', font_size)
-                
-            self.canv.setFillColor(colors.white)
-            header_title = get_pdf_text("header", self.pdf_language)
-            self.canv.drawCentredString(
-                self.pagesize[0]/2.0, 
-                self.pagesize[1] - 0.4*inch, 
-                header_title
-            )
-            self.canv.restoreState()
-            
-        # Footer on all pages
-        self.canv.saveState()
-        
-        # Footer background
-        self.canv.setFillColor(colors.HexColor('#f8f9fa'))
-        self.canv.rect(0, 0, self.pagesize[0], 0.7*inch, fill=1, stroke=0)
-        
-        # Top border
-        self.canv.setStrokeColor(colors.HexColor('#667eea'))
-        self.canv.setLineWidth(1)
-        self.canv.line(0, 0.7*inch, self.pagesize[0], 0.7*inch)
-        
-        # Footer text
-        font_size = 8
-        if self.pdf_language == "zh":
-            self.canv.setFont(self.chinese_font, font_size)
-        else:
-            self.canv.setFont('Helvetica', font_size)
-            
-        self.canv.setFillColor(colors.HexColor('#666666'))
-        
-        # Left: Location
-        china_tz = pytz.timezone('Asia/Shanghai')
-        current_time = datetime.now(china_tz)
-        
-        location_info = f"{get_pdf_text('location', self.pdf_language)} {self.selected_city}"
-        if self.pdf_language == "zh" and self.chinese_city:
-            location_info = f"{get_pdf_text('location', self.pdf_language)} {self.selected_city} ({self.chinese_city})"
-        
-        self.canv.drawString(0.5*inch, 0.25*inch, location_info)
-        
-        # Center: Timestamp
-        if self.pdf_language == "zh":
-            timestamp = f"生成时间: {current_time.strftime('%Y-%m-%d %H:%M:%S')}"
-        else:
-            timestamp = f"Generated: {current_time.strftime('%Y-%m-%d %H:%M:%S')}"
-        self.canv.drawCentredString(self.pagesize[0]/2.0, 0.25*inch, timestamp)
-        
-        # Right: Page number
-        if self.pdf_language == "zh":
-            page_num = f"第 {self.page} 页"
-        else:
-            page_num = f"Page {self.page}"
-        self.canv.drawRightString(self.pagesize[0] - 0.5*inch, 0.25*inch, page_num)
-        
-        self.canv.restoreState()
+# Process-wide glossary and translation memory, consulted before the cache
+@st.cache_resource
+def get_translation_memory():
+    """Load the glossary and learned translations once per process"""
+    return TranslationMemory.from_env()
 
-def generate_pdf():
-    """Generate Sample Review PDF report"""
-    buffer = io.BytesIO()
-    
-    # Get location info
-    selected_city = st.session_state.selected_city
-    chinese_city = CHINESE_CITIES[selected_city]
-    pdf_lang = st.session_state.pdf_language
-    
-    # Register Chinese font if needed
-    chinese_font = 'Helvetica'
-    
-    if pdf_lang == "zh":
-        try:
-            pdfmetrics.registerFont(UnicodeCIDFont('STSong-Light'))
-            chinese_font = 'STSong-Light'
-        except:
-            chinese_font = 'Helvetica'
-    
-    # Create PDF with custom header/footer
-    doc = SampleReviewPDF(
-        buffer, 
-        pagesize=letter,
-        topMargin=0.8*inch,
-        bottomMargin=0.8*inch,
-        header_text=get_pdf_text("header", pdf_lang),
-        location=selected_city,
-        pdf_language=pdf_lang,
-        selected_city=selected_city,
-        chinese_city=chinese_city,
-        chinese_font=chinese_font
+# Process-wide translator: OpenAI client, shared cache, memory and worker pool
+@st.cache_resource
+def get_translator():
+    """Create the shared translator once per process"""
+    return Translator(
+        None, get_translation_cache(), client_factory=create_openai_client if openai_available else None,
+        memory=get_translation_memory()
     )
+
+# Process-wide background pre-translation, shared by all sessions
+@st.cache_resource
+def get_background_translator():
+    """Create the shared background translator once per process"""
+    return BackgroundTranslator(get_translator())
+
+translation_cache = get_translation_cache()
+translation_memory = get_translation_memory()
+translator = get_translator()
+background_translator = get_background_translator()
+
+# Longest a report waits for its fields' background translations before translating the rest itself
+PRETRANSLATE_WAIT_SECONDS = 5
+
+def translate_batch(texts, target_language="zh", batched=True, deadline=None):
+    """Translate a dict of texts for this report (see Translator.translate_many)
     
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Create styles based on language
-    title_font = 'Helvetica-Bold' if pdf_lang != "zh" else chinese_font
-    normal_font = 'Helvetica' if pdf_lang != "zh" else chinese_font
-    bold_font = 'Helvetica-Bold' if pdf_lang != "zh" else chinese_font
-    
-    # Title style
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        textColor=colors.HexColor('#333333'),
-        spaceAfter=5,
-        alignment=TA_CENTER,
-        fontName=bold_font
-    )
+    Returns the TranslationResult. Problems are reported once, in a single
+    status line for the report.
+    """
+    finish_pretranslation()
+    result = translator.translate_many(texts, target_language, batched=batched, deadline=deadline)
+    st.session_state.translated_locally = len(result.local)
     
-    # Subtitle style
-    subtitle_style = ParagraphStyle(
-        'CustomSubtitle',
-        parent=styles['Normal'],
-        fontSize=11,
-        textColor=colors.HexColor('#764ba2'),
-        alignment=TA_CENTER,
-        spaceAfter=20,
-        fontName=bold_font
-    )
+    status = translation_status(result)
+    if status:
+        st.warning(f"{ICONS['warning']} {status}")
     
-    # Table header style
-    table_header_style = ParagraphStyle(
-        'TableHeader',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=colors.white,
-        alignment=TA_CENTER,
-        fontName=bold_font
+    return result
+
+def translate_languages(texts, target_languages, batched=True):
+    """Translate a dict of texts into several languages concurrently
+    
+    Returns ({language: texts}, whether every translation completed); the
+    source language keeps the texts as they are. Problems are reported with
+    one status line per language.
+    """
+    finish_pretranslation()
+    results = translator.translate_languages(
+        texts, [language for language in target_languages if language != SOURCE_LANGUAGE], batched=batched
     )
+    st.session_state.translated_locally = sum(len(result.local) for result in results.values())
     
-    # Table cell style
-    table_cell_style = ParagraphStyle(
-        'TableCell',
-        parent=styles['Normal'],
-        fontSize=8,
-        alignment=TA_CENTER,
-        fontName=normal_font
-    )
+    for language, result in results.items():
+        status = translation_status(result)
+        if status:
+            st.warning(f"{ICONS['warning']} {PDF_LANGUAGES[language]}: {status}")
     
-    # Normal style
-    normal_style = ParagraphStyle(
-        'NormalStyle',
-        parent=styles['Normal'],
-        fontSize=9,
-        leading=12,
-        fontName=normal_font
+    return {
+        language: texts if language == SOURCE_LANGUAGE else results[language].texts
+        for language in target_languages
+    }, all(result.complete for result in results.values())
+
+def pretranslation_owner():
+    """This session's id for the background translator"""
+    if 'pretranslation_owner' not in st.session_state:
+        st.session_state.pretranslation_owner = uuid.uuid4().hex
+    return st.session_state.pretranslation_owner
+
+def pretranslate_changes():
+    """Queue report fields changed since the last run for background translation"""
+    if not st.session_state.get('pretranslate') or not translator.available:
+        return
+    languages = [language for language in report_languages() if language != SOURCE_LANGUAGE]
+    if not languages:
+        return
+    # Values already queued, per field and language
+    queued = st.session_state.setdefault('pretranslated_values', {})
+    for key, value in report_field_values().items():
+        for language in languages:
+            if queued.get((key, language)) != value:
+                queued[(key, language)] = value
+                background_translator.submit(pretranslation_owner(), key, value, language)
+
+def finish_pretranslation():
+    """Let this session's running background translations land in the cache first"""
+    if st.session_state.get('pretranslate'):
+        background_translator.wait(pretranslation_owner(), PRETRANSLATE_WAIT_SECONDS)
+
+def translation_status(result):
+    """One line describing the fields a report was left without a translation for, or None"""
+    untranslated = len(result.failed) + len(result.timed_out)
+    if not untranslated or not translator.available:
+        return None
+    reasons = []
+    if result.circuit_open:
+        reasons.append(f"translation API paused after repeated errors, retrying in {translator.breaker.retry_in():.0f}s")
+    elif result.failed:
+        reasons.append(f"{len(result.failed)} failed")
+    if result.timed_out:
+        reasons.append(f"{len(result.timed_out)} timed out")
+    return f"{untranslated} field(s) kept their original text ({'; '.join(reasons)})."
+
+# Helper function to get interface text from the compiled catalog
+def get_text(key, fallback=None):
+    """Get translated text based on current UI language"""
+    return ui_text(key, st.session_state.ui_language, fallback)
+
+def measurement_table(values):
+    """Build the measurement grid (items x rounds) from a mapping of report fields"""
+    import pandas as pd
+    
+    rows = []
+    for item_en, item_key in GRID_ITEMS:
+        if item_key == "Sock Foam":
+            fields = (None,) * len(MEASUREMENT_ROUNDS) + SOCK_FOAM_FIELDS
+        else:
+            fields = MEASUREMENT_FIELDS[item_key] + (None,) * len(SOCK_FOAM_FIELDS)
+        rows.append([(values.get(field, '') or '') if field else '' for field in fields])
+    return pd.DataFrame(
+        rows, index=[item_en for item_en, _ in GRID_ITEMS], columns=GRID_ROUND_COLUMNS + GRID_SOCK_FOAM_COLUMNS
     )
-    
-    # Helper function for creating paragraphs
-    def create_paragraph(text, style=normal_style, bold=False):
-        """Create paragraph with appropriate font"""
-        if bold:
-            font_name = bold_font
+
+def measurement_values(table):
+    """Read the measurement report fields back out of the grid"""
+    rows = table.to_dict("index")
+    values = {}
+    for item_en, item_key in GRID_ITEMS:
+        row = rows[item_en]
+        if item_key == "Sock Foam":
+            cells = zip(GRID_SOCK_FOAM_COLUMNS, SOCK_FOAM_FIELDS)
         else:
-            font_name = normal_font
-        
-        custom_style = ParagraphStyle(
-            f"CustomStyle_{bold}",
-            parent=style,
-            fontName=font_name
+            cells = zip(GRID_ROUND_COLUMNS, MEASUREMENT_FIELDS[item_key])
+        for column, field in cells:
+            # Cleared cells come back as None
+            value = row[column]
+            values[field] = value.strip() if isinstance(value, str) else ''
+    return values
+
+def switch_measurement_input():
+    """Carry the measurement values over when the measurement layout changes"""
+    if st.session_state.measurement_input == "grid":
+        # A new base table; the editor's edits apply to the table it was built from
+        st.session_state.measurement_base = measurement_table(st.session_state)
+        st.session_state.measurement_edited = st.session_state.measurement_base
+        st.session_state.pop('measurement_grid', None)
+    elif 'measurement_edited' in st.session_state:
+        st.session_state.update(measurement_values(st.session_state.measurement_edited))
+
+def report_field_values():
+    """Collect the report's text fields from session state"""
+    values = {key: st.session_state.get(key, '') or '' for key in REPORT_TEXT_FIELDS}
+    if st.session_state.get('measurement_input') == "grid":
+        # The grid is the only copy of the measurements in this layout
+        values.update(measurement_values(st.session_state.measurement_edited))
+    return values
+
+def get_report_payload():
+    """Collect the report fields, photos, PDF language and city from session state"""
+    payload = report_field_values()
+    payload['purpose'] = st.session_state.get('purpose', '')
+    payload['review_date'] = st.session_state.get('review_date', datetime.now())
+    payload['pdf_language'] = st.session_state.pdf_language
+    payload['selected_city'] = st.session_state.selected_city
+    payload['photos'] = [photo for _, photo in uploaded_photos() if photo is not None]
+    return payload
+
+# Process-wide cache of processed photos, keyed by the uploaded bytes. PIL
+# is only loaded when the first photo is uploaded
+@st.cache_resource
+def get_photo_cache():
+    """Create the shared photo cache once per process"""
+    from photos import PhotoCache
+    
+    return PhotoCache.from_env()
+
+def uploaded_photos():
+    """(name, ProcessedPhoto) for each uploaded photo; the photo is None if it can't be read
+    
+    The session remembers the photo of each upload, so reruns neither hash
+    nor decode the files again.
+    """
+    uploads = (st.session_state.get('photos') or [])[:PHOTO_MAX_COUNT]
+    processed = st.session_state.setdefault('processed_photos', {})
+    photos = []
+    for uploaded in uploads:
+        if uploaded.file_id not in processed:
+            try:
+                processed[uploaded.file_id] = get_photo_cache().get(uploaded.getvalue())
+            except ValueError:
+                processed[uploaded.file_id] = None
+        photos.append((uploaded.name, processed[uploaded.file_id]))
+    # Forget removed uploads
+    for file_id in set(processed) - {uploaded.file_id for uploaded in uploads}:
+        del processed[file_id]
+    return photos
+
+# Process-wide cache of generated PDFs, keyed by the report payload. Only
+# deterministic PDFs are cached: others carry the time they were generated
+@st.cache_resource
+def get_pdf_cache():
+    """Create the shared PDF cache once per process"""
+    return PDFCache.from_env()
+
+pdf_cache = get_pdf_cache()
+
+# Process-wide store of generated reports, searched from the sidebar; SQLAlchemy
+# is only loaded when the history is first searched or a report is saved
+@st.cache_resource
+def get_report_history():
+    """Open the shared report history once per process"""
+    from report_history import ReportHistory
+    
+    return ReportHistory.from_env()
+
+# Measurements of every stored report as one numeric array, for the Trends tab;
+# numpy and pandas are only loaded when the trends are first shown
+@st.cache_resource
+def get_history_cube():
+    """Create the shared measurement array of the report history once per process"""
+    from measurement_analytics import HistoryCube
+    
+    return HistoryCube(get_report_history())
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def measurement_trends(_cube, last_id, prefixes, item_key, group_by, tolerance):
+    """Trend tables of the reports matching the prefixes
+    
+    The cube only grows, so its last history id stands in for it in the
+    cache key; reruns that change nothing here cost a dictionary lookup.
+    """
+    cube = _cube.select(_cube.matching(**dict(prefixes)))
+    item_stats = cube.item_stats(tolerance)
+    return {
+        "reports": len(cube),
+        "item": item_stats.loc[item_key],
+        "items": item_stats,
+        "rounds": cube.round_means().loc[item_key],
+        "monthly": cube.monthly_means(item_key),
+        "groups": cube.group_stats(group_by, item_key, tolerance),
+    }
+
+def reset_history_page():
+    """Show the first page of results after the search changes"""
+    st.session_state.history_page = 1
+
+def turn_history_page(step):
+    st.session_state.history_page = st.session_state.get('history_page', 1) + step
+
+def load_history_report(report_id):
+    """Fill the report tabs with a stored report"""
+    payload = get_report_history().get(report_id)
+    if payload is None:
+        return
+    for key in REPORT_TEXT_FIELDS:
+        if key in payload:
+            st.session_state[key] = payload[key]
+    if payload.get('purpose') in SAMPLE_TYPES_EN:
+        st.session_state.purpose = payload['purpose']
+    if payload.get('review_date'):
+        st.session_state.review_date = payload['review_date']
+    if st.session_state.get('measurement_input') == "grid":
+        # Rebuild the grid from the loaded values
+        switch_measurement_input()
+
+def generate_pdf(payload=None, deterministic=PDF_DETERMINISTIC):
+    """Generate Sample Review PDF report
+    
+    Returns (PDF buffer, whether every translation completed); a PDF with
+    values left untranslated must not be cached.
+    """
+    # Reportlab is loaded on the first report, not on every rerun
+    from report import render_report_pdf
+    
+    if payload is None:
+        payload = get_report_payload()
+    
+    # Translate user content in one batch unless the PDF is in the source language
+    report_texts = get_report_texts(payload)
+    complete = True
+    if payload['pdf_language'] != SOURCE_LANGUAGE:
+        result = translate_batch(
+            report_texts, payload['pdf_language'], batched=st.session_state.get('batch_translation', True)
         )
-        
-        return Paragraph(text, custom_style)
-    
-    # Build the PDF content
-    elements.append(Spacer(1, 10))
-    
-    # Title based on language
-    elements.append(Paragraph(get_pdf_text("title", pdf_lang), title_style))
-    elements.append(Paragraph(get_pdf_text("page_num", pdf_lang), subtitle_style))
-    elements.append(Spacer(1, 10))
-    
-    # Get values from session state and translate if needed
-    style_no_val = st.session_state.get('style_no', '')
-    size_val = st.session_state.get('size', '')
-    factory_val = st.session_state.get('factory', '')
-    purpose_val = st.session_state.get('purpose', '')
-    brand_val = st.session_state.get('brand', '')
-    last_no_val = st.session_state.get('last_no', '')
-    sales_val = st.session_state.get('sales', '')
-    new_old_val = st.session_state.get('new_old', '')
-    outsole_no_val = st.session_state.get('outsole_no', '')
-    review_date_val = st.session_state.get('review_date', datetime.now())
-    
-    # Translate user-filled content if PDF language is Chinese
-    if pdf_lang == "zh":
-        style_no_val = translate_user_content(style_no_val, "zh")
-        size_val = translate_user_content(size_val, "zh")
-        factory_val = translate_user_content(factory_val, "zh")
-        brand_val = translate_user_content(brand_val, "zh")
-        last_no_val = translate_user_content(last_no_val, "zh")
-        sales_val = translate_user_content(sales_val, "zh")
-        new_old_val = translate_user_content(new_old_val, "zh")
-        outsole_no_val = translate_user_content(outsole_no_val, "zh")
-    
-    # Get appropriate sample type based on language
-    if pdf_lang == "zh":
-        purpose_display = SAMPLE_TYPES_ZH.get(purpose_val, purpose_val)
-    else:
-        purpose_display = SAMPLE_TYPES_EN.get(purpose_val, purpose_val)
-    
-    # Basic Information Table - Single language based on PDF language
-    basic_data = [
-        [
-            create_paragraph(get_pdf_text("style_no", pdf_lang), bold=True), 
-            create_paragraph(style_no_val),
-            create_paragraph(get_pdf_text("size", pdf_lang), bold=True),
-            create_paragraph(size_val)
-        ],
-        [
-            create_paragraph(get_pdf_text("factory", pdf_lang), bold=True), 
-            create_paragraph(factory_val),
-            create_paragraph(get_pdf_text("purpose", pdf_lang), bold=True),
-            create_paragraph(purpose_display)
-        ],
-        [
-            create_paragraph(get_pdf_text("brand", pdf_lang), bold=True), 
-            create_paragraph(brand_val),
-            create_paragraph(get_pdf_text("last_no", pdf_lang), bold=True),
-            create_paragraph(last_no_val)
-        ],
-        [
-            create_paragraph(get_pdf_text("sales", pdf_lang), bold=True), 
-            create_paragraph(sales_val),
-            create_paragraph(get_pdf_text("new_old", pdf_lang), bold=True),
-            create_paragraph(new_old_val)
-        ],
-        [
-            create_paragraph(get_pdf_text("outsole_no", pdf_lang), bold=True), 
-            create_paragraph(outsole_no_val),
-            create_paragraph(get_pdf_text("review", pdf_lang), bold=True),
-            create_paragraph(review_date_val.strftime('%Y-%m-%d') if hasattr(review_date_val, 'strftime') else str(review_date_val))
-        ]
-    ]
-    
-    basic_table = Table(basic_data, colWidths=[1.2*inch, 2.4*inch, 1.2*inch, 2.4*inch])
-    basic_table.setStyle(TableStyle([
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#e0e0e0')),
-        ('BACKGROUND', (2, 0), (2, -1), colors.HexColor('#e0e0e0')),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-    ]))
-    elements.append(basic_table)
-    elements.append(Spacer(1, 15))
-    
-    # Measurement Check Table - Single language
-    measurement_data = []
-    
-    # Header row - only one set of headers
-    if pdf_lang == "zh":
-        check_items = MEASUREMENT_ITEMS_ZH
-    else:
-        check_items = MEASUREMENT_ITEMS_EN
+        report_texts, complete = result.texts, result.complete
     
-    # Create two columns for measurements
-    left_items = check_items["left"]
-    right_items = check_items["right"]
-    
-    # Get maximum length for iteration
-    max_items = max(len(left_items), len(right_items))
-    
-    for i in range(max_items):
-        row = []
-        
-        # Left side items
-        if i < len(left_items):
-            item_name, item_key = left_items[i]
-            # Get measurement values from session state
-            # Use English keys for session state regardless of language
-            if pdf_lang == "zh":
-                # For Chinese PDF, use English measurement items to get keys
-                eng_item = MEASUREMENT_ITEMS_EN["left"][i][1] if i < len(MEASUREMENT_ITEMS_EN["left"]) else ""
-            else:
-                eng_item = item_key
-            
-            if eng_item:
-                first_val = st.session_state.get(f'{eng_item.lower().replace(" ", "_")}_first', '')
-                second_val = st.session_state.get(f'{eng_item.lower().replace(" ", "_")}_second', '')
-                third_val = st.session_state.get(f'{eng_item.lower().replace(" ", "_")}_third', '')
-                fourth_val = st.session_state.get(f'{eng_item.lower().replace(" ", "_")}_fourth', '')
-                
-                # Translate measurement values if PDF language is Chinese
-                if pdf_lang == "zh":
-                    first_val = translate_user_content(first_val, "zh") if first_val else ''
-                    second_val = translate_user_content(second_val, "zh") if second_val else ''
-                    third_val = translate_user_content(third_val, "zh") if third_val else ''
-                    fourth_val = translate_user_content(fourth_val, "zh") if fourth_val else ''
-            else:
-                first_val = second_val = third_val = fourth_val = ''
-            
-            row.extend([
-                create_paragraph(item_name),
-                create_paragraph(first_val),
-                create_paragraph(second_val),
-                create_paragraph(third_val),
-                create_paragraph(fourth_val)
-            ])
-        else:
-            # Empty cells for left side
-            row.extend([create_paragraph("")] * 5)
-        
-        # Add spacer column
-        row.append(create_paragraph(""))
-        
-        # Right side items
-        if i < len(right_items):
-            item_name, item_key = right_items[i]
-            # Get measurement values from session state
-            # Use English keys for session state regardless of language
-            if pdf_lang == "zh":
-                # For Chinese PDF, use English measurement items to get keys
-                eng_item = MEASUREMENT_ITEMS_EN["right"][i][1] if i < len(MEASUREMENT_ITEMS_EN["right"]) else ""
-            else:
-                eng_item = item_key
-            
-            if eng_item:
-                first_val = st.session_state.get(f'{eng_item.lower().replace(" ", "_")}_first', '')
-                second_val = st.session_state.get(f'{eng_item.lower().replace(" ", "_")}_second', '')
-                third_val = st.session_state.get(f'{eng_item.lower().replace(" ", "_")}_third', '')
-                fourth_val = st.session_state.get(f'{eng_item.lower().replace(" ", "_")}_fourth', '')
-                
-                # Translate measurement values if PDF language is Chinese
-                if pdf_lang == "zh":
-                    first_val = translate_user_content(first_val, "zh") if first_val else ''
-                    second_val = translate_user_content(second_val, "zh") if second_val else ''
-                    third_val = translate_user_content(third_val, "zh") if third_val else ''
-                    fourth_val = translate_user_content(fourth_val, "zh") if fourth_val else ''
-            else:
-                first_val = second_val = third_val = fourth_val = ''
-            
-            row.extend([
-                create_paragraph(item_name),
-                create_paragraph(first_val),
-                create_paragraph(second_val),
-                create_paragraph(third_val),
-                create_paragraph(fourth_val)
-            ])
-        else:
-            # Empty cells for right side
-            row.extend([create_paragraph("")] * 5)
-        
-        measurement_data.append(row)
-    
-    # Create the measurement table
-    measurement_table = Table(measurement_data, colWidths=[1.2*inch, 0.6*inch, 0.6*inch, 0.6*inch, 0.6*inch, 0.2*inch, 1.2*inch, 0.6*inch, 0.6*inch, 0.6*inch, 0.6*inch])
-    measurement_table.setStyle(TableStyle([
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('FONTSIZE', (0, 0), (-1, -1), 8),
-        ('ROWBACKGROUNDS', (0, 0), (-1, -1), [colors.white, colors.HexColor('#f7fafc')])
-    ]))
-    elements.append(measurement_table)
-    elements.append(Spacer(1, 15))
-    
-    # Sock Foam special section
-    if pdf_lang == "zh":
-        sock_foam_label = "鞋垫"
-    else:
-        sock_foam_label = "Sock Foam"
-    
-    sock_foam_after = st.session_state.get('sock_foam_after', '')
-    sock_foam_before = st.session_state.get('sock_foam_before', '')
-    
-    # Translate sock foam values if PDF language is Chinese
-    if pdf_lang == "zh":
-        sock_foam_after = translate_user_content(sock_foam_after, "zh") if sock_foam_after else ''
-        sock_foam_before = translate_user_content(sock_foam_before, "zh") if sock_foam_before else ''
-    
-    sock_data = [
-        [
-            create_paragraph(sock_foam_label, bold=True),
-            create_paragraph(get_pdf_text("after", pdf_lang)),
-            create_paragraph(sock_foam_after),
-            create_paragraph(get_pdf_text("before", pdf_lang)),
-            create_paragraph(sock_foam_before)
-        ]
-    ]
-    
-    sock_table = Table(sock_data, colWidths=[1.2*inch, 0.8*inch, 1.2*inch, 0.8*inch, 1.2*inch])
-    sock_table.setStyle(TableStyle([
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('FONTSIZE', (0, 0), (-1, -1), 8),
-    ]))
-    elements.append(sock_table)
-    elements.append(Spacer(1, 15))
-    
-    # Conclusion Section
-    conclusion_val = st.session_state.get('conclusion', '')
-    
-    # Translate conclusion if PDF language is Chinese
-    if pdf_lang == "zh":
-        conclusion_val = translate_user_content(conclusion_val, "zh") if conclusion_val else ''
-    
-    conclusion_label = f"{get_pdf_text('conclusion', pdf_lang)}:"
-    conclusion_row = [
-        create_paragraph(conclusion_label, bold=True),
-        create_paragraph(conclusion_val, ParagraphStyle('Conclusion', parent=normal_style, fontSize=9, alignment=TA_LEFT))
-    ]
-    
-    conclusion_table = Table([conclusion_row], colWidths=[1.5*inch, 6*inch])
-    conclusion_table.setStyle(TableStyle([
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('BACKGROUND', (0, 0), (0, 0), colors.HexColor('#e0e0e0')),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
-    elements.append(conclusion_table)
-    elements.append(Spacer(1, 20))
-    
-    # Disclaimer Section - Single language
-    elements.append(create_paragraph(get_pdf_text("disclaimer", pdf_lang), ParagraphStyle('Disclaimer', parent=normal_style, fontSize=8, alignment=TA_LEFT)))
-    elements.append(Spacer(1, 15))
-    
-    # Signatures
-    grandstep_tech_val = st.session_state.get('grandstep_tech', '')
-    factory_rep_val = st.session_state.get('factory_representative', '')
+    return render_report_pdf(payload, report_texts, deterministic), complete
+
+def generate_report_bundle(payload, languages, combined=False, deterministic=PDF_DETERMINISTIC, filename="sample_review"):
+    """Generate the report in several PDF languages: a ZIP of PDFs, or one combined PDF
     
-    # Translate signature names if PDF language is Chinese
-    if pdf_lang == "zh":
-        grandstep_tech_val = translate_user_content(grandstep_tech_val, "zh") if grandstep_tech_val else ''
-        factory_rep_val = translate_user_content(factory_rep_val, "zh") if factory_rep_val else ''
+    Returns (buffer, whether every translation completed), like generate_pdf().
+    """
+    from report import render_report_bundle
     
-    signature_data = [
-        [
-            create_paragraph(get_pdf_text("grandstep_tech", pdf_lang), bold=True),
-            create_paragraph(grandstep_tech_val),
-            create_paragraph(""),
-            create_paragraph(get_pdf_text("factory_rep", pdf_lang), bold=True),
-            create_paragraph(factory_rep_val)
-        ]
+    # The source texts are read once; every language is translated at the same time
+    report_texts, complete = translate_languages(
+        get_report_texts(payload), languages, batched=st.session_state.get('batch_translation', True)
+    )
+    return render_report_bundle(payload, report_texts, combined, deterministic, filename=filename), complete
+
+def report_languages():
+    """The PDF language followed by the additional languages selected in the sidebar"""
+    extra = [
+        language for language in st.session_state.get('extra_pdf_languages', [])
+        if language != st.session_state.pdf_language
     ]
-    
-    signature_table = Table(signature_data, colWidths=[1.5*inch, 2*inch, 0.5*inch, 1.5*inch, 2*inch])
-    signature_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    elements.append(signature_table)
-    
-    # Build PDF
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer
+    return [st.session_state.pdf_language] + extra
 
 # Sidebar with enhanced filters
 with st.sidebar:
@@ -1026,11 +599,61 @@ with st.sidebar:
     
     pdf_language = st.selectbox(
         "PDF Report Language",
-        ["English", "Mandarin"],
-        index=0 if st.session_state.pdf_language == "en" else 1,
+        list(PDF_LANGUAGES.values()),
+        index=list(PDF_LANGUAGES).index(st.session_state.pdf_language),
         key="pdf_lang_select"
     )
-    st.session_state.pdf_language = "en" if pdf_language == "English" else "zh"
+    st.session_state.pdf_language = next(code for code, name in PDF_LANGUAGES.items() if name == pdf_language)
+    
+    st.multiselect(
+        "Additional PDF Languages",
+        list(PDF_LANGUAGES),
+        format_func=PDF_LANGUAGES.get,
+        key="extra_pdf_languages",
+        help="Generate the same report in more languages at once; the translations run concurrently. The PDF language always comes first."
+    )
+    if len(report_languages()) > 1:
+        st.radio(
+            "Multi-language Output",
+            list(MULTI_LANGUAGE_OUTPUTS.keys()),
+            format_func=MULTI_LANGUAGE_OUTPUTS.get,
+            key="multi_output",
+            horizontal=True,
+            help="One PDF per language in a ZIP file, or every language in one PDF"
+        )
+    
+    if any(language != SOURCE_LANGUAGE for language in report_languages()):
+        st.checkbox(
+            "Batch translate report fields",
+            value=True,
+            key="batch_translation",
+            help="Send all report fields to the translation API in one request instead of one request per field"
+        )
+        st.checkbox(
+            "Translate while typing",
+            key="pretranslate",
+            help="Translate each field in the background as soon as it changes, so generating the report finds the translations ready"
+        )
+        if st.session_state.get('pretranslate') and background_translator.pending(pretranslation_owner()):
+            st.caption(f"{background_translator.pending(pretranslation_owner())} field value(s) translating in the background")
+    
+    # Input mode: how edits in the report tabs trigger reruns
+    st.markdown(f'#### {ICONS["settings"]} Input Settings')
+    st.selectbox(
+        "Input Mode",
+        list(INPUT_MODES.keys()),
+        format_func=INPUT_MODES.get,
+        key="input_mode",
+        help="Live reruns the page on every edit. Apply per section sends a tab's edits when you press Apply. Rerun section only refreshes just the tab being edited."
+    )
+    st.selectbox(
+        "Measurement Input",
+        list(MEASUREMENT_INPUTS.keys()),
+        format_func=MEASUREMENT_INPUTS.get,
+        key="measurement_input",
+        on_change=switch_measurement_input,
+        help="Field per cell shows one text box per measurement. Single grid edits every measurement in one table, which is much lighter to rerun and send to the browser."
+    )
     
     # Location filter with enhanced UI
     st.markdown(f'#### {ICONS["location"]} Location Settings')
@@ -1052,8 +675,7 @@ with st.sidebar:
     
     # Timezone information
     st.markdown(f'#### {ICONS["time"]} Timezone Info')
-    china_tz = pytz.timezone('Asia/Shanghai')
-    current_time = datetime.now(china_tz)
+    current_time = datetime.now(CHINA_TZ)
     st.metric(
         "Local Time", 
         current_time.strftime('%H:%M:%S'),
@@ -1061,11 +683,109 @@ with st.sidebar:
     )
     
     # Translation status
-    if openai_client:
+    if translator.available and translator.breaker.is_open:
+        st.error(
+            f"{ICONS['error']} Translation API: Paused after repeated errors "
+            f"(retrying in {translator.breaker.retry_in():.0f}s)"
+        )
+    elif translator.available:
         st.success(f"{ICONS['success']} Translation API: Active")
     else:
         st.warning(f"{ICONS['warning']} Translation API: Not Configured")
     
+    cache_stats = translation_cache.stats()
+    st.caption(
+        f"Translation cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+        f"({cache_stats['hit_rate']:.0%}), {cache_stats['disk_entries']} stored"
+    )
+    memory_stats = translation_memory.stats()
+    st.caption(
+        f"Glossary & memory: {memory_stats['hits']} hits / {memory_stats['misses']} misses "
+        f"({memory_stats['hit_rate']:.0%}), {memory_stats['glossary_entries']} terms, "
+        f"{memory_stats['memory_entries']} learned"
+    )
+    
+    # Add domain terms to the editable glossary (glossary.json)
+    with st.expander(f"{ICONS['language']} Glossary"):
+        with st.form("glossary_form", clear_on_submit=True, border=False):
+            glossary_term = st.text_input("English term", placeholder="Too tight at toe box")
+            glossary_translation = st.text_input("Chinese translation", placeholder="鞋头处太紧")
+            if st.form_submit_button("Add term", use_container_width=True):
+                if glossary_term.strip() and glossary_translation.strip():
+                    translation_memory.add_term(glossary_term, "zh", glossary_translation.strip())
+                    st.success(f"{ICONS['success']} Added \"{glossary_term.strip()}\"")
+                else:
+                    st.error(f"{ICONS['error']} Enter both the term and its translation")
+    
+    # Search the reports generated so far; one page is read at a time
+    with st.expander(f"{ICONS['basic_info']} Report History"):
+        # Expanders run even when closed; the history is opened only once asked for
+        if st.toggle("Search reports", key="history_open"):
+            from report_history import DEFAULT_PAGE_SIZE
+            
+            report_history = get_report_history()
+            history_prefixes = {
+                field: st.text_input(label, key=f"history_{field}", on_change=reset_history_page)
+                for field, label in [
+                    ("style_no", "Style No. starts with"), ("factory", "Factory starts with"),
+                    ("brand", "Brand starts with"), ("last_no", "Last No. starts with")
+                ]
+            }
+            history_dates = st.date_input(
+                "Review date between", value=(), key="history_dates", on_change=reset_history_page
+            )
+            date_from, date_to = (tuple(history_dates) + (None, None))[:2]
+            history_rows, history_total = report_history.search(
+                date_from, date_to, page=st.session_state.get('history_page', 1), **history_prefixes
+            )
+            history_pages = max(1, -(-history_total // DEFAULT_PAGE_SIZE))
+            if st.session_state.get('history_page', 1) > history_pages:
+                # Fewer matches than before, e.g. after a report was added elsewhere
+                st.session_state.history_page = history_pages
+                history_rows, _ = report_history.search(
+                    date_from, date_to, page=history_pages, **history_prefixes
+                )
+            history_page = st.session_state.get('history_page', 1)
+            
+            if history_rows:
+                st.dataframe(
+                    [
+                        {
+                            "Style No.": row['style_no'], "Factory": row['factory'], "Brand": row['brand'],
+                            "Last No.": row['last_no'], "Review Date": row['review_date']
+                        }
+                        for row in history_rows
+                    ],
+                    hide_index=True,
+                    width="stretch"
+                )
+            st.caption(f"{history_total} report(s), page {history_page} of {history_pages}")
+            prev_col, next_col = st.columns(2)
+            with prev_col:
+                st.button(
+                    "Previous", key="history_previous", on_click=turn_history_page, args=(-1,),
+                    disabled=history_page <= 1, use_container_width=True
+                )
+            with next_col:
+                st.button(
+                    "Next", key="history_next", on_click=turn_history_page, args=(1,),
+                    disabled=history_page >= history_pages, use_container_width=True
+                )
+            if history_rows:
+                history_choice = st.selectbox(
+                    "Report",
+                    [row['id'] for row in history_rows],
+                    format_func={
+                        row['id']: f"{row['style_no']} · {row['factory']} · {row['review_date'] or ''}"
+                        for row in history_rows
+                    }.get,
+                    key="history_choice"
+                )
+                st.button(
+                    "Load into form", key="history_load", on_click=load_history_report, args=(history_choice,),
+                    use_container_width=True
+                )
+    
     st.markdown("---")
     
     # Sample Types Information
@@ -1095,14 +815,11 @@ st.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
-# Create tabs for better organization
-tab1, tab2, tab3 = st.tabs([
-    f"{ICONS['basic_info']} Basic Info",
-    f"{ICONS['measurements']} Measurements",
-    f"{ICONS['conclusion']} Conclusion"
-])
-
-with tab1:
+# Report input sections, one per tab. They are rendered according to the
+# input mode chosen in the sidebar; every mode writes the same session-state
+# keys, which generate_pdf() reads.
+def basic_info_section():
+    """Basic information tab"""
     # Basic Information Section
     st.markdown(f"""
     <div class="section-header">
@@ -1115,70 +832,71 @@ with tab1:
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        style_no = st.text_input(
+        st.text_input(
             f"{ICONS['style']} {get_text('style_no')}", 
             placeholder="STYLE-2024-001",
             key="style_no"
         )
         
-        factory = st.text_input(
+        st.text_input(
             f"{ICONS['factory']} {get_text('factory')}", 
             placeholder="ABC Manufacturing Co., Ltd.",
             key="factory"
         )
         
-        sales = st.text_input(
+        st.text_input(
             f"{ICONS['sales']} {get_text('sales')}", 
             placeholder="Sales Representative",
             key="sales"
         )
     
     with col2:
-        size = st.text_input(
+        st.text_input(
             f"{ICONS['measure']} {get_text('size')}", 
             placeholder="US 8, EU 41",
             key="size"
         )
         
-        purpose = st.selectbox(
+        st.selectbox(
             f"{ICONS['info']} {get_text('purpose')}",
             list(SAMPLE_TYPES_EN.keys()),
             key="purpose"
         )
         
-        new_old = st.selectbox(
+        st.selectbox(
             f"{ICONS['info']} {get_text('new_old')}",
             ["New", "Old", "Revised"],
             key="new_old"
         )
     
     with col3:
-        brand = st.text_input(
+        st.text_input(
             f"{ICONS['brand']} {get_text('brand')}", 
             placeholder="Brand Name",
             key="brand"
         )
         
-        last_no = st.text_input(
+        st.text_input(
             f"{ICONS['measure']} {get_text('last_no')}", 
             placeholder="Last #12345",
             key="last_no"
         )
         
-        outsole_no = st.text_input(
+        st.text_input(
             f"{ICONS['measure']} {get_text('outsole_no')}", 
             placeholder="OS-2024-001",
             key="outsole_no"
         )
     
     # Review date
-    review_date = st.date_input(
+    st.date_input(
         f"{ICONS['time']} {get_text('review_date')}", 
         datetime.now(),
         key="review_date"
     )
 
-with tab2:
+def measurements_section():
+    """Measurements tab"""
     # Measurements Section
     st.markdown(f"""
     <div class="section-header">
@@ -1189,6 +907,10 @@ with tab2:
     
     st.info(f"{ICONS['info']} Enter measurement data for each check item. Leave blank if not applicable.")
     
+    if st.session_state.get('measurement_input') == "grid":
+        measurement_grid()
+        return
+    
     # Create two columns for left and right measurement items
     col_left, col_right = st.columns(2)
     
@@ -1200,15 +922,9 @@ with tab2:
         
         for item_en, item_key in measurements_left:
             st.markdown(f"**{item_en}**")
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.text_input("First", key=f"{item_key.lower().replace(' ', '_')}_first", label_visibility="collapsed")
-            with col2:
-                st.text_input("Second", key=f"{item_key.lower().replace(' ', '_')}_second", label_visibility="collapsed")
-            with col3:
-                st.text_input("Third", key=f"{item_key.lower().replace(' ', '_')}_third", label_visibility="collapsed")
-            with col4:
-                st.text_input("Fourth", key=f"{item_key.lower().replace(' ', '_')}_fourth", label_visibility="collapsed")
+            for column, round_name, key in zip(st.columns(4), MEASUREMENT_ROUNDS, MEASUREMENT_FIELDS[item_key]):
+                with column:
+                    st.text_input(round_name.capitalize(), key=key, label_visibility="collapsed")
     
     with col_right:
         st.markdown(f"#### {ICONS['measure']} Check Items")
@@ -1216,7 +932,7 @@ with tab2:
         # Show English measurements in UI regardless of language
         measurements_right = MEASUREMENT_ITEMS_EN["right"]
         
-        for i, (item_en, item_key) in enumerate(measurements_right):
+        for item_en, item_key in measurements_right:
             if item_en == "Sock Foam":
                 # Special handling for Sock Foam
                 st.markdown("**Sock Foam**")
@@ -1227,17 +943,30 @@ with tab2:
                     st.text_input("Before", key="sock_foam_before", label_visibility="collapsed")
             else:
                 st.markdown(f"**{item_en}**")
-                col1, col2, col3, col4 = st.columns(4)
-                with col1:
-                    st.text_input("First", key=f"{item_key.lower().replace(' ', '_')}_first", label_visibility="collapsed")
-                with col2:
-                    st.text_input("Second", key=f"{item_key.lower().replace(' ', '_')}_second", label_visibility="collapsed")
-                with col3:
-                    st.text_input("Third", key=f"{item_key.lower().replace(' ', '_')}_third", label_visibility="collapsed")
-                with col4:
-                    st.text_input("Fourth", key=f"{item_key.lower().replace(' ', '_')}_fourth", label_visibility="collapsed")
+                for column, round_name, key in zip(st.columns(4), MEASUREMENT_ROUNDS, MEASUREMENT_FIELDS[item_key]):
+                    with column:
+                        st.text_input(round_name.capitalize(), key=key, label_visibility="collapsed")
 
-with tab3:
+def measurement_grid():
+    """Every measurement in one data editor instead of a text input per cell"""
+    if 'measurement_base' not in st.session_state:
+        switch_measurement_input()
+    st.session_state.measurement_edited = st.data_editor(
+        st.session_state.measurement_base,
+        key="measurement_grid",
+        use_container_width=True,
+        height=(len(GRID_ITEMS) + 1) * 35 + 3,
+        column_config={
+            **{column: st.column_config.TextColumn(column) for column in GRID_ROUND_COLUMNS},
+            **{
+                column: st.column_config.TextColumn(f"Sock Foam {column}", help="Sock Foam row only")
+                for column in GRID_SOCK_FOAM_COLUMNS
+            },
+        },
+    )
+
+def conclusion_section():
+    """Conclusion and signatures tab"""
     # Conclusion and Signatures Section
     st.markdown(f"""
     <div class="section-header">
@@ -1246,13 +975,33 @@ with tab3:
     </div>
     """, unsafe_allow_html=True)
     
-    conclusion = st.text_area(
+    st.text_area(
         "Conclusion",
         placeholder="Enter overall conclusion and notes here...",
         height=150,
         key="conclusion"
     )
     
+    # Sample photos, processed once on upload and embedded in the PDF
+    st.markdown(f"#### {ICONS['photo']} {get_text('picture')}")
+    st.file_uploader(
+        f"{ICONS['upload']} {get_text('upload_photo')}",
+        type=["jpg", "jpeg", "png", "webp"],
+        accept_multiple_files=True,
+        key="photos",
+        help=f"Up to {PHOTO_MAX_COUNT} photos; they are downscaled for print before they go into the PDF"
+    )
+    photos = uploaded_photos()
+    if len(st.session_state.get('photos') or []) > PHOTO_MAX_COUNT:
+        st.warning(f"{ICONS['warning']} Only the first {PHOTO_MAX_COUNT} photos are included in the report.")
+    for row_start in range(0, len(photos), 4):
+        for column, (name, photo) in zip(st.columns(4), photos[row_start:row_start + 4]):
+            with column:
+                if photo is None:
+                    st.error(f"{ICONS['error']} {name}: not a readable image")
+                else:
+                    st.image(photo.thumbnail, caption=name, width="stretch")
+    
     st.markdown(f"""
     <div class="section-header">
         <span class="section-header-icon">{ICONS["signatures"]}</span>
@@ -1264,14 +1013,14 @@ with tab3:
     col1, col2 = st.columns(2)
     
     with col1:
-        grandstep_tech = st.text_input(
+        st.text_input(
             f"{ICONS['tech']} {get_text('grandstep_tech')}",
             placeholder="GrandStep Technical Representative",
             key="grandstep_tech"
         )
     
     with col2:
-        factory_representative = st.text_input(
+        st.text_input(
             f"{ICONS['factory']} {get_text('factory_representative')}",
             placeholder="Factory Representative Name",
             key="factory_representative"
@@ -1282,6 +1031,111 @@ with tab3:
     st.markdown(f"#### {ICONS['warning']} {get_text('disclaimer')}")
     st.warning(get_text("disclaimer_text"))
 
+def render_input_section(section, form_key):
+    """Render one input section in the selected input mode
+    
+    live: every committed edit reruns the whole script.
+    form: edits are sent together when the section's Apply button is pressed.
+    fragment: edits rerun only this section.
+    
+    Changed fields are then queued for background translation when that is
+    turned on (see pretranslate_changes).
+    """
+    input_mode = st.session_state.get('input_mode', 'live')
+    if input_mode == "form":
+        with st.form(form_key, border=False):
+            section()
+            st.form_submit_button(f"{ICONS['success']} {get_text('apply_changes')}", use_container_width=True)
+        pretranslate_changes()
+    elif input_mode == "fragment":
+        def section_fragment():
+            section()
+            pretranslate_changes()
+        st.fragment(section_fragment)()
+    else:
+        section()
+        pretranslate_changes()
+
+@st.fragment
+def trends_section():
+    """Measurement trends across the stored reports
+    
+    A fragment: changing a filter here reruns only this tab.
+    """
+    st.markdown(f"""
+    <div class="section-header">
+        <span class="section-header-icon">{ICONS["dimension"]}</span>
+        Measurement Trends
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Tabs run even when not selected; the history is read only once asked for
+    if not st.toggle("Show trends", key="trend_open"):
+        return
+    from measurement_analytics import DEFAULT_TOLERANCE, GROUP_COLUMNS, ROUND_ITEMS
+    
+    cube = get_history_cube().refresh()
+    if not len(cube):
+        st.info(f"{ICONS['info']} Generated reports appear here once they are saved to the report history.")
+        return
+    
+    filter_cols = st.columns(3)
+    prefixes = tuple(
+        (field, column.text_input(f"{label} starts with", key=f"trend_{field}"))
+        for column, (field, label) in zip(filter_cols, [("factory", "Factory"), ("last_no", "Last No."), ("brand", "Brand")])
+    )
+    option_cols = st.columns(3)
+    with option_cols[0]:
+        item_key = st.selectbox("Check Item", ROUND_ITEMS, key="trend_item")
+    with option_cols[1]:
+        group_by = st.selectbox("Group By", GROUP_COLUMNS, format_func=TREND_GROUP_LABELS.get, key="trend_group_by")
+    with option_cols[2]:
+        tolerance = st.number_input(
+            "Converged Within", min_value=0.0, value=DEFAULT_TOLERANCE, step=0.1, key="trend_tolerance",
+            help="Largest change between the last two rounds, in the item's own unit, that counts as converged"
+        )
+    
+    trends = measurement_trends(cube, cube.last_id, prefixes, item_key, group_by, tolerance)
+    item = trends["item"]
+    metric_cols = st.columns(4)
+    metric_cols[0].metric("Reports", f"{trends['reports']:,}")
+    metric_cols[1].metric(f"Measured {item_key}", f"{int(item['reports']):,}")
+    metric_cols[2].metric("Mean Final Value", "–" if item.isna()['final'] else f"{item['final']:.2f}")
+    metric_cols[3].metric("Converged", "–" if item.isna()['converged'] else f"{item['converged']:.0%}")
+    
+    chart_cols = st.columns(2)
+    with chart_cols[0]:
+        st.markdown(f"**{item_key}: mean by round**")
+        st.bar_chart(trends["rounds"].rename("Mean"))
+    with chart_cols[1]:
+        st.markdown(f"**{item_key}: mean final value by review month**")
+        st.line_chart(trends["monthly"].rename("Mean final value"))
+    
+    st.markdown(f"**{item_key} by {TREND_GROUP_LABELS[group_by].lower()}**")
+    st.dataframe(trends["groups"].head(TREND_GROUP_ROWS).rename(columns=TREND_STAT_LABELS), width="stretch")
+    with st.expander("All check items"):
+        st.dataframe(trends["items"].rename(columns=TREND_STAT_LABELS), width="stretch")
+
+# Create tabs for better organization
+tab1, tab2, tab3, tab4 = st.tabs([
+    f"{ICONS['basic_info']} Basic Info",
+    f"{ICONS['measurements']} Measurements",
+    f"{ICONS['conclusion']} Conclusion",
+    f"{ICONS['dimension']} Trends"
+])
+
+with tab1:
+    render_input_section(basic_info_section, "basic_info_form")
+
+with tab2:
+    render_input_section(measurements_section, "measurements_form")
+
+with tab3:
+    render_input_section(conclusion_section, "conclusion_form")
+
+with tab4:
+    trends_section()
+
 # Generate PDF Button
 st.markdown("---")
 col1, col2, col3 = st.columns([1, 2, 1])
@@ -1292,7 +1146,31 @@ with col2:
         else:
             with st.spinner(f"{ICONS['time']} {get_text('creating_pdf')}"):
                 try:
-                    pdf_buffer = generate_pdf()
+                    # Reuse the PDF generated earlier for an identical report
+                    payload = get_report_payload()
+                    languages = report_languages()
+                    output = st.session_state.get('multi_output', 'zip') if len(languages) > 1 else 'pdf'
+                    # ZIP entries are named without the time, so cached archives stay valid
+                    report_stem = f"Sample_Review_{st.session_state.get('style_no', '')}_{selected_city}"
+                    file_stem = f"{report_stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                    cache_key = None
+                    if PDF_DETERMINISTIC and output == 'pdf':
+                        cache_key = report_cache_key(payload, deterministic=True)
+                    elif PDF_DETERMINISTIC:
+                        cache_key = report_cache_key(payload, deterministic=True, languages=languages, output=output)
+                    pdf_buffer = pdf_cache.get(cache_key) if cache_key else None
+                    from_cache = pdf_buffer is not None
+                    if not from_cache:
+                        if output == 'pdf':
+                            pdf_buffer, complete = generate_pdf(payload)
+                        else:
+                            pdf_buffer, complete = generate_report_bundle(
+                                payload, languages, combined=output == 'combined', filename=report_stem
+                            )
+                        pdf_buffer = pdf_buffer.getvalue()
+                        # Values that kept their source text are translated next time
+                        if cache_key and complete:
+                            pdf_cache.put(cache_key, pdf_buffer)
                     st.success(f"{ICONS['success']} {get_text('generate_success')}")
                     
                     # Display PDF preview info
@@ -1300,22 +1178,28 @@ with col2:
                         col_info1, col_info2 = st.columns(2)
                         with col_info1:
                             st.metric(get_text("location"), f"{selected_city} ({CHINESE_CITIES[selected_city]})")
-                            st.metric(get_text("report_language"), "Mandarin" if st.session_state.pdf_language == "zh" else "English")
+                            st.metric(get_text("report_language"), ", ".join(PDF_LANGUAGES[language] for language in languages))
                         with col_info2:
-                            china_tz = pytz.timezone('Asia/Shanghai')
-                            current_time = datetime.now(china_tz)
+                            current_time = datetime.now(CHINA_TZ)
                             st.metric(get_text("generated"), current_time.strftime('%H:%M:%S'))
+                            st.metric(get_text("pdf_size"), f"{len(pdf_buffer) / 1024:.0f} KB")
+                        if from_cache:
+                            st.caption(get_text("from_cache"))
+                        elif any(language != SOURCE_LANGUAGE for language in languages):
+                            st.caption(get_text("translated_locally").format(count=st.session_state.get('translated_locally', 0)))
                     
                     # Download button
-                    filename = f"Sample_Review_{st.session_state.get('style_no', '')}_{selected_city}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
                     st.download_button(
                         label=f"{ICONS['download']} {get_text('download_pdf')}",
                         data=pdf_buffer,
-                        file_name=filename,
-                        mime="application/pdf",
+                        file_name=f"{file_stem}.zip" if output == 'zip' else f"{file_stem}.pdf",
+                        mime="application/zip" if output == 'zip' else "application/pdf",
                         use_container_width=True
                     )
                     
+                    # Searchable from the sidebar; identical reports are stored once
+                    get_report_history().save(payload)
+                    
                 except Exception as e:
                     st.error(f"{ICONS['error']} {get_text('error_generating')}: {str(e)}")
 
@@ -1328,7 +1212,7 @@ st.markdown(f"""
     </p>
     <p style='font-size: 0.9rem; color: #666666;'>
         {ICONS['location']} {get_text('location')}: {selected_city} ({CHINESE_CITIES[selected_city]}) | 
-        {ICONS['language']} {get_text('report_language')}: {'Mandarin' if st.session_state.pdf_language == 'zh' else 'English'}
+        {ICONS['language']} {get_text('report_language')}: {PDF_LANGUAGES[st.session_state.pdf_language]}
     </p>
     <p style='font-size: 0.8rem; color: #999999; margin-top: 1rem;'>
         {get_text('powered_by')} | {get_text('copyright')}
@@ -1342,5 +1226,59 @@ with st.sidebar:
         st.code("""
 # Create .env file in your project folder
 OPENAI_API_KEY=your-api-key-here
+
+# Optional: shared translation cache
+TRANSLATION_CACHE_PATH=translations.sqlite3
+TRANSLATION_CACHE_MEMORY_MB=16
+TRANSLATION_CACHE_TTL_DAYS=90
+TRANSLATION_CACHE_MAX_ENTRIES=200000
+
+# Optional: glossary and translation memory
+TRANSLATION_GLOSSARY_PATH=glossary.json
+TRANSLATION_MEMORY_PATH=translation_memory.jsonl
+TRANSLATION_MEMORY_MAX_ENTRIES=50000
+TRANSLATION_MEMORY_FUZZY=0
+TRANSLATION_MEMORY_TTL_DAYS=90
+
+# Optional: concurrent translation
+TRANSLATION_MAX_WORKERS=8
+TRANSLATION_DEADLINE_SECONDS=20
+
+# Optional: retries and circuit breaker
+TRANSLATION_REQUEST_TIMEOUT=15
+TRANSLATION_RETRIES=2
+TRANSLATION_BREAKER_FAILURES=5
+TRANSLATION_BREAKER_COOLDOWN_SECONDS=30
+
+# Optional: background translation workers ("Translate while typing")
+TRANSLATION_PRETRANSLATE_WORKERS=2
+
+# Optional: generated PDF cache (used only with PDF_DETERMINISTIC=1)
+PDF_CACHE_DIR=.pdf_cache
+PDF_CACHE_MAX_MB=200
+PDF_DETERMINISTIC=1
+
+# Optional: history of generated reports (SQLite)
+REPORT_HISTORY_PATH=report_history.sqlite3
+
+# Optional: draw values onto a precompiled page skeleton
+PDF_FAST_RENDER=1
+
+# Optional: sample photo size and cache
+PHOTO_DPI=150
+PHOTO_JPEG_QUALITY=80
+PHOTO_MAX_COUNT=8
+PHOTO_CACHE_MAX_MB=64
+
+# Optional: TrueType fonts for Vietnamese PDFs (default: DejaVu Sans if installed)
+PDF_UNICODE_FONT=/path/to/NotoSans-Regular.ttf
+PDF_UNICODE_FONT_BOLD=/path/to/NotoSans-Bold.ttf
+
+# Optional: smaller PDFs (binary page streams)
+PDF_COMPACT=1
+
+# Optional: embed a TrueType subset for Chinese instead of STSong-Light
+PDF_CJK_FONT=ttf
+PDF_CJK_FONT_PATH=/path/to/simhei.ttf
 """)
         st.info("Restart the app after adding your API key to enable translations.")
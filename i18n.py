@@ -0,0 +1,213 @@
+"""Static UI and PDF text catalog.
+
+English source strings live here; translations live in checked-in catalog
+files (locales/<language>.json). The lookup tables are built once at import,
+so the app makes no API calls and builds no dicts to paint its labels.
+
+Run `python i18n.py [language]` to fill in catalog entries that are missing
+for new or changed English strings. That is the only step that calls the
+translation API.
+"""
+import json
+import os
+import sys
+
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "locales")
+
+# Base English texts for the user interface
+UI_TEXTS_EN = {
+    # Titles and Headers
+    "title": "Factory Sample Review Report",
+    "basic_info": "Basic Information",
+    "measurements": "Sample Measurements",
+    "sample_review": "Sample Review",
+    "conclusion": "Conclusion",
+    "signatures": "Signatures",
+
+    # Buttons
+    "generate_pdf": "Generate PDF Report",
+    "download_pdf": "Download PDF Report",
+
+    # Form Fields
+    "style_no": "Style No.",
+    "size": "Size",
+    "factory": "Factory",
+    "purpose": "Purpose",
+    "brand": "Brand",
+    "last_no": "Last No.",
+    "sales": "Sales",
+    "new_old": "New/Old",
+    "outsole_no": "Outsole NO.",
+    "review_date": "Review Date",
+    "check_items": "Check Items",
+    "first": "First",
+    "second": "Second",
+    "third": "Third",
+    "fourth": "Fourth",
+    "measurement_details": "Measurement Details",
+    "picture": "Picture",
+
+    # Footer and Messages
+    "footer_text": "Factory Sample Review System",
+    "generate_success": "PDF Generated Successfully!",
+    "fill_required": "Please fill in at least Style No. and Factory!",
+    "creating_pdf": "Creating your sample review PDF report...",
+    "pdf_details": "PDF Details",
+    "report_language": "Report Language",
+    "generated": "Generated",
+    "location": "Location",
+    "error_generating": "Error generating PDF",
+    "select_location": "Select Location",
+    "user_interface_language": "User Interface Language",
+    "pdf_report_language": "PDF Report Language",
+    "test_location": "Assessment Location",
+    "local_time": "Local Time",
+    "quick_guide": "Quick Guide",
+    "powered_by": "Powered by Streamlit",
+    "copyright": "© 2025 - Factory Sample Review Platform",
+    "upload_photo": "Upload Sample Photo",
+    "conclusion_note": "Conclusion & Notes",
+    "disclaimer": "Disclaimer",
+    "disclaimer_text": "Note: This review information does not release the factory from any responsibilities in the event of claims being received from our customer.",
+    "measurement_check": "Measurement Check Items",
+    "add_measurement": "Add Measurement Point",
+    "grandstep_tech": "GrandStep Tech",
+    "factory_representative": "Factory Representative",
+    "from_cache": "Served from the PDF cache",
+    "pdf_size": "PDF Size",
+    "translated_locally": "{count} field value(s) kept or translated locally, without an API request",
+    "apply_changes": "Apply changes"
+}
+
+# English texts for PDF
+PDF_TEXTS_EN = {
+    "title": "Factory Sample Review Report",
+    "page_num": "Page# 1",
+    "style_no": "Style No.",
+    "size": "Size",
+    "factory": "Factory",
+    "purpose": "Purpose",
+    "brand": "Brand",
+    "last_no": "Last No.",
+    "sales": "Sales",
+    "new_old": "New/Old",
+    "outsole_no": "Outsole NO.",
+    "review": "Review",
+    "check_items": "Check Items",
+    "first": "First",
+    "second": "Second",
+    "third": "Third",
+    "fourth": "Fourth",
+    "conclusion": "Conclusion",
+    "disclaimer": "Note: This review information does not release the factory from any responsibilities in the event of claims being received from our customer.",
+    "grandstep_tech": "GrandStep Tech:",
+    "factory_rep": "Factory Representative:",
+    "after": "After",
+    "before": "Before",
+    "location": "Location:",
+    "header": "FACTORY SAMPLE REVIEW REPORT",
+    "generated": "Generated:",
+    "page_footer": "Page {page}",
+    "photos": "Sample Photos",
+    "contents": "Contents",
+    "page": "Page"
+}
+
+SOURCE_TEXTS = {"ui": UI_TEXTS_EN, "pdf": PDF_TEXTS_EN}
+
+
+def catalog_path(language):
+    """Path of the checked-in catalog file for a language"""
+    return os.path.join(LOCALES_DIR, f"{language}.json")
+
+
+def load_catalog(language):
+    """Read a catalog file; missing files give an empty catalog"""
+    try:
+        with open(catalog_path(language), encoding="utf-8") as f:
+            catalog = json.load(f)
+    except FileNotFoundError:
+        catalog = {}
+    return {namespace: catalog.get(namespace, {}) for namespace in SOURCE_TEXTS}
+
+
+def _compile(namespace, languages):
+    """Build per-language lookup tables with English as the fallback"""
+    tables = {"en": dict(SOURCE_TEXTS[namespace])}
+    for language in languages:
+        table = dict(SOURCE_TEXTS[namespace])
+        table.update(load_catalog(language)[namespace])
+        tables[language] = table
+    return tables
+
+
+CATALOG_LANGUAGES = sorted(
+    name[:-len(".json")] for name in os.listdir(LOCALES_DIR) if name.endswith(".json")
+) if os.path.isdir(LOCALES_DIR) else []
+
+# Compiled lookup tables: UI_TEXTS[language][key], PDF_TEXTS[language][key]
+UI_TEXTS = _compile("ui", CATALOG_LANGUAGES)
+PDF_TEXTS = _compile("pdf", CATALOG_LANGUAGES)
+
+
+def ui_text(key, language, fallback=None):
+    """Look up an interface label"""
+    return UI_TEXTS.get(language, UI_TEXTS["en"]).get(key, fallback or key)
+
+
+def pdf_text(key, language):
+    """Look up a PDF label"""
+    return PDF_TEXTS.get(language, PDF_TEXTS["en"]).get(key, key)
+
+
+def build_catalog(language="zh"):
+    """Translate English strings missing from a catalog and write it back
+
+    Existing entries are kept as they are, so hand-edited translations are
+    never overwritten; entries whose English key no longer exists are
+    dropped. Returns the number of entries added.
+    """
+    from dotenv import load_dotenv
+    from openai import OpenAI
+
+    from translation import LANGUAGE_NAMES
+
+    load_dotenv()
+    client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+
+    catalog = load_catalog(language)
+    added = 0
+    for namespace, source in SOURCE_TEXTS.items():
+        missing = {key: text for key, text in source.items() if key not in catalog[namespace]}
+        if not missing:
+            continue
+        response = client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": f"You are a professional translator for footwear factory quality-control software. Translate every value of the JSON object to {LANGUAGE_NAMES.get(language, language)}. Return a JSON object with exactly the same keys. Keep punctuation such as trailing colons."},
+                {"role": "user", "content": json.dumps(missing, ensure_ascii=False)}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.1
+        )
+        translated = json.loads(response.choices[0].message.content)
+        for key in missing:
+            value = translated.get(key)
+            if isinstance(value, str) and value.strip():
+                catalog[namespace][key] = value.strip()
+                added += 1
+
+    os.makedirs(LOCALES_DIR, exist_ok=True)
+    ordered = {
+        namespace: {key: catalog[namespace][key] for key in source if key in catalog[namespace]}
+        for namespace, source in SOURCE_TEXTS.items()
+    }
+    with open(catalog_path(language), "w", encoding="utf-8") as f:
+        json.dump(ordered, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    return added
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else "zh"
+    print(f"Added {build_catalog(target)} entries to {catalog_path(target)}")
@@ -0,0 +1,280 @@
+"""Numeric analysis of measurement rounds across many reports.
+
+Measurements are entered as free text ("26.5", "26,5 cm", "3°"). They are
+parsed in bulk into one float array of reports x check items x rounds,
+NaN where a cell is blank or holds no number, next to a DataFrame of the
+reports' basic information. Round-to-round changes, convergence and
+per-factory or per-last statistics are whole-array operations on it, so
+they stay fast at tens of thousands of reports.
+
+HistoryCube reads only the reports stored since its last refresh; stored
+reports never change. Each report's text is parsed once, the first time
+it is read, and its array stored back in the report history, so later
+refreshes and other processes read numbers rather than text.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from report_data import MEASUREMENT_FIELDS, MEASUREMENT_ROUNDS
+
+# Check items measured in rounds; Sock Foam is measured after/before instead
+ROUND_ITEMS = tuple(item_key for item_key in MEASUREMENT_FIELDS if item_key != "Sock Foam")
+ITEM_INDEX = {item_key: index for index, item_key in enumerate(ROUND_ITEMS)}
+ROUND_COLUMNS = [round_name.capitalize() for round_name in MEASUREMENT_ROUNDS]
+BLANK_ROUNDS = [""] * len(MEASUREMENT_ROUNDS)
+
+# The first number in a cell; a decimal comma counts as a decimal point
+NUMBER_PATTERN = r"([-+]?\d+(?:[.,]\d+)?)"
+
+# Basic information kept for every report, and the columns statistics can be grouped by
+REPORT_COLUMNS = ("id", "style_no", "factory", "brand", "last_no", "review_date")
+GROUP_COLUMNS = ("factory", "last_no", "brand", "style_no")
+
+# Largest change between the last two rounds, in the item's own unit, for
+# an item to count as converged
+DEFAULT_TOLERANCE = 0.5
+
+
+def parse_measurements(texts):
+    """Parse an array of measurement texts into floats of the same shape, NaN where there is no number"""
+    texts = np.asarray(texts, dtype=object)
+    cells = pd.Series(texts.ravel(), dtype=object)
+    numbers = pd.to_numeric(cells, errors="coerce")
+    # Units, decimal commas and the like: take the first number in the text
+    rest = numbers.isna() & (cells != "")
+    if rest.any():
+        extracted = cells[rest].astype(str).str.extract(NUMBER_PATTERN, expand=False)
+        numbers[rest] = pd.to_numeric(extracted.str.replace(",", ".", regex=False), errors="coerce")
+    return numbers.to_numpy(dtype=float).reshape(texts.shape)
+
+
+def payload_texts(payloads):
+    """Measurement texts of report payloads, reports x items x rounds"""
+    return np.array(
+        [
+            [[payload.get(field, "") or "" for field in MEASUREMENT_FIELDS[item_key]] for item_key in ROUND_ITEMS]
+            for payload in payloads
+        ],
+        dtype=object
+    ).reshape(len(payloads), len(ROUND_ITEMS), len(MEASUREMENT_ROUNDS))
+
+
+def stored_texts(measurements):
+    """Measurement texts of the history's measurements column (item -> rounds), reports x items x rounds"""
+    return np.array(
+        [[values.get(item_key) or BLANK_ROUNDS for item_key in ROUND_ITEMS] for values in measurements],
+        dtype=object
+    ).reshape(len(measurements), len(ROUND_ITEMS), len(MEASUREMENT_ROUNDS))
+
+
+def nanmean(values, axis):
+    """Mean ignoring NaN; NaN (without a warning) where there is nothing to average"""
+    filled = ~np.isnan(values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(filled, values, 0).sum(axis=axis) / filled.sum(axis=axis)
+
+
+def last_two_rounds(values):
+    """Values of the last filled round and the one before it, along the last axis; NaN where there is none"""
+    # One pass per round: four cheap passes beat sorting out positions
+    last = np.full(values.shape[:-1], np.nan)
+    previous = last.copy()
+    for round_index in range(values.shape[-1]):
+        current = values[..., round_index]
+        filled = ~np.isnan(current)
+        np.copyto(previous, last, where=filled)
+        np.copyto(last, current, where=filled)
+    return last, previous
+
+
+def round_spread(values):
+    """Largest minus smallest round along the last axis, NaN where every round is blank"""
+    # fmax/fmin skip NaN
+    high = low = values[..., 0]
+    for round_index in range(1, values.shape[-1]):
+        high = np.fmax(high, values[..., round_index])
+        low = np.fmin(low, values[..., round_index])
+    return high - low
+
+
+def converged_share(last, previous, tolerance):
+    """1.0 where the last two rounds differ by at most tolerance, 0.0 where they
+    differ more, NaN with fewer than two rounds; its mean is the converged share"""
+    changes = np.abs(last - previous)
+    with np.errstate(invalid="ignore"):
+        return np.where(np.isnan(changes), np.nan, (changes <= tolerance).astype(float))
+
+
+class MeasurementCube:
+    """Measurement rounds of many reports as one float array
+
+    values[report, item, round] follows ROUND_ITEMS and MEASUREMENT_ROUNDS;
+    reports holds the basic information of each report, row for row.
+    """
+
+    def __init__(self, values, reports):
+        self.values = values
+        self.reports = reports.reset_index(drop=True)
+        self._codes = {}
+
+    @staticmethod
+    def _report_frame(records):
+        reports = pd.DataFrame([[record.get(column) for column in REPORT_COLUMNS] for record in records],
+                               columns=REPORT_COLUMNS)
+        reports["review_date"] = pd.to_datetime(reports["review_date"].astype(str), format="ISO8601", errors="coerce")
+        return reports
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a cube from ReportHistory.measurement_rows()"""
+        rows = list(rows)
+        values = np.frombuffer(b"".join(row["measurement_values"] for row in rows), dtype="<f8")
+        return cls(values.reshape(len(rows), len(ROUND_ITEMS), len(MEASUREMENT_ROUNDS)), cls._report_frame(rows))
+
+    @classmethod
+    def from_payloads(cls, payloads):
+        """Build a cube from report payloads, e.g. a batch spreadsheet"""
+        payloads = list(payloads)
+        return cls(parse_measurements(payload_texts(payloads)), cls._report_frame(payloads))
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def last_id(self):
+        """Highest history id in the cube, 0 if there is none"""
+        return int(self.reports["id"].max()) if self.reports["id"].notna().any() else 0
+
+    def concat(self, other):
+        """A cube of this cube's reports followed by other's"""
+        if not len(self):
+            return other
+        return MeasurementCube(
+            np.concatenate([self.values, other.values]),
+            pd.concat([self.reports, other.reports], ignore_index=True)
+        )
+
+    def select(self, mask):
+        """A cube of the reports where mask is True"""
+        return MeasurementCube(self.values[mask], self.reports[mask])
+
+    def codes(self, field):
+        """(code of every report, distinct values) of a text column, computed once"""
+        if field not in self._codes:
+            self._codes[field] = pd.factorize(self.reports[field].fillna(""))
+        return self._codes[field]
+
+    def matching(self, **prefixes):
+        """Boolean mask of the reports whose fields start with the given prefixes, ignoring case"""
+        mask = np.ones(len(self), dtype=bool)
+        for field, prefix in prefixes.items():
+            prefix = (prefix or "").strip().lower()
+            if not prefix:
+                continue
+            # Match the distinct values, then the reports by code
+            codes, uniques = self.codes(field)
+            matched = np.flatnonzero(pd.Index(uniques).str.lower().str.startswith(prefix))
+            mask &= np.isin(codes, matched)
+        return mask
+
+    def deltas(self):
+        """Change from each round to the next, reports x items x (rounds - 1)"""
+        return np.diff(self.values, axis=2)
+
+    def final_values(self):
+        """Value of the last filled round, reports x items"""
+        return last_two_rounds(self.values)[0]
+
+    def final_changes(self):
+        """Change between the last two filled rounds, reports x items; NaN with fewer than two"""
+        last, previous = last_two_rounds(self.values)
+        return last - previous
+
+    def spread(self):
+        """Largest minus smallest round, reports x items"""
+        return round_spread(self.values)
+
+    def converged(self, tolerance=DEFAULT_TOLERANCE):
+        """Converged flags (see converged_share), reports x items"""
+        return converged_share(*last_two_rounds(self.values), tolerance)
+
+    def round_means(self):
+        """Mean of every item and round over the reports, as an items x rounds DataFrame"""
+        return pd.DataFrame(nanmean(self.values, axis=0), index=list(ROUND_ITEMS), columns=ROUND_COLUMNS)
+
+    def item_stats(self, tolerance=DEFAULT_TOLERANCE):
+        """Per check item: reports measured, mean first and final values, mean
+        absolute change per round, mean spread and converged share"""
+        last, previous = last_two_rounds(self.values)
+        return pd.DataFrame({
+            "reports": (~np.isnan(self.values)).any(axis=2).sum(axis=0),
+            "first": nanmean(self.values[:, :, 0], axis=0),
+            "final": nanmean(last, axis=0),
+            "mean_change": nanmean(np.abs(self.deltas()), axis=(0, 2)),
+            "spread": nanmean(self.spread(), axis=0),
+            "converged": nanmean(converged_share(last, previous, tolerance), axis=0),
+        }, index=list(ROUND_ITEMS))
+
+    def group_stats(self, by, item_key, tolerance=DEFAULT_TOLERANCE):
+        """The item_stats columns of one check item for every factory, last, brand or style"""
+        if by not in GROUP_COLUMNS:
+            raise ValueError(f"unknown group column {by!r}")
+        values = self.values[:, ITEM_INDEX[item_key], :]
+        last, previous = last_two_rounds(values)
+        codes, uniques = self.codes(by)
+        frame = pd.DataFrame({
+            "group": codes,
+            "measured": (~np.isnan(values)).any(axis=1),
+            "first": values[:, 0],
+            "final": last,
+            "mean_change": nanmean(np.abs(np.diff(values, axis=1)), axis=1),
+            "spread": round_spread(values),
+            "converged": converged_share(last, previous, tolerance),
+        })
+        # groupby's mean skips NaN, like the per-report statistics above
+        stats = frame.groupby("group").agg(
+            reports=("measured", "sum"), first=("first", "mean"), final=("final", "mean"),
+            mean_change=("mean_change", "mean"), spread=("spread", "mean"), converged=("converged", "mean")
+        )
+        stats.index = pd.Index(np.asarray(uniques)[stats.index], name=by)
+        return stats[stats["reports"] > 0].sort_values("reports", ascending=False)
+
+    def monthly_means(self, item_key):
+        """Mean final value of one check item per review month"""
+        months = self.reports["review_date"].to_numpy().astype("datetime64[M]")
+        final = pd.Series(last_two_rounds(self.values[:, ITEM_INDEX[item_key], :])[0])
+        # NaT months are left out by groupby
+        return final.groupby(months).mean().dropna().sort_index()
+
+
+class HistoryCube:
+    """The MeasurementCube of a ReportHistory, extended on refresh with newly stored reports"""
+
+    def __init__(self, history):
+        self.history = history
+        self._lock = threading.Lock()
+        self.cube = MeasurementCube.from_rows([])
+
+    def refresh(self):
+        """Read the reports stored since the last refresh and return the current cube"""
+        with self._lock:
+            rows = list(self.history.measurement_rows(after_id=self.cube.last_id))
+            self._parse_new(rows)
+            if rows:
+                self.cube = self.cube.concat(MeasurementCube.from_rows(rows))
+            return self.cube
+
+    def _parse_new(self, rows):
+        """Parse the rows the history has no numbers for yet and store them back"""
+        missing = [row for row in rows if row["measurement_values"] is None]
+        if not missing:
+            return
+        measurements = self.history.stored_measurements([row["id"] for row in missing])
+        # One vectorized pass for all of them
+        values = parse_measurements(stored_texts([measurements[row["id"]] for row in missing]))
+        parsed = {row["id"]: report_values.astype("<f8").tobytes() for row, report_values in zip(missing, values)}
+        self.history.store_measurement_values(parsed)
+        for row in missing:
+            row["measurement_values"] = parsed[row["id"]]
@@ -0,0 +1,332 @@
+"""Export of stored reports to a partitioned Parquet dataset.
+
+    python parquet_export.py exports/reports
+    python parquet_export.py exports/reports --append
+
+Every report in the report history becomes one row: the basic
+information, every measurement cell as entered and the same cells parsed
+into numbers (<cell>_value, null where there is no number). The columns
+are fixed by EXPORT_SCHEMA, whatever the reports contain, and the files
+sit in Hive-style review_month=YYYY-MM directories.
+
+Reports are read from the history in batches, ordered by review date, and
+each batch is written as one row group, so only one batch and one open
+file are ever in memory however many reports are exported. --append adds
+only the reports stored since the previous export. Readers never see a
+partial export: a full export is written next to the directory and
+swapped in when complete, and appended files are written under hidden
+names and renamed once the export state lists them.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from measurement_analytics import MEASUREMENT_ROUNDS, ROUND_ITEMS, parse_measurements
+from report_history import INFO_FIELDS, MEASUREMENT_ITEM_FIELDS, ReportHistory
+
+# Bump when columns change; appends to an export of another version are refused
+EXPORT_SCHEMA_VERSION = 1
+
+# Rows per row group, and per batch read from the history
+DEFAULT_ROW_GROUP_ROWS = 10000
+
+# Every measurement cell, in MEASUREMENT_ITEMS_EN order; Sock Foam has after/before instead of rounds
+MEASUREMENT_CELLS = tuple(field for fields in MEASUREMENT_ITEM_FIELDS.values() for field in fields)
+ROUND_CELL_INDEX = [MEASUREMENT_CELLS.index(field) for item_key in ROUND_ITEMS for field in MEASUREMENT_ITEM_FIELDS[item_key]]
+OTHER_CELL_INDEX = [index for index in range(len(MEASUREMENT_CELLS)) if index not in ROUND_CELL_INDEX]
+
+PARTITION_FIELD = pa.field("review_month", pa.string())
+PARTITIONING = ds.partitioning(pa.schema([PARTITION_FIELD]), flavor="hive")
+
+# Columns of the Parquet files; review_month is in the directory names
+EXPORT_SCHEMA = pa.schema(
+    [
+        pa.field("report_id", pa.int64()),
+        pa.field("payload_key", pa.string()),
+        pa.field("created_at", pa.timestamp("us")),
+        pa.field("review_date", pa.date32()),
+        *[pa.field(field, pa.string()) for field in INFO_FIELDS],
+        *[pa.field(cell, pa.string()) for cell in MEASUREMENT_CELLS],
+        *[pa.field(f"{cell}_value", pa.float64()) for cell in MEASUREMENT_CELLS],
+    ],
+    metadata={"schema_version": str(EXPORT_SCHEMA_VERSION)}
+)
+
+# Export bookkeeping; the leading underscore keeps it out of the dataset
+STATE_FILE = "_export_state.json"
+
+
+def measurement_numbers(records, texts):
+    """Parsed measurement cells of a batch, reports x MEASUREMENT_CELLS
+
+    Reports from the history carry their round cells already parsed once
+    measurement_analytics has read them, so only the Sock Foam cells are
+    parsed here; other batches are parsed in full.
+    """
+    if not all(record.get("measurement_values") for record in records):
+        return parse_measurements(texts)
+    numbers = np.empty(texts.shape)
+    stored = np.frombuffer(b"".join(record["measurement_values"] for record in records), dtype="<f8")
+    numbers[:, ROUND_CELL_INDEX] = stored.reshape(len(records), len(ROUND_ITEMS) * len(MEASUREMENT_ROUNDS))
+    numbers[:, OTHER_CELL_INDEX] = parse_measurements(texts[:, OTHER_CELL_INDEX])
+    return numbers
+
+
+def report_batch(records):
+    """One RecordBatch of EXPORT_SCHEMA from report records (payloads, optionally with history columns)"""
+    texts = np.array(
+        [[str(record.get(cell, "") or "") for cell in MEASUREMENT_CELLS] for record in records], dtype=object
+    ).reshape(len(records), len(MEASUREMENT_CELLS))
+    numbers = measurement_numbers(records, texts)
+    columns = [
+        pa.array([record.get("id") for record in records], pa.int64()),
+        pa.array([record.get("payload_key") for record in records], pa.string()),
+        pa.array([record.get("created_at") for record in records], pa.timestamp("us")),
+        pa.array([review_date(record) for record in records], pa.date32()),
+        *[pa.array([str(record.get(field, "") or "") for record in records], pa.string()) for field in INFO_FIELDS],
+        *[pa.array(texts[:, index], pa.string()) for index in range(len(MEASUREMENT_CELLS))],
+        *[pa.array(numbers[:, index], pa.float64(), from_pandas=True) for index in range(len(MEASUREMENT_CELLS))],
+    ]
+    return pa.RecordBatch.from_arrays(columns, schema=EXPORT_SCHEMA)
+
+
+def review_date(record):
+    """The review date of a record as a date, or None"""
+    value = record.get("review_date")
+    if isinstance(value, datetime):
+        return value.date()
+    return value or None
+
+
+def review_month(record):
+    """Partition of a record: YYYY-MM of its review date"""
+    value = review_date(record)
+    return value.strftime("%Y-%m") if value else "unknown"
+
+
+def read_state(directory):
+    """The bookkeeping of an export directory, or None if it has none"""
+    try:
+        with open(os.path.join(directory, STATE_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_state(directory, state):
+    """Replace the bookkeeping of an export directory in one step"""
+    path = os.path.join(directory, STATE_FILE)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def check_directory(directory, state, append):
+    """Raise ValueError if directory can't take the export
+
+    A full export replaces an earlier export, but never a directory that
+    holds anything else; an append needs an export of this schema version.
+    """
+    has_files = os.path.isdir(directory) and bool(os.listdir(directory))
+    if has_files and state is None:
+        raise ValueError(f"{directory} is not empty and holds no report export")
+    if append and state is not None and state.get("schema_version") != EXPORT_SCHEMA_VERSION:
+        raise ValueError(
+            f"{directory} holds schema version {state.get('schema_version')}, not {EXPORT_SCHEMA_VERSION}; "
+            "export again without appending"
+        )
+
+
+def publish(directory, state):
+    """Finish publishing the pending append of state, if any, and return the state
+
+    The state is written before an append's files are renamed into view,
+    so after a crash in between, the next append completes the renames.
+    Hidden files of runs that never reached the state are removed.
+    """
+    pending = state.pop("pending", None) or []
+    for hidden_path, path in pending:
+        if os.path.exists(os.path.join(directory, hidden_path)):
+            os.replace(os.path.join(directory, hidden_path), os.path.join(directory, path))
+    for partition in os.listdir(directory):
+        partition_path = os.path.join(directory, partition)
+        if os.path.isdir(partition_path):
+            for name in os.listdir(partition_path):
+                if name.startswith(".part-"):
+                    os.remove(os.path.join(partition_path, name))
+    if pending:
+        write_state(directory, state)
+    return state
+
+
+def month_chunks(records, chunk_rows):
+    """Split records into lists of at most chunk_rows with one review month each"""
+    chunk, month = [], None
+    for record in records:
+        record_month = review_month(record)
+        if chunk and (record_month != month or len(chunk) >= chunk_rows):
+            yield month, chunk
+            chunk = []
+        chunk.append(record)
+        month = record_month
+    if chunk:
+        yield month, chunk
+
+
+def write_partitions(records, directory, row_group_rows=DEFAULT_ROW_GROUP_ROWS):
+    """Write records to hidden files in review_month partitions
+
+    One writer is open at a time; it changes when the review month does,
+    so records sorted by review date give one file per month. Returns the
+    (hidden, final) paths written, the number of rows and the highest
+    report id.
+    """
+    run_id = f"{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    files, rows, last_report_id = [], 0, 0
+    writer, writer_month = None, None
+    try:
+        for month, chunk in month_chunks(records, row_group_rows):
+            if month != writer_month:
+                if writer is not None:
+                    writer.close()
+                partition = os.path.join(directory, f"{PARTITION_FIELD.name}={month}")
+                os.makedirs(partition, exist_ok=True)
+                name = f"part-{run_id}-{len(files)}.parquet"
+                files.append((os.path.join(partition, f".{name}"), os.path.join(partition, name)))
+                writer = pq.ParquetWriter(files[-1][0], EXPORT_SCHEMA, compression="zstd")
+                writer_month = month
+            writer.write_batch(report_batch(chunk), row_group_size=row_group_rows)
+            rows += len(chunk)
+            last_report_id = max([last_report_id] + [record.get("id") or 0 for record in chunk])
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        for hidden_path, _ in files:
+            if os.path.exists(hidden_path):
+                os.remove(hidden_path)
+        raise
+    if writer is not None:
+        writer.close()
+    return files, rows, last_report_id
+
+
+def export_summary(directory, files, rows, state):
+    """Rows and files written, total rows and bytes"""
+    return {
+        "rows": rows,
+        "files": len(files),
+        "bytes": sum(os.path.getsize(os.path.join(directory, path)) for _, path in files),
+        "total_rows": state["rows"],
+    }
+
+
+def export_records(records, directory, append=False, row_group_rows=DEFAULT_ROW_GROUP_ROWS):
+    """Export report records (payloads, optionally with history columns) to directory
+
+    Returns a summary: rows and files written, total rows and bytes.
+    Raises ValueError for a directory that can't take the export.
+    """
+    state = read_state(directory)
+    check_directory(directory, state, append)
+    if append and state is not None:
+        return append_records(records, directory, publish(directory, state), row_group_rows)
+    return replace_export(records, directory, row_group_rows)
+
+
+def append_records(records, directory, state, row_group_rows=DEFAULT_ROW_GROUP_ROWS):
+    """Add records to an existing export"""
+    files, rows, last_report_id = write_partitions(records, directory, row_group_rows)
+    files = [(os.path.relpath(hidden_path, directory), os.path.relpath(path, directory)) for hidden_path, path in files]
+    # The state comes first: files it lists are published by the next run
+    # even if this one stops before renaming them, and never exported twice
+    state.update(
+        last_report_id=max(state["last_report_id"], last_report_id), rows=state["rows"] + rows,
+        exported_at=datetime.now().isoformat(timespec="seconds"), pending=files
+    )
+    write_state(directory, state)
+    publish(directory, state)
+    return export_summary(directory, files, rows, state)
+
+
+def replace_export(records, directory, row_group_rows=DEFAULT_ROW_GROUP_ROWS):
+    """Write a new export next to directory and swap it in once it is complete
+
+    Until the swap, readers see the previous export, and a failed export
+    leaves it as it was.
+    """
+    parent, name = os.path.split(os.path.abspath(directory))
+    run_id = f"{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    staging = os.path.join(parent, f".{name}.{run_id}.tmp")
+    os.makedirs(staging)
+    try:
+        files, rows, last_report_id = write_partitions(records, staging, row_group_rows)
+        for hidden_path, path in files:
+            os.replace(hidden_path, path)
+        state = {
+            "schema_version": EXPORT_SCHEMA_VERSION, "last_report_id": last_report_id, "rows": rows,
+            "exported_at": datetime.now().isoformat(timespec="seconds")
+        }
+        write_state(staging, state)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    if os.path.exists(directory):
+        # Two renames: a directory can't replace a non-empty one in one step
+        previous = os.path.join(parent, f".{name}.{run_id}.old")
+        os.rename(directory, previous)
+        os.rename(staging, directory)
+        shutil.rmtree(previous)
+    else:
+        os.rename(staging, directory)
+    files = [(os.path.relpath(hidden_path, staging), os.path.relpath(path, staging)) for hidden_path, path in files]
+    return export_summary(directory, files, rows, state)
+
+
+def export_history(history, directory, append=False, row_group_rows=DEFAULT_ROW_GROUP_ROWS):
+    """Export the reports of a ReportHistory; with append, only those stored since the last export"""
+    after_id = 0
+    if append:
+        after_id = (read_state(directory) or {}).get("last_report_id", 0)
+    records = history.stored_reports(after_id=after_id, batch_size=row_group_rows)
+    return export_records(records, directory, append, row_group_rows)
+
+
+def open_export(directory):
+    """The exported reports as a pyarrow dataset, review_month included"""
+    return ds.dataset(directory, format="parquet", partitioning=PARTITIONING)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export stored sample review reports to partitioned Parquet")
+    parser.add_argument("out_dir", help="Dataset directory; review_month=YYYY-MM partitions are created in it")
+    parser.add_argument("--history", default=None, help="Report history database (default: REPORT_HISTORY_PATH)")
+    parser.add_argument("--append", action="store_true", help="Add only the reports stored since the last export")
+    parser.add_argument("--row-group-rows", type=int, default=DEFAULT_ROW_GROUP_ROWS,
+                        help="Rows per row group and per batch read from the history")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    history = ReportHistory(args.history) if args.history else ReportHistory.from_env()
+    try:
+        summary = export_history(history, args.out_dir, args.append, args.row_group_rows)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    print(f"Exported {summary['rows']} reports into {summary['files']} files in {args.out_dir} in {elapsed:.1f}s "
+          f"({summary['bytes'] / 1024:.0f} KiB); {summary['total_rows']} reports in the export")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""One PDF of many reports, written out as each report is rendered.
+
+reportlab keeps every page of a document in memory until it is saved, so a
+bundle of 200 reports laid out as one document would hold all of them at
+once. ReportBundle instead renders each report as a small PDF of its own,
+its page numbers continuing where the previous report ended, and copies
+its objects straight to the output with new object numbers. Only their
+byte offsets are kept for the cross-reference table, so memory stays flat
+as the report count grows.
+
+The page tree, the optional table of contents and one bookmark per report
+are written at the end. The contents pages are listed first in the page
+tree although they are written last, so they need no second pass; page
+labels number them i, ii, ... and the report pages 1, 2, ... as printed in
+the footers.
+
+    with open("bundle.pdf", "wb") as f:
+        bundle = ReportBundle(f.write, contents=True)
+        for payload, report_texts in reports:
+            bundle.add(payload, report_texts)
+        bundle.close()
+"""
+import hashlib
+import re
+from datetime import datetime
+
+from report import render_bundle_report, render_contents_pdf, report_values
+from report_data import CHINA_TZ, PDF_CJK_FONT, PDF_DETERMINISTIC
+
+PDF_HEADER = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+
+REFERENCE = re.compile(rb"(\d+) 0 R\b")
+XREF_ENTRY = re.compile(rb"(\d{10}) (\d{5}) ([nf])")
+STREAM_START = re.compile(rb">>\s*stream\r?\n")
+OBJECT_HEADER = re.compile(rb"\d+ 0 obj")
+PAGES_TYPE = re.compile(rb"/Type\s*/Pages\b")
+
+
+def pdf_string(text):
+    """A PDF text string (UTF-16 with byte order mark, as hex)"""
+    return b"<FEFF" + text.encode("utf-16-be").hex().upper().encode("ascii") + b">"
+
+
+def read_objects(data):
+    """Split a PDF written by reportlab into its objects
+
+    Returns ({object number: bytes from "N 0 obj" up to the next object},
+    root number, info number). reportlab writes one classic cross-reference
+    table and no object streams, so the table's offsets delimit the objects.
+    """
+    xref_start = int(data[data.rindex(b"startxref") + len(b"startxref"):].split()[0])
+    trailer_start = data.index(b"trailer", xref_start)
+    entries = XREF_ENTRY.findall(data, xref_start, trailer_start)
+    offsets = sorted(
+        (int(offset), number) for number, (offset, _, kind) in enumerate(entries) if kind == b"n" and number
+    )
+    objects = {}
+    for (offset, number), end in zip(offsets, [offset for offset, _ in offsets[1:]] + [xref_start]):
+        objects[number] = data[offset:end]
+    trailer = data[trailer_start:]
+    root = int(re.search(rb"/Root (\d+) 0 R", trailer).group(1))
+    info = re.search(rb"/Info (\d+) 0 R", trailer)
+    return objects, root, int(info.group(1)) if info else None
+
+
+class PDFStreamWriter:
+    """Write PDF objects to a write() callable as they come, keeping only their offsets"""
+
+    def __init__(self, write):
+        self._write = write
+        self.position = 0
+        self.offsets = {}
+        self.next_number = 1
+        self._digest = hashlib.md5()
+        self.write(PDF_HEADER)
+
+    def write(self, data):
+        self._write(data)
+        self._digest.update(data)
+        self.position += len(data)
+
+    def reserve(self):
+        """Allocate an object number to write later"""
+        number = self.next_number
+        self.next_number += 1
+        return number
+
+    def write_object(self, number, body):
+        """Write object number with body, the bytes between "obj" and "endobj\""""
+        self.offsets[number] = self.position
+        self.write(b"%d 0 obj\n" % number + body.strip(b"\n") + b"\nendobj\n")
+
+    def copy_pdf(self, data, parent):
+        """Copy every page of a reportlab PDF with its resources
+
+        The pages' parent becomes object number parent; the source's
+        catalog, page tree and info are left out. Returns the new numbers
+        of its pages, in order.
+        """
+        objects, root, info = read_objects(data)
+        pages_root = int(re.search(rb"/Pages (\d+) 0 R", objects[root]).group(1))
+        skipped = {root, info, pages_root} | {number for number, body in objects.items() if PAGES_TYPE.search(body)}
+        numbers = {number: self.reserve() for number in objects if number not in skipped}
+        numbers.update({number: parent for number in skipped})
+
+        def renumber(match):
+            return b"%d 0 R" % numbers[int(match.group(1))]
+
+        for number, body in objects.items():
+            if number in skipped:
+                continue
+            body = OBJECT_HEADER.sub(b"", body, count=1)
+            body = body[:body.rindex(b"endobj")]
+            # References only appear in the dictionary, never in stream data
+            stream = STREAM_START.search(body)
+            split = stream.end() if stream else len(body)
+            self.write_object(numbers[number], REFERENCE.sub(renumber, body[:split]) + body[split:])
+
+        kids = re.search(rb"/Kids\s*\[([^\]]*)\]", objects[pages_root]).group(1)
+        return [numbers[int(number)] for number in REFERENCE.findall(kids)]
+
+    def finish(self, root):
+        """Write the cross-reference table and trailer; every reserved object must be written by now"""
+        xref_start = self.position
+        size = self.next_number
+        lines = [b"xref\n0 %d\n0000000000 65535 f \n" % size]
+        lines.extend(b"%010d 00000 n \n" % self.offsets[number] for number in range(1, size))
+        self.write(b"".join(lines))
+        file_id = self._digest.hexdigest().encode("ascii")
+        self.write(
+            b"trailer\n<< /ID [<%s><%s>] /Root %d 0 R /Size %d >>\nstartxref\n%d\n%%%%EOF\n"
+            % (file_id, file_id, root, size, xref_start)
+        )
+
+
+class ReportBundle:
+    """Many reports in one PDF with continuous page numbers, written to write() report by report
+
+    Reports can be rendered here (add) or elsewhere, e.g. in a process pool,
+    with render_bundle_report(payload, report_texts, bundle.pages,
+    bundle.generated_at, ...) and passed to add_rendered. With contents=True
+    a table of contents in contents_language (by default the first report's
+    PDF language) opens the bundle. Without write, the output is kept until
+    take_output() hands it over, e.g. to stream it as an HTTP response.
+    """
+
+    def __init__(self, write, contents=False, contents_language=None, deterministic=PDF_DETERMINISTIC,
+                 cjk_font=PDF_CJK_FONT):
+        self._output = []
+        self.writer = PDFStreamWriter(write or self._output.append)
+        self.contents = contents
+        self.contents_language = contents_language
+        self.deterministic = deterministic
+        self.cjk_font = cjk_font
+        # One footer timestamp for every report; deterministic reports show their review date
+        self.generated_at = datetime.now(CHINA_TZ)
+        self.pages_root = self.writer.reserve()
+        self.page_numbers = []
+        # (title, first page number, contents entry) per report
+        self.entries = []
+
+    @property
+    def pages(self):
+        """Report pages written so far"""
+        return len(self.page_numbers)
+
+    def take_output(self):
+        """The output written since the last call, when there is no write()"""
+        data = b"".join(self._output)
+        self._output.clear()
+        return data
+
+    def add(self, payload, report_texts):
+        """Render a report and append it; returns its page count"""
+        data = render_bundle_report(
+            payload, report_texts, self.pages, self.generated_at, self.deterministic, self.cjk_font
+        )
+        return self.add_rendered(data, payload, report_texts)
+
+    def add_rendered(self, data, payload, report_texts):
+        """Append a report rendered by render_bundle_report from self.pages; returns its page count"""
+        if self.contents_language is None:
+            self.contents_language = payload['pdf_language']
+        values = report_values(payload, report_texts)
+        title = " - ".join(value for value in (values['style_no'], values['factory']) if value) or "Report"
+        self.entries.append((
+            title, self.pages,
+            (values['style_no'], values['factory'], values['brand'], values['review_date'], self.pages + 1)
+        ))
+        pages = self.writer.copy_pdf(data, self.pages_root)
+        self.page_numbers.extend(pages)
+        return len(pages)
+
+    def close(self):
+        """Write the contents, bookmarks, page tree and cross-reference table"""
+        writer = self.writer
+        contents_pages = []
+        if self.contents and self.entries:
+            contents_pages = writer.copy_pdf(
+                render_contents_pdf(
+                    [entry for _, _, entry in self.entries], self.contents_language, self.deterministic, self.cjk_font
+                ),
+                self.pages_root
+            )
+        kids = contents_pages + self.page_numbers
+
+        # One bookmark per report, pointing at its first page
+        outlines = writer.reserve() if self.entries else None
+        items = [writer.reserve() for _ in self.entries]
+        for index, (number, (title, first_page, _)) in enumerate(zip(items, self.entries)):
+            links = b""
+            if index > 0:
+                links += b" /Prev %d 0 R" % items[index - 1]
+            if index < len(items) - 1:
+                links += b" /Next %d 0 R" % items[index + 1]
+            writer.write_object(number, b"<< /Title %s /Parent %d 0 R /Dest [ %d 0 R /Fit ]%s >>" % (
+                pdf_string(title), outlines, self.page_numbers[first_page], links
+            ))
+        if outlines:
+            writer.write_object(outlines, b"<< /Type /Outlines /First %d 0 R /Last %d 0 R /Count %d >>" % (
+                items[0], items[-1], len(items)
+            ))
+
+        writer.write_object(self.pages_root, b"<< /Type /Pages /Kids [ %s ] /Count %d >>" % (
+            b" ".join(b"%d 0 R" % number for number in kids), len(kids)
+        ))
+        catalog = [b"/Type /Catalog /Pages %d 0 R" % self.pages_root]
+        if outlines:
+            catalog.append(b"/Outlines %d 0 R /PageMode /UseOutlines" % outlines)
+        if contents_pages:
+            # Contents pages are numbered i, ii, ...; the reports from 1, matching their footers
+            catalog.append(b"/PageLabels << /Nums [ 0 << /S /r >> %d << /S /D >> ] >>" % len(contents_pages))
+        root = writer.reserve()
+        writer.write_object(root, b"<< " + b" ".join(catalog) + b" >>")
+        writer.finish(root)
+        return len(kids)
+
+
+def write_report_bundle(stream, reports, contents=False, deterministic=PDF_DETERMINISTIC, cjk_font=PDF_CJK_FONT):
+    """Render (payload, report_texts) pairs into one PDF written to a binary stream; returns the page count"""
+    bundle = ReportBundle(stream.write, contents, deterministic=deterministic, cjk_font=cjk_font)
+    for payload, report_texts in reports:
+        bundle.add(payload, report_texts)
+    return bundle.close()
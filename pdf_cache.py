@@ -0,0 +1,123 @@
+"""Content-addressed on-disk cache of generated PDFs.
+
+Reports are keyed by a hash of the normalized report payload (which
+includes the PDF language and city), so regenerating an unchanged report
+is a file read. The directory is trimmed to a byte budget, dropping the
+least recently used files first.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from report_data import PDF_CJK_FONT, PDF_COMPACT
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".pdf_cache")
+DEFAULT_MAX_MB = 200
+
+# Bump when the PDF layout changes so old cache entries are not served
+PDF_RENDER_VERSION = 1
+
+
+def normalize_value(value):
+    """Normalize one payload value the way the PDF renders it"""
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d')
+    # Photos are identified by the hash of their upload
+    if isinstance(value, (list, tuple)):
+        return [getattr(item, 'digest', None) or normalize_value(item) for item in value]
+    # Paragraphs collapse whitespace, so runs of spaces render identically
+    return " ".join(str(value).split()) if value is not None else ""
+
+
+def report_cache_key(payload, **options):
+    """Hash a report payload plus render options into a cache key
+
+    The process-wide output settings (compact output, Chinese font) are
+    always part of the options.
+    """
+    options = {"compact": PDF_COMPACT, "cjk_font": PDF_CJK_FONT, **options}
+    normalized = {key: normalize_value(value) for key, value in payload.items()}
+    material = json.dumps(
+        {"version": PDF_RENDER_VERSION, "payload": normalized, "options": options},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class PDFCache:
+    """Directory of <key>.pdf files with size-based LRU eviction"""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_mb=DEFAULT_MAX_MB):
+        self.directory = directory
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """Create a cache configured by PDF_CACHE_* environment variables"""
+        return cls(
+            directory=os.getenv("PDF_CACHE_DIR", DEFAULT_CACHE_DIR),
+            max_mb=float(os.getenv("PDF_CACHE_MAX_MB", DEFAULT_MAX_MB))
+        )
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get(self, key):
+        """Return the cached PDF bytes or None"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        # Touch the file so eviction sees it as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """Store PDF bytes and evict old entries over the size budget"""
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".pdf") and entry.is_file():
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        """Return hit/miss counters and the current size on disk"""
+        files = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".pdf")]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(files),
+            "bytes": sum(entry.stat().st_size for entry in files),
+        }
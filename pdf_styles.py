@@ -0,0 +1,231 @@
+"""Process-wide PDF font and style registry.
+
+Fonts are registered and styles are built once per process and language,
+then shared by every report. Paragraph and Table only read their styles,
+so sharing them across reports and sessions is safe.
+"""
+import os
+from functools import lru_cache
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import TableStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from reportlab.pdfbase.ttfonts import TTFError, TTFont
+
+# TrueType fonts with Vietnamese glyphs, tried in order after PDF_UNICODE_FONT
+# / PDF_UNICODE_FONT_BOLD; the built-in fonts only cover Western European text
+UNICODE_FONT_CANDIDATES = [
+    ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+    ("/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf", "/usr/share/fonts/truetype/noto/NotoSans-Bold.ttf"),
+    ("C:/Windows/Fonts/arial.ttf", "C:/Windows/Fonts/arialbd.ttf"),
+    ("/System/Library/Fonts/Supplemental/Arial.ttf", "/System/Library/Fonts/Supplemental/Arial Bold.ttf"),
+]
+
+# TrueType CJK fonts that can be embedded, tried in order after
+# PDF_CJK_FONT_PATH; OpenType/CFF fonts such as Noto Sans CJK can't be
+CJK_FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/usr/share/fonts/truetype/arphic/uming.ttc",
+    "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",
+    "C:/Windows/Fonts/simhei.ttf",
+    "C:/Windows/Fonts/simsun.ttc",
+    "/System/Library/Fonts/Supplemental/Arial Unicode.ttf",
+]
+
+
+@lru_cache(maxsize=None)
+def register_chinese_font():
+    """Register the CID font used for Chinese PDFs and return its name"""
+    try:
+        pdfmetrics.registerFont(UnicodeCIDFont('STSong-Light'))
+        return 'STSong-Light'
+    except Exception:
+        return 'Helvetica'
+
+
+@lru_cache(maxsize=None)
+def register_cjk_truetype_font():
+    """Register the TrueType font embedded in Chinese PDFs and return its name, or None if there is none"""
+    for path in [os.getenv("PDF_CJK_FONT_PATH")] + CJK_FONT_CANDIDATES:
+        if not path or not os.path.exists(path):
+            continue
+        try:
+            pdfmetrics.registerFont(TTFont('CJK', path))
+        except TTFError:
+            continue
+        return 'CJK'
+    return None
+
+
+@lru_cache(maxsize=None)
+def register_unicode_fonts():
+    """Register the TrueType fonts used for Vietnamese PDFs and return (regular, bold) names"""
+    configured = (os.getenv("PDF_UNICODE_FONT"), os.getenv("PDF_UNICODE_FONT_BOLD"))
+    for regular, bold in [configured] + UNICODE_FONT_CANDIDATES:
+        if not regular or not os.path.exists(regular):
+            continue
+        try:
+            pdfmetrics.registerFont(TTFont('Unicode', regular))
+        except TTFError:
+            continue
+        if bold and os.path.exists(bold):
+            try:
+                pdfmetrics.registerFont(TTFont('Unicode-Bold', bold))
+                return 'Unicode', 'Unicode-Bold'
+            except TTFError:
+                pass
+        return 'Unicode', 'Unicode'
+    return 'Helvetica', 'Helvetica-Bold'
+
+
+class PDFStyles:
+    """Fonts, paragraph styles and table styles for one PDF language
+
+    cjk_font picks the Chinese font: "cid" for STSong-Light, "ttf" for an
+    embedded TrueType subset, falling back to STSong-Light without one.
+    """
+
+    def __init__(self, pdf_lang, cjk_font="cid"):
+        self.pdf_lang = pdf_lang
+        self.chinese_font = 'Helvetica'
+        if pdf_lang == "zh":
+            self.chinese_font = (cjk_font == "ttf" and register_cjk_truetype_font()) or register_chinese_font()
+
+        self.stylesheet = getSampleStyleSheet()
+
+        # Create styles based on language
+        if pdf_lang == "zh":
+            self.normal_font = self.bold_font = self.chinese_font
+        elif pdf_lang == "vi":
+            self.normal_font, self.bold_font = register_unicode_fonts()
+        else:
+            self.normal_font, self.bold_font = 'Helvetica', 'Helvetica-Bold'
+
+        # Title style
+        self.title = ParagraphStyle(
+            'CustomTitle',
+            parent=self.stylesheet['Heading1'],
+            fontSize=16,
+            textColor=colors.HexColor('#333333'),
+            spaceAfter=5,
+            alignment=TA_CENTER,
+            fontName=self.bold_font
+        )
+
+        # Subtitle style
+        self.subtitle = ParagraphStyle(
+            'CustomSubtitle',
+            parent=self.stylesheet['Normal'],
+            fontSize=11,
+            textColor=colors.HexColor('#764ba2'),
+            alignment=TA_CENTER,
+            spaceAfter=20,
+            fontName=self.bold_font
+        )
+
+        # Table header style
+        self.table_header = ParagraphStyle(
+            'TableHeader',
+            parent=self.stylesheet['Normal'],
+            fontSize=9,
+            textColor=colors.white,
+            alignment=TA_CENTER,
+            fontName=self.bold_font
+        )
+
+        # Table cell style
+        self.table_cell = ParagraphStyle(
+            'TableCell',
+            parent=self.stylesheet['Normal'],
+            fontSize=8,
+            alignment=TA_CENTER,
+            fontName=self.normal_font
+        )
+
+        # Normal style, also used for regular table cells
+        self.normal = ParagraphStyle(
+            'NormalStyle',
+            parent=self.stylesheet['Normal'],
+            fontSize=9,
+            leading=12,
+            fontName=self.normal_font
+        )
+
+        # Bold table cells (labels)
+        self.cell_bold = ParagraphStyle(
+            'CustomStyle_True',
+            parent=self.normal,
+            fontName=self.bold_font
+        )
+
+        self.conclusion = ParagraphStyle(
+            'Conclusion',
+            parent=self.normal,
+            fontSize=9,
+            alignment=TA_LEFT
+        )
+
+        self.disclaimer = ParagraphStyle(
+            'Disclaimer',
+            parent=self.normal,
+            fontSize=8,
+            alignment=TA_LEFT
+        )
+
+        # Table styles
+        self.basic_table = TableStyle([
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#e0e0e0')),
+            ('BACKGROUND', (2, 0), (2, -1), colors.HexColor('#e0e0e0')),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ])
+
+        self.measurement_table = TableStyle([
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('ROWBACKGROUNDS', (0, 0), (-1, -1), [colors.white, colors.HexColor('#f7fafc')])
+        ])
+
+        self.sock_table = TableStyle([
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ])
+
+        self.conclusion_table = TableStyle([
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+            ('BACKGROUND', (0, 0), (0, 0), colors.HexColor('#e0e0e0')),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ])
+
+        self.signature_table = TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ])
+
+        # Table of contents of a report bundle; the first row is the header
+        self.contents_table = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#667eea')),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('LINEBELOW', (0, 0), (-1, -1), 0.25, colors.HexColor('#cccccc')),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f7fafc')])
+        ])
+
+        self.photo_table = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ])
+
+
+@lru_cache(maxsize=None)
+def get_pdf_styles(pdf_lang, cjk_font="cid"):
+    """Return the shared PDFStyles for a language and Chinese font, building it on first use"""
+    return PDFStyles(pdf_lang, cjk_font)
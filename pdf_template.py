@@ -0,0 +1,221 @@
+"""Precompiled page skeletons and the fast value-overlay renderer.
+
+Every report has the same layout; only the values in its cells change.
+PageSkeleton lays the report out once per language and conclusion height
+with placeholder value cells, keeps the page's drawing operations and
+records where each value cell ended up. render_overlay_pdf() replays those
+operations onto a fresh canvas and draws the values straight into their
+cells, skipping Paragraph parsing, wrapping and table sizing.
+
+Values that wrap or contain markup are still drawn by their own Paragraph,
+and their heights pick the skeleton variant, since a taller cell moves
+everything below it. Variants are laid out on first use and kept in a
+bounded cache. When the values push the report past one page,
+render_overlay_pdf() returns None and render_report_pdf() falls back to the
+full layout.
+"""
+import io
+from functools import lru_cache
+
+from reportlab import rl_config
+from reportlab.pdfbase.pdfmetrics import getAscentDescent, getFont, stringWidth
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import Flowable, Paragraph
+from reportlab.platypus.doctemplate import LayoutError
+
+from pdf_styles import get_pdf_styles
+from report import report_document, report_flowables, report_values
+from report_data import CHINESE_CITIES, PDF_CJK_FONT, PDF_DETERMINISTIC, REPORT_TEXT_FIELDS
+
+# Skeleton variants kept per process (one per language and set of tall cells)
+MAX_SKELETONS = 128
+
+# Characters Paragraph treats as markup
+MARKUP_CHARS = ('<', '>', '&')
+
+
+class ValueSlot(Flowable):
+    """Placeholder value cell: sized like a Paragraph, records where it is drawn"""
+
+    def __init__(self, key, style, slots, height=None):
+        super().__init__()
+        self.key = key
+        self.style = style
+        self.slots = slots
+        # One line unless the value is known to be taller
+        self.height = style.leading if height is None else height
+
+    def wrap(self, availWidth, availHeight):
+        self.width = availWidth
+        return self.width, self.height
+
+    def draw(self):
+        x, y = self.canv.absolutePosition(0, 0)
+        self.slots[self.key] = (x, y, self.width, self.height, self.style)
+
+
+class SkeletonCanvas(Canvas):
+    """Canvas that keeps each page's drawing operations and font names"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pages = []
+
+    def showPage(self):
+        self.pages.append((list(self._code), dict(self._doc.fontMapping)))
+        super().showPage()
+
+
+class PageSkeleton:
+    """The laid-out report page of one language, without values or page decorations
+
+    tall_cells is a tuple of (key, height) for the value cells that are
+    taller than one line; every other value cell is one line high.
+    """
+
+    def __init__(self, pdf_lang, tall_cells=(), cjk_font="cid"):
+        self.pdf_lang = pdf_lang
+        self.tall_cells = tall_cells
+        self.slots = {}
+        self.code = None
+        self.fonts = None
+
+        styles = get_pdf_styles(pdf_lang, cjk_font)
+        payload = {
+            'pdf_language': pdf_lang,
+            'selected_city': next(iter(CHINESE_CITIES)),
+            'review_date': '',
+            'purpose': '',
+        }
+        report_texts = dict.fromkeys(REPORT_TEXT_FIELDS, '')
+        heights = dict(tall_cells)
+
+        def value_cell(key, text, style):
+            return ValueSlot(key, style, self.slots, heights.get(key))
+
+        def no_decorations(canv, doc):
+            pass
+
+        doc = report_document(io.BytesIO(), payload, styles)
+        try:
+            doc.build(
+                report_flowables(payload, report_texts, styles, value_cell),
+                onFirstPage=no_decorations, onLaterPages=no_decorations, canvasmaker=SkeletonCanvas
+            )
+        except LayoutError:
+            # A cell taller than a page; the full layout reports the error
+            return
+        # Only a single page can be replayed, and only with standard or CID
+        # fonts: TrueType text is encoded into per-document font subsets
+        if len(doc.canv.pages) == 1 and not any(
+            isinstance(getFont(font_name), TTFont) for font_name in doc.canv.pages[0][1]
+        ):
+            self.code, fonts = doc.canv.pages[0]
+            # Internal font names (/F1, /F2, ...) in the order the page first used them
+            self.fonts = sorted(fonts.items(), key=lambda item: int(item[1].lstrip('/F')))
+
+    @property
+    def usable(self):
+        return self.code is not None
+
+
+@lru_cache(maxsize=MAX_SKELETONS)
+def get_page_skeleton(pdf_lang, tall_cells=(), cjk_font="cid"):
+    """Return the shared PageSkeleton, laying it out on first use"""
+    return PageSkeleton(pdf_lang, tall_cells, cjk_font)
+
+
+def fits_one_line(text, width, style):
+    """True if Paragraph would render text on a single line of the given width"""
+    return stringWidth(text, style.fontName, style.fontSize) <= width
+
+
+def first_line_offset(style):
+    """Distance from the top of a Paragraph to its first baseline"""
+    if rl_config.paraFontSizeHeightOffset:
+        return style.fontSize
+    return getAscentDescent(style.fontName, style.fontSize)[0]
+
+
+def render_overlay_pdf(payload, report_texts, deterministic=PDF_DETERMINISTIC, cjk_font=PDF_CJK_FONT):
+    """Render a report by drawing its values onto a cached skeleton
+
+    Returns the buffer, or None when the report does not fit on one page.
+    """
+    pdf_lang = payload['pdf_language']
+    # The skeleton is a single page without photos
+    if payload.get('photos'):
+        return None
+    # Cell widths are the same in every variant
+    base = get_page_skeleton(pdf_lang, cjk_font=cjk_font)
+    if not base.usable:
+        return None
+
+    # Single-line values are drawn as plain text; Paragraph collapses
+    # whitespace, so they are collapsed the same way. Anything else gets
+    # the Paragraph the full layout would have used.
+    lines = {}
+    paragraphs = {}
+    for key, value in report_values(payload, report_texts).items():
+        text = " ".join(str(value).split())
+        if not text:
+            continue
+        x, y, width, height, style = base.slots[key]
+        if not any(char in text for char in MARKUP_CHARS) and fits_one_line(text, width, style):
+            lines[key] = text
+        else:
+            paragraphs[key] = Paragraph(value, style)
+            paragraphs[key].wrap(width, 1e6)
+
+    tall_cells = tuple(sorted(
+        (key, paragraph.height) for key, paragraph in paragraphs.items()
+        if paragraph.height != paragraph.style.leading
+    ))
+    skeleton = get_page_skeleton(pdf_lang, tall_cells, cjk_font) if tall_cells else base
+    if not skeleton.usable:
+        return None
+
+    styles = get_pdf_styles(pdf_lang, cjk_font)
+    buffer = io.BytesIO()
+    doc = report_document(buffer, payload, styles, deterministic)
+    doc.stamp_generated_at()
+    # Same canvas options and metadata as doc.build() would use
+    canv = doc._makeCanvas(buffer)
+
+    # The skeleton's operations refer to fonts by internal name, so
+    # register them in the same order before anything else draws
+    for font_name, internal_name in skeleton.fonts:
+        if canv._doc.getInternalFontName(font_name) != internal_name:
+            return None
+
+    doc.draw_page_decorations(canv, doc)
+
+    # Replay the skeleton inside its own graphics state
+    canv._code.append('q')
+    canv._code.extend(skeleton.code)
+    canv._code.append('Q')
+
+    # One text object for every single-line value
+    text_object = canv.beginText()
+    current_style = None
+    for key, text in lines.items():
+        x, y, width, height, style = skeleton.slots[key]
+        if style is not current_style:
+            text_object.setFillColor(style.textColor)
+            text_object.setFont(style.fontName, style.fontSize, style.leading)
+            current_style = style
+        text_object.setTextOrigin(x, y + height - first_line_offset(style))
+        text_object.textOut(text)
+    canv.drawText(text_object)
+
+    for key, paragraph in paragraphs.items():
+        x, y, width, height, style = skeleton.slots[key]
+        # Tall cells are exactly as high as their paragraph; a
+        # single-line paragraph sits at the top of its one-line slot
+        paragraph.drawOn(canv, x, y + height - paragraph.height)
+
+    canv.showPage()
+    canv.save()
+    buffer.seek(0)
+    return buffer
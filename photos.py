@@ -0,0 +1,136 @@
+"""Sample photo processing for reports, independent of Streamlit.
+
+Uploaded photos are decoded once with Pillow: turned upright from their
+EXIF orientation, downscaled to what the PDF prints at PHOTO_DPI and
+recompressed as JPEG, plus a small thumbnail for the app. PhotoCache keeps
+the results keyed by a hash of the uploaded bytes, so reruns and
+regenerated reports reuse them. reportlab embeds the JPEG bytes as they
+are, so a photo costs the PDF build no decoding either.
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from report_data import PHOTO_PRINT_INCHES
+
+# Resolution a photo is stored at, for its largest side in the PDF
+PHOTO_DPI = int(os.getenv("PHOTO_DPI", 150))
+PHOTO_JPEG_QUALITY = int(os.getenv("PHOTO_JPEG_QUALITY", 80))
+THUMBNAIL_PIXELS = 240
+THUMBNAIL_JPEG_QUALITY = 70
+
+# Uploads larger than this are refused before decoding
+PHOTO_MAX_UPLOAD_MB = 25
+
+DEFAULT_CACHE_MAX_MB = 64
+
+
+class ProcessedPhoto:
+    """A photo ready to embed: print-size JPEG, thumbnail and dimensions"""
+
+    def __init__(self, digest, data, width, height, thumbnail):
+        # SHA-256 of the uploaded bytes
+        self.digest = digest
+        self.data = data
+        self.width = width
+        self.height = height
+        self.thumbnail = thumbnail
+
+    @property
+    def size(self):
+        return len(self.data) + len(self.thumbnail)
+
+
+def photo_digest(data):
+    """Content hash of an upload"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def encode_jpeg(image, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def process_photo(data, digest=None):
+    """Decode, auto-orient, downscale and recompress an uploaded photo
+
+    Raises ValueError for files that are too large or not images.
+    """
+    if len(data) > PHOTO_MAX_UPLOAD_MB * 1024 * 1024:
+        raise ValueError(f"photo larger than {PHOTO_MAX_UPLOAD_MB} MB")
+    max_pixels = round(PHOTO_PRINT_INCHES * PHOTO_DPI)
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            # JPEGs decode straight at a reduced scale that is still large enough
+            image.draft("RGB", (max_pixels, max_pixels))
+            image = ImageOps.exif_transpose(image)
+            if image.mode in ("RGBA", "LA", "P"):
+                # Transparent areas print white
+                image = image.convert("RGBA")
+                background = Image.new("RGB", image.size, "white")
+                background.paste(image, mask=image.getchannel("A"))
+                image = background
+            elif image.mode != "RGB":
+                image = image.convert("RGB")
+            image.thumbnail((max_pixels, max_pixels), Image.LANCZOS)
+            printed = encode_jpeg(image, PHOTO_JPEG_QUALITY)
+            width, height = image.size
+            image.thumbnail((THUMBNAIL_PIXELS, THUMBNAIL_PIXELS), Image.LANCZOS)
+            thumbnail = encode_jpeg(image, THUMBNAIL_JPEG_QUALITY)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ValueError(f"not a readable image ({e})")
+    return ProcessedPhoto(digest or photo_digest(data), printed, width, height, thumbnail)
+
+
+class PhotoCache:
+    """Processed photos keyed by upload hash, trimmed to a byte budget (LRU)"""
+
+    def __init__(self, max_mb=DEFAULT_CACHE_MAX_MB):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._photos = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        """Create a cache sized by PHOTO_CACHE_MAX_MB"""
+        return cls(max_mb=float(os.getenv("PHOTO_CACHE_MAX_MB", DEFAULT_CACHE_MAX_MB)))
+
+    def get(self, data):
+        """Return the ProcessedPhoto for uploaded bytes, processing them on first use"""
+        digest = photo_digest(data)
+        with self._lock:
+            photo = self._photos.get(digest)
+            if photo is not None:
+                self._photos.move_to_end(digest)
+                self.hits += 1
+                return photo
+            self.misses += 1
+
+        # Decoded outside the lock; a photo uploaded twice at once is processed twice
+        photo = process_photo(data, digest)
+        with self._lock:
+            if digest not in self._photos:
+                self._photos[digest] = photo
+                self._bytes += photo.size
+            while self._bytes > self.max_bytes and len(self._photos) > 1:
+                _, evicted = self._photos.popitem(last=False)
+                self._bytes -= evicted.size
+        return photo
+
+    def stats(self):
+        """Return hit/miss counters and the cache size"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._photos),
+                "bytes": self._bytes,
+            }
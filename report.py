@@ -0,0 +1,538 @@
+"""Sample review PDF rendering, independent of Streamlit.
+
+render_report_pdf() lays out one report from a payload dict: every field in
+REPORT_TEXT_FIELDS (see report_data) plus purpose, review_date,
+pdf_language, selected_city and optionally photos, a list of
+photos.ProcessedPhoto. Translation happens before rendering; pass the translated
+values as report_texts.
+
+render_report_bundle() renders one report in several languages at once,
+either as a ZIP of per-language PDFs or as one combined PDF.
+render_bundle_report() and render_contents_pdf() render the pieces of a
+multi-report bundle, which pdf_bundle streams into one file.
+
+Output size: reportlab already compresses page streams, but by default
+also wraps them in ASCII85 text, which adds a quarter to their size.
+Compact output (PDF_COMPACT, set_compact_output) writes them as binary.
+Chinese text uses STSong-Light by default, which nothing embeds but which
+the viewer has to supply; cjk_font="ttf" embeds a subset of a TrueType
+font instead (see pdf_styles).
+"""
+import io
+import time
+import zipfile
+from datetime import datetime
+
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.platypus import ActionFlowable, Image, PageBreak, SimpleDocTemplate, Table, Paragraph, Spacer
+
+from i18n import pdf_text as get_pdf_text
+from pdf_styles import get_pdf_styles
+from report_data import (
+    CHINA_TZ, CHINESE_CITIES, MEASUREMENT_ITEMS, MEASUREMENT_ITEMS_EN, PDF_CJK_FONT, PDF_COMPACT, PDF_DETERMINISTIC,
+    PDF_FAST_RENDER, PHOTO_PRINT_INCHES, SAMPLE_TYPES, SAMPLE_TYPES_EN, get_report_texts
+)
+
+def set_compact_output(enabled):
+    """Write compressed page streams as binary instead of ASCII85 text
+    
+    reportlab reads this setting while it writes any document, so it
+    applies to the whole process rather than to one report.
+    """
+    rl_config.pageCompression = 1
+    rl_config.useA85 = 0 if enabled else 1
+
+if PDF_COMPACT:
+    set_compact_output(True)
+
+# PDF Generation with Headers and Footers
+class SampleReviewPDF(SimpleDocTemplate):
+    def __init__(self, *args, **kwargs):
+        self.header_text = kwargs.pop('header_text', '')
+        self.location = kwargs.pop('location', '')
+        self.pdf_language = kwargs.pop('pdf_language', 'en')
+        self.selected_city = kwargs.pop('selected_city', '')
+        self.chinese_city = kwargs.pop('chinese_city', '')
+        self.header_font = kwargs.pop('header_font', 'Helvetica-Bold')
+        self.footer_font = kwargs.pop('footer_font', 'Helvetica')
+        self.generated_at = kwargs.pop('generated_at', None)
+        self.timestamp_format = kwargs.pop('timestamp_format', '%Y-%m-%d %H:%M:%S')
+        # First page of the current language section; page numbers restart there
+        self.section_start = 1
+        # Pages before this document in a bundle; its page numbers continue from there
+        self.page_offset = kwargs.pop('page_offset', 0)
+        # Seconds the last build() took
+        self.build_seconds = None
+        super().__init__(*args, **kwargs)
+    
+    def build(self, flowables, **kwargs):
+        """Build the document, decorating every page once when it starts"""
+        start = time.perf_counter()
+        self.stamp_generated_at()
+        kwargs.setdefault('onFirstPage', self.draw_page_decorations)
+        kwargs.setdefault('onLaterPages', self.draw_page_decorations)
+        super().build(flowables, **kwargs)
+        self.build_seconds = time.perf_counter() - start
+        
+    def stamp_generated_at(self):
+        """Fix the generation timestamp once per document so every page shows the same time"""
+        if self.generated_at is None:
+            self.generated_at = datetime.now(CHINA_TZ)
+    
+    def start_section(self, pdf_lang, styles):
+        """Switch header and footer to another language from the next page on"""
+        self.pdf_language = pdf_lang
+        self.header_text = get_pdf_text("header", pdf_lang)
+        self.header_font = styles.bold_font
+        self.footer_font = styles.normal_font
+        self.section_start = self.canv.getPageNumber() + 1
+    
+    def draw_page_decorations(self, canv, doc):
+        """Add header and footer"""
+        page = canv.getPageNumber() - self.section_start + 1
+        # Add header on all pages except the first of a section or report
+        if page > 1:
+            canv.saveState()
+            # Header
+            canv.setFillColor(colors.HexColor('#667eea'))
+            canv.rect(0, self.pagesize[1] - 0.6*inch, self.pagesize[0], 0.6*inch, fill=1, stroke=0)
+            
+            canv.setFont(self.header_font, 12)
+            canv.setFillColor(colors.white)
+            header_title = get_pdf_text("header", self.pdf_language)
+            canv.drawCentredString(
+                self.pagesize[0]/2.0, 
+                self.pagesize[1] - 0.4*inch, 
+                header_title
+            )
+            canv.restoreState()
+            
+        # Footer on all pages
+        canv.saveState()
+        
+        # Footer background
+        canv.setFillColor(colors.HexColor('#f8f9fa'))
+        canv.rect(0, 0, self.pagesize[0], 0.7*inch, fill=1, stroke=0)
+        
+        # Top border
+        canv.setStrokeColor(colors.HexColor('#667eea'))
+        canv.setLineWidth(1)
+        canv.line(0, 0.7*inch, self.pagesize[0], 0.7*inch)
+        
+        # Footer text
+        canv.setFont(self.footer_font, 8)
+        canv.setFillColor(colors.HexColor('#666666'))
+        
+        # Left: Location
+        location_info = f"{get_pdf_text('location', self.pdf_language)} {self.selected_city}"
+        if self.pdf_language == "zh" and self.chinese_city:
+            location_info = f"{get_pdf_text('location', self.pdf_language)} {self.selected_city} ({self.chinese_city})"
+        
+        canv.drawString(0.5*inch, 0.25*inch, location_info)
+        
+        # Center: Timestamp
+        timestamp = f"{get_pdf_text('generated', self.pdf_language)} {self.generated_at.strftime(self.timestamp_format)}"
+        canv.drawCentredString(self.pagesize[0]/2.0, 0.25*inch, timestamp)
+        
+        # Right: Page number
+        page_num = get_pdf_text("page_footer", self.pdf_language).format(page=page + self.page_offset)
+        canv.drawRightString(self.pagesize[0] - 0.5*inch, 0.25*inch, page_num)
+        
+        canv.restoreState()
+
+def report_document(buffer, payload, styles, deterministic=PDF_DETERMINISTIC, page_offset=0, generated_at=None):
+    """Create the document template (page size, margins, header and footer) for a payload
+    
+    page_offset and generated_at continue the page numbers and share the
+    footer timestamp of the reports before this one in a bundle.
+    """
+    # Get location info
+    selected_city = payload['selected_city']
+    chinese_city = CHINESE_CITIES[selected_city]
+    pdf_lang = payload['pdf_language']
+    review_date_val = payload.get('review_date') or datetime.now()
+    
+    # Stable timestamp policy: the footer shows the review date instead of
+    # the wall clock, and reportlab's invariant mode fixes the metadata
+    timestamp_format = '%Y-%m-%d %H:%M:%S'
+    if deterministic and hasattr(review_date_val, 'strftime'):
+        generated_at = review_date_val
+        timestamp_format = '%Y-%m-%d'
+    
+    # Create PDF with custom header/footer
+    return SampleReviewPDF(
+        buffer, 
+        pagesize=letter,
+        topMargin=0.8*inch,
+        bottomMargin=0.8*inch,
+        header_text=get_pdf_text("header", pdf_lang),
+        location=selected_city,
+        pdf_language=pdf_lang,
+        selected_city=selected_city,
+        chinese_city=chinese_city,
+        header_font=styles.bold_font,
+        footer_font=styles.normal_font,
+        generated_at=generated_at,
+        timestamp_format=timestamp_format,
+        page_offset=page_offset,
+        invariant=1 if deterministic else 0
+    )
+
+def report_values(payload, report_texts):
+    """Return the text shown in every value cell, keyed like report_texts"""
+    values = dict(report_texts)
+    
+    # Get appropriate sample type based on language
+    purpose_val = payload.get('purpose', '')
+    sample_types = SAMPLE_TYPES.get(payload['pdf_language'], SAMPLE_TYPES_EN)
+    values['purpose'] = sample_types.get(purpose_val, purpose_val)
+    
+    review_date_val = payload.get('review_date') or datetime.now()
+    values['review_date'] = review_date_val.strftime('%Y-%m-%d') if hasattr(review_date_val, 'strftime') else str(review_date_val)
+    return values
+
+def report_flowables(payload, report_texts, styles, value_cell=None):
+    """Lay out the report body and return its flowables
+    
+    Every cell that shows a report value is made by value_cell(key, text,
+    style), a Paragraph by default. The fast renderer in pdf_template
+    passes placeholders to measure where the values go.
+    """
+    pdf_lang = payload['pdf_language']
+    values = report_values(payload, report_texts)
+    
+    elements = []
+    
+    # Helper function for creating paragraphs
+    def create_paragraph(text, style=None, bold=False):
+        """Create paragraph with appropriate font"""
+        if style is None:
+            style = styles.cell_bold if bold else styles.normal
+        return Paragraph(text, style)
+    
+    def create_value(key, text, style=None):
+        """Create the cell for one report value"""
+        if value_cell is not None:
+            return value_cell(key, text, style or styles.normal)
+        return create_paragraph(text, style)
+    
+    # Build the PDF content
+    elements.append(Spacer(1, 10))
+    
+    # Title based on language
+    elements.append(Paragraph(get_pdf_text("title", pdf_lang), styles.title))
+    elements.append(Paragraph(get_pdf_text("page_num", pdf_lang), styles.subtitle))
+    elements.append(Spacer(1, 10))
+    
+    style_no_val = values['style_no']
+    size_val = values['size']
+    factory_val = values['factory']
+    purpose_display = values['purpose']
+    brand_val = values['brand']
+    last_no_val = values['last_no']
+    sales_val = values['sales']
+    new_old_val = values['new_old']
+    outsole_no_val = values['outsole_no']
+    
+    # Basic Information Table - Single language based on PDF language
+    basic_data = [
+        [
+            create_paragraph(get_pdf_text("style_no", pdf_lang), bold=True), 
+            create_value('style_no', style_no_val),
+            create_paragraph(get_pdf_text("size", pdf_lang), bold=True),
+            create_value('size', size_val)
+        ],
+        [
+            create_paragraph(get_pdf_text("factory", pdf_lang), bold=True), 
+            create_value('factory', factory_val),
+            create_paragraph(get_pdf_text("purpose", pdf_lang), bold=True),
+            create_value('purpose', purpose_display)
+        ],
+        [
+            create_paragraph(get_pdf_text("brand", pdf_lang), bold=True), 
+            create_value('brand', brand_val),
+            create_paragraph(get_pdf_text("last_no", pdf_lang), bold=True),
+            create_value('last_no', last_no_val)
+        ],
+        [
+            create_paragraph(get_pdf_text("sales", pdf_lang), bold=True), 
+            create_value('sales', sales_val),
+            create_paragraph(get_pdf_text("new_old", pdf_lang), bold=True),
+            create_value('new_old', new_old_val)
+        ],
+        [
+            create_paragraph(get_pdf_text("outsole_no", pdf_lang), bold=True), 
+            create_value('outsole_no', outsole_no_val),
+            create_paragraph(get_pdf_text("review", pdf_lang), bold=True),
+            create_value('review_date', values['review_date'])
+        ]
+    ]
+    
+    basic_table = Table(basic_data, colWidths=[1.2*inch, 2.4*inch, 1.2*inch, 2.4*inch])
+    basic_table.setStyle(styles.basic_table)
+    elements.append(basic_table)
+    elements.append(Spacer(1, 15))
+    
+    # Measurement Check Table - Single language
+    measurement_data = []
+    
+    # Header row - only one set of headers
+    check_items = MEASUREMENT_ITEMS.get(pdf_lang, MEASUREMENT_ITEMS_EN)
+    
+    # Create two columns for measurements
+    left_items = check_items["left"]
+    right_items = check_items["right"]
+    
+    # Get maximum length for iteration
+    max_items = max(len(left_items), len(right_items))
+    
+    for i in range(max_items):
+        row = []
+        
+        # Left side items
+        if i < len(left_items):
+            item_name, item_key = left_items[i]
+            # Get measurement values from session state
+            # Use English keys for session state regardless of language
+            if pdf_lang != "en":
+                # For translated PDFs, use English measurement items to get keys
+                eng_item = MEASUREMENT_ITEMS_EN["left"][i][1] if i < len(MEASUREMENT_ITEMS_EN["left"]) else ""
+            else:
+                eng_item = item_key
+            
+            # Values were already translated by the caller
+            field = eng_item.lower().replace(" ", "_")
+            row.append(create_paragraph(item_name))
+            row.extend(
+                create_value(f'{field}_{round_name}', report_texts[f'{field}_{round_name}'])
+                for round_name in ("first", "second", "third", "fourth")
+            )
+        else:
+            # Empty cells for left side
+            row.extend([create_paragraph("")] * 5)
+        
+        # Add spacer column
+        row.append(create_paragraph(""))
+        
+        # Right side items
+        if i < len(right_items):
+            item_name, item_key = right_items[i]
+            # Get measurement values from session state
+            # Use English keys for session state regardless of language
+            if pdf_lang != "en":
+                # For translated PDFs, use English measurement items to get keys
+                eng_item = MEASUREMENT_ITEMS_EN["right"][i][1] if i < len(MEASUREMENT_ITEMS_EN["right"]) else ""
+            else:
+                eng_item = item_key
+            
+            # Values were already translated by the caller
+            field = eng_item.lower().replace(" ", "_")
+            row.append(create_paragraph(item_name))
+            row.extend(
+                create_value(f'{field}_{round_name}', report_texts[f'{field}_{round_name}'])
+                for round_name in ("first", "second", "third", "fourth")
+            )
+        else:
+            # Empty cells for right side
+            row.extend([create_paragraph("")] * 5)
+        
+        measurement_data.append(row)
+    
+    # Create the measurement table
+    measurement_table = Table(measurement_data, colWidths=[1.2*inch, 0.6*inch, 0.6*inch, 0.6*inch, 0.6*inch, 0.2*inch, 1.2*inch, 0.6*inch, 0.6*inch, 0.6*inch, 0.6*inch])
+    measurement_table.setStyle(styles.measurement_table)
+    elements.append(measurement_table)
+    elements.append(Spacer(1, 15))
+    
+    # Sock Foam special section
+    sock_foam_label = check_items["right"][-1][0]
+    
+    sock_foam_after = report_texts['sock_foam_after']
+    sock_foam_before = report_texts['sock_foam_before']
+    
+    sock_data = [
+        [
+            create_paragraph(sock_foam_label, bold=True),
+            create_paragraph(get_pdf_text("after", pdf_lang)),
+            create_value('sock_foam_after', sock_foam_after),
+            create_paragraph(get_pdf_text("before", pdf_lang)),
+            create_value('sock_foam_before', sock_foam_before)
+        ]
+    ]
+    
+    sock_table = Table(sock_data, colWidths=[1.2*inch, 0.8*inch, 1.2*inch, 0.8*inch, 1.2*inch])
+    sock_table.setStyle(styles.sock_table)
+    elements.append(sock_table)
+    elements.append(Spacer(1, 15))
+    
+    # Conclusion Section
+    conclusion_val = report_texts['conclusion']
+    
+    conclusion_label = f"{get_pdf_text('conclusion', pdf_lang)}:"
+    conclusion_row = [
+        create_paragraph(conclusion_label, bold=True),
+        create_value('conclusion', conclusion_val, styles.conclusion)
+    ]
+    
+    conclusion_table = Table([conclusion_row], colWidths=[1.5*inch, 6*inch])
+    conclusion_table.setStyle(styles.conclusion_table)
+    elements.append(conclusion_table)
+    elements.append(Spacer(1, 20))
+    
+    # Disclaimer Section - Single language
+    elements.append(create_paragraph(get_pdf_text("disclaimer", pdf_lang), styles.disclaimer))
+    elements.append(Spacer(1, 15))
+    
+    # Signatures
+    grandstep_tech_val = report_texts['grandstep_tech']
+    factory_rep_val = report_texts['factory_representative']
+    
+    signature_data = [
+        [
+            create_paragraph(get_pdf_text("grandstep_tech", pdf_lang), bold=True),
+            create_value('grandstep_tech', grandstep_tech_val),
+            create_paragraph(""),
+            create_paragraph(get_pdf_text("factory_rep", pdf_lang), bold=True),
+            create_value('factory_representative', factory_rep_val)
+        ]
+    ]
+    
+    signature_table = Table(signature_data, colWidths=[1.5*inch, 2*inch, 0.5*inch, 1.5*inch, 2*inch])
+    signature_table.setStyle(styles.signature_table)
+    elements.append(signature_table)
+    
+    # Sample photos, two per row; the JPEGs are already print-sized
+    photos = payload.get('photos') or []
+    if photos:
+        elements.append(Spacer(1, 20))
+        elements.append(create_paragraph(get_pdf_text("photos", pdf_lang), bold=True))
+        elements.append(Spacer(1, 8))
+        box = PHOTO_PRINT_INCHES * inch
+        images = []
+        for photo in photos:
+            scale = box / max(photo.width, photo.height)
+            images.append(Image(io.BytesIO(photo.data), width=photo.width * scale, height=photo.height * scale))
+        rows = [images[index:index + 2] for index in range(0, len(images), 2)]
+        if len(rows[-1]) == 1:
+            rows[-1].append(create_paragraph(""))
+        photo_table = Table(rows, colWidths=[box + 0.1*inch] * 2)
+        photo_table.setStyle(styles.photo_table)
+        elements.append(photo_table)
+    
+    return elements
+
+def render_report_pdf(payload, report_texts=None, deterministic=PDF_DETERMINISTIC, fast=PDF_FAST_RENDER,
+                      cjk_font=PDF_CJK_FONT):
+    """Render a Sample Review PDF report from a payload and return the buffer
+    
+    With fast=True the values are drawn onto a cached page skeleton (see
+    pdf_template) when they fit, falling back to the full layout otherwise.
+    cjk_font is the Chinese font strategy, "cid" or "ttf".
+    """
+    # Values from the payload, already translated by the caller if needed
+    if report_texts is None:
+        report_texts = get_report_texts(payload)
+    
+    if fast:
+        from pdf_template import render_overlay_pdf
+        buffer = render_overlay_pdf(payload, report_texts, deterministic, cjk_font)
+        if buffer is not None:
+            return buffer
+    
+    buffer = io.BytesIO()
+    
+    # Fonts and styles are registered once per process and language
+    styles = get_pdf_styles(payload['pdf_language'], cjk_font)
+    
+    doc = report_document(buffer, payload, styles, deterministic)
+    
+    # Build PDF
+    doc.build(report_flowables(payload, report_texts, styles))
+    buffer.seek(0)
+    return buffer
+
+class LanguageSection(ActionFlowable):
+    """Start the next language section of a combined PDF"""
+    
+    def __init__(self, pdf_lang, styles):
+        super().__init__()
+        self.pdf_lang = pdf_lang
+        self.styles = styles
+    
+    def apply(self, doc):
+        doc.start_section(self.pdf_lang, self.styles)
+
+def render_report_bundle(payload, report_texts_by_language, combined=False, deterministic=PDF_DETERMINISTIC,
+                         fast=PDF_FAST_RENDER, filename="sample_review", cjk_font=PDF_CJK_FONT):
+    """Render one report in several languages and return the buffer
+    
+    report_texts_by_language maps each PDF language, in order, to its
+    (already translated) report texts. By default the result is a ZIP with
+    one PDF per language, named <filename>_<language>.pdf. With
+    combined=True it is a single PDF with one section per language, each
+    starting on a new page with its own header, footer and page numbers;
+    that document is always laid out in full.
+    """
+    buffer = io.BytesIO()
+    if not combined:
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            for pdf_lang, report_texts in report_texts_by_language.items():
+                pdf = render_report_pdf({**payload, 'pdf_language': pdf_lang}, report_texts, deterministic, fast, cjk_font)
+                # Fixed entry dates keep deterministic bundles byte-identical
+                date_time = (1980, 1, 1, 0, 0, 0) if deterministic else datetime.now().timetuple()[:6]
+                info = zipfile.ZipInfo(f"{filename}_{pdf_lang}.pdf", date_time=date_time)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                archive.writestr(info, pdf.getvalue())
+        buffer.seek(0)
+        return buffer
+    
+    elements = []
+    doc = None
+    for pdf_lang, report_texts in report_texts_by_language.items():
+        section_payload = {**payload, 'pdf_language': pdf_lang}
+        styles = get_pdf_styles(pdf_lang, cjk_font)
+        if doc is None:
+            doc = report_document(buffer, section_payload, styles, deterministic)
+        else:
+            elements.extend([LanguageSection(pdf_lang, styles), PageBreak()])
+        elements.extend(report_flowables(section_payload, report_texts, styles))
+    
+    doc.build(elements)
+    buffer.seek(0)
+    return buffer
+
+def render_bundle_report(payload, report_texts, page_offset=0, generated_at=None, deterministic=PDF_DETERMINISTIC,
+                         cjk_font=PDF_CJK_FONT):
+    """Render one report of a bundle (see pdf_bundle) and return the PDF bytes
+    
+    Its page numbers continue from page_offset and its footer shows
+    generated_at, shared by the whole bundle. Always laid out in full.
+    """
+    buffer = io.BytesIO()
+    styles = get_pdf_styles(payload['pdf_language'], cjk_font)
+    doc = report_document(buffer, payload, styles, deterministic, page_offset, generated_at)
+    doc.build(report_flowables(payload, report_texts, styles))
+    return buffer.getvalue()
+
+def render_contents_pdf(entries, pdf_lang, deterministic=PDF_DETERMINISTIC, cjk_font=PDF_CJK_FONT):
+    """Render the table of contents of a bundle and return the PDF bytes
+    
+    entries are (style no., factory, brand, review date, first page) per
+    report, in bundle order.
+    """
+    buffer = io.BytesIO()
+    styles = get_pdf_styles(pdf_lang, cjk_font)
+    doc = SimpleDocTemplate(
+        buffer, pagesize=letter, topMargin=0.8*inch, bottomMargin=0.8*inch, invariant=1 if deterministic else 0
+    )
+    header = ["#"] + [get_pdf_text(key, pdf_lang) for key in ("style_no", "factory", "brand", "review", "page")]
+    rows = [[Paragraph(text, styles.table_header) for text in header]]
+    for number, entry in enumerate(entries, 1):
+        rows.append([Paragraph(str(value), styles.table_cell) for value in (number, *entry)])
+    table = Table(rows, colWidths=[0.4*inch, 1.6*inch, 2.3*inch, 1.4*inch, 1.1*inch, 0.7*inch], repeatRows=1)
+    table.setStyle(styles.contents_table)
+    doc.build([Paragraph(get_pdf_text("contents", pdf_lang), styles.title), Spacer(1, 15), table])
+    return buffer.getvalue()
@@ -0,0 +1,260 @@
+"""Report fields, reference data and render options, independent of reportlab.
+
+The Streamlit app imports this on every rerun to build its forms; the PDF
+stack (report.py) is only imported when a report is generated.
+"""
+import os
+from datetime import datetime
+
+import pytz
+
+# PDF report languages; report content is entered in English and
+# translated for the others
+PDF_LANGUAGES = {
+    "en": "English",
+    "zh": "Mandarin",
+    "vi": "Vietnamese"
+}
+SOURCE_LANGUAGE = "en"
+
+# Timezone of the review sites, used for the footer and the sidebar clock
+CHINA_TZ = pytz.timezone('Asia/Shanghai')
+
+# Chinese cities dictionary
+CHINESE_CITIES = {
+    "Guangzhou": "广东",
+    "Shenzhen": "深圳",
+    "Dongguan": "东莞",
+    "Foshan": "佛山",
+    "Zhongshan": "中山",
+    "Huizhou": "惠州",
+    "Zhuhai": "珠海",
+    "Jiangmen": "江门",
+    "Zhaoqing": "肇庆",
+    "Shanghai": "上海",
+    "Beijing": "北京",
+    "Suzhou": "苏州",
+    "Hangzhou": "杭州",
+    "Ningbo": "宁波",
+    "Wenzhou": "温州",
+    "Wuhan": "武汉",
+    "Chengdu": "成都",
+    "Chongqing": "重庆",
+    "Tianjin": "天津",
+    "Nanjing": "南京",
+    "Xi'an": "西安",
+    "Qingdao": "青岛",
+    "Dalian": "大连",
+    "Shenyang": "沈阳",
+    "Changsha": "长沙",
+    "Zhengzhou": "郑州",
+    "Jinan": "济南",
+    "Harbin": "哈尔滨",
+    "Changchun": "长春",
+    "Taiyuan": "太原",
+    "Shijiazhuang": "石家庄",
+    "Lanzhou": "兰州",
+    "Xiamen": "厦门",
+    "Fuzhou": "福州",
+    "Nanning": "南宁",
+    "Kunming": "昆明",
+    "Guiyang": "贵阳",
+    "Haikou": "海口",
+    "Ürümqi": "乌鲁木齐",
+    "Lhasa": "拉萨"
+}
+
+# Sample types - separate for English and Chinese
+SAMPLE_TYPES_EN = {
+    "Dev.sample": "Development Sample",
+    "Cfm sample": "Confirmation Sample",
+    "Fit sample": "Fitting Sample"
+
+}
+
+SAMPLE_TYPES_ZH = {
+    "Dev.sample": "开发样",
+    "Cfm sample": "确认样",
+    "Fit sample": "试穿样"
+
+}
+
+SAMPLE_TYPES_VI = {
+    "Dev.sample": "Mẫu phát triển",
+    "Cfm sample": "Mẫu xác nhận",
+    "Fit sample": "Mẫu thử giày"
+}
+
+# Measurement items in both languages
+MEASUREMENT_ITEMS_EN = {
+    "left": [
+        ("Last Length", "Last Length"),
+        ("Toe Girth", "Toe Girth"),
+        ("Ball Girth", "Ball Girth"),
+        ("Waist Girth", "Waist Girth"),
+        ("Instep Girth", "Instep Girth"),
+        ("Vamp length", "Vamp length"),
+        ("Back Height", "Back Height"),
+        ("Boot Height", "Boot Height"),
+        ("Boot top Width", "Boot top Width"),
+        ("Boot Calf Width", "Boot Calf Width"),
+        ("Ankle Width", "Ankle Width")
+    ],
+    "right": [
+        ("Toe Width", "Toe Width"),
+        ("Bottom Width", "Bottom Width"),
+        ("Heel Seat Width", "Heel Seat Width"),
+        ("Heel to Instep Girth", "Heel to Instep Girth"),
+        ("Toe Spring", "Toe Spring"),
+        ("Thickness", "Thickness"),
+        ("Shank", "Shank"),
+        ("Mid-sole", "Mid-sole"),
+        ("Outsole Degree", "Outsole Degree"),
+        ("Sock Foam", "Sock Foam")
+    ]
+}
+
+MEASUREMENT_ITEMS_ZH = {
+    "left": [
+        ("楦长", "楦长"),
+        ("趾围", "趾围"),
+        ("掌围", "掌围"),
+        ("腰围", "腰围"),
+        ("背围", "背围"),
+        ("鞋口长度", "鞋口长度"),
+        ("后跟高度", "后跟高度"),
+        ("靴筒高度", "靴筒高度"),
+        ("靴筒宽度", "靴筒宽度"),
+        ("小腿宽度", "小腿宽度"),
+        ("脚踝宽度", "脚踝宽度")
+    ],
+    "right": [
+        ("趾宽", "趾宽"),
+        ("掌宽", "掌宽"),
+        ("后跟宽度", "后跟宽度"),
+        ("后跟到脚背长度", "后跟到脚背长度"),
+        ("鞋头翘度", "鞋头翘度"),
+        ("厚度", "厚度"),
+        ("钢芯", "钢芯"),
+        ("中底", "中底"),
+        ("大底硬度", "大底硬度"),
+        ("鞋垫", "鞋垫")
+    ]
+}
+
+MEASUREMENT_ITEMS_VI = {
+    "left": [
+        ("Chiều dài phom", "Chiều dài phom"),
+        ("Vòng mũi", "Vòng mũi"),
+        ("Vòng bàn", "Vòng bàn"),
+        ("Vòng eo", "Vòng eo"),
+        ("Vòng mu", "Vòng mu"),
+        ("Chiều dài mũi giày", "Chiều dài mũi giày"),
+        ("Chiều cao gót sau", "Chiều cao gót sau"),
+        ("Chiều cao ống", "Chiều cao ống"),
+        ("Độ rộng miệng ống", "Độ rộng miệng ống"),
+        ("Độ rộng bắp chân", "Độ rộng bắp chân"),
+        ("Độ rộng cổ chân", "Độ rộng cổ chân")
+    ],
+    "right": [
+        ("Độ rộng mũi", "Độ rộng mũi"),
+        ("Độ rộng đế", "Độ rộng đế"),
+        ("Độ rộng gót", "Độ rộng gót"),
+        ("Vòng gót - mu", "Vòng gót - mu"),
+        ("Độ cong mũi", "Độ cong mũi"),
+        ("Độ dày", "Độ dày"),
+        ("Cốt đế", "Cốt đế"),
+        ("Đế giữa", "Đế giữa"),
+        ("Độ cứng đế ngoài", "Độ cứng đế ngoài"),
+        ("Lót xốp", "Lót xốp")
+    ]
+}
+
+# Reference data by PDF language
+SAMPLE_TYPES = {"en": SAMPLE_TYPES_EN, "zh": SAMPLE_TYPES_ZH, "vi": SAMPLE_TYPES_VI}
+MEASUREMENT_ITEMS = {"en": MEASUREMENT_ITEMS_EN, "zh": MEASUREMENT_ITEMS_ZH, "vi": MEASUREMENT_ITEMS_VI}
+
+# Measurement rounds, in the order they are shown
+MEASUREMENT_ROUNDS = ("first", "second", "third", "fourth")
+
+def measurement_field(item_key, round_name):
+    """Payload key of one measurement cell, e.g. ball_girth_first"""
+    return f'{item_key.lower().replace(" ", "_")}_{round_name}'
+
+# Payload keys of every check item's rounds, built once
+MEASUREMENT_FIELDS = {
+    item_key: tuple(measurement_field(item_key, round_name) for round_name in MEASUREMENT_ROUNDS)
+    for side in ("left", "right")
+    for _, item_key in MEASUREMENT_ITEMS_EN[side]
+}
+
+# Sock Foam is measured after/before instead of in rounds
+SOCK_FOAM_FIELDS = ("sock_foam_after", "sock_foam_before")
+
+# Payload keys of user content that is translated for Chinese PDFs
+REPORT_TEXT_FIELDS = [
+    "style_no", "size", "factory", "brand", "last_no", "sales", "new_old", "outsole_no",
+    *[field for fields in MEASUREMENT_FIELDS.values() for field in fields],
+    *SOCK_FOAM_FIELDS, "conclusion", "grandstep_tech", "factory_representative"
+]
+
+def get_report_texts(payload):
+    """Return the user-content fields of a payload as strings"""
+    return {key: payload.get(key, '') or '' for key in REPORT_TEXT_FIELDS}
+
+def payload_from_mapping(values, language="en", city="Shanghai"):
+    """Validate loose input (a spreadsheet row, a JSON body) into a payload
+    
+    Missing fields become empty strings and pdf_language / selected_city
+    fall back to the given defaults. Raises ValueError for input the app
+    itself would reject.
+    """
+    payload = {key: str(values.get(key, '') or '').strip() for key in REPORT_TEXT_FIELDS}
+    
+    if not payload['style_no'] or not payload['factory']:
+        raise ValueError("style_no and factory are required")
+    
+    payload['purpose'] = str(values.get('purpose', '') or '').strip() or next(iter(SAMPLE_TYPES_EN))
+    
+    review_date = values.get('review_date') or datetime.now().date()
+    if isinstance(review_date, str):
+        try:
+            review_date = datetime.fromisoformat(review_date.strip()).date()
+        except ValueError:
+            raise ValueError(f"invalid review_date {review_date!r}")
+    elif isinstance(review_date, datetime):
+        review_date = review_date.date()
+    payload['review_date'] = review_date
+    
+    pdf_language = str(values.get('pdf_language', '') or '').strip().lower() or language
+    pdf_language = {"english": "en", "mandarin": "zh", "chinese": "zh", "vietnamese": "vi"}.get(pdf_language, pdf_language)
+    if pdf_language not in PDF_LANGUAGES:
+        raise ValueError(f"unsupported pdf_language {pdf_language!r}")
+    payload['pdf_language'] = pdf_language
+    
+    selected_city = str(values.get('selected_city', '') or '').strip() or city
+    if selected_city not in CHINESE_CITIES:
+        raise ValueError(f"unknown city {selected_city!r}")
+    payload['selected_city'] = selected_city
+    
+    return payload
+
+# Deterministic output: stable footer timestamp and PDF metadata, so
+# identical payloads always produce identical bytes
+PDF_DETERMINISTIC = os.getenv("PDF_DETERMINISTIC", "0") == "1"
+
+# Draw values onto a precompiled page skeleton instead of laying out every report
+PDF_FAST_RENDER = os.getenv("PDF_FAST_RENDER", "0") == "1"
+
+# Compact output: page streams are written as binary instead of ASCII85 text
+PDF_COMPACT = os.getenv("PDF_COMPACT", "0") == "1"
+
+# Font for Chinese text: "cid" names STSong-Light and leaves the glyphs to
+# the viewer, "ttf" embeds a subset of a TrueType font (PDF_CJK_FONT_PATH)
+PDF_CJK_FONTS = ("cid", "ttf")
+PDF_CJK_FONT = os.getenv("PDF_CJK_FONT", "cid")
+
+# Largest side of a photo in the PDF, and the photos per report; kept here
+# so the app and the renderer can read them without loading PIL
+PHOTO_PRINT_INCHES = 3.2
+PHOTO_MAX_COUNT = int(os.getenv("PHOTO_MAX_COUNT", 8))
@@ -0,0 +1,267 @@
+"""Local history of generated reports, stored in SQLite through SQLAlchemy.
+
+Every generated report's payload is kept as one row: the basic
+information in indexed columns, the measurements as a JSON object of
+check item -> values by round (sock foam: after, before), leaving out items
+with nothing filled in, and the same measurements parsed into numbers for
+analysis. Those are parsed by measurement_analytics the first time it
+reads a report, so saving a report needs neither numpy nor pandas.
+
+Searches match style, factory, brand and last numbers by prefix,
+case-insensitively, and filter on the review date; all of them run on
+indexes and return one page at a time, newest review first.
+
+Identical reports are stored once, keyed by a hash of their fields.
+"""
+import hashlib
+import json
+import os
+from datetime import date, datetime
+
+from sqlalchemy import (
+    JSON, Column, Date, DateTime, Index, Integer, LargeBinary, MetaData, String, Table, Text, bindparam,
+    create_engine, event, func, inspect, select, type_coerce
+)
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.pool import StaticPool
+
+from pdf_cache import normalize_value
+from report_data import MEASUREMENT_FIELDS, SOCK_FOAM_FIELDS
+
+DEFAULT_HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "report_history.sqlite3")
+DEFAULT_PAGE_SIZE = 20
+
+# Above this many matches, a page is read in review-date order from that
+# index instead of sorting every match
+SORT_MATCH_LIMIT = 2000
+
+# Searchable columns, matched by prefix
+SEARCH_FIELDS = ("style_no", "factory", "brand", "last_no")
+
+# Basic information and signatures, stored as plain columns
+INFO_FIELDS = (
+    "style_no", "size", "factory", "purpose", "brand", "last_no", "sales", "new_old", "outsole_no",
+    "conclusion", "grandstep_tech", "factory_representative", "pdf_language", "selected_city"
+)
+
+# Payload keys of each check item's values as stored; Sock Foam has no rounds
+MEASUREMENT_ITEM_FIELDS = {**MEASUREMENT_FIELDS, "Sock Foam": SOCK_FOAM_FIELDS}
+
+metadata = MetaData()
+
+reports = Table(
+    "reports", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("payload_key", String(64), nullable=False, unique=True),
+    Column("created_at", DateTime, nullable=False),
+    Column("review_date", Date),
+    # NOCASE lets case-insensitive prefix searches (LIKE 'abc%') use the indexes
+    *[Column(field, String(collation="NOCASE"), nullable=False, default="") for field in SEARCH_FIELDS],
+    *[Column(field, String, nullable=False, default="") for field in INFO_FIELDS if field not in SEARCH_FIELDS
+      and field != "conclusion"],
+    Column("conclusion", Text, nullable=False, default=""),
+    Column("measurements", JSON, nullable=False),
+    # float64 check items x rounds (measurement_analytics.ROUND_ITEMS), NaN for blanks;
+    # NULL until measurement_analytics has read the report
+    Column("measurement_values", LargeBinary),
+    # Newest review first, for searches filtered by date or not at all
+    Index("ix_reports_review_date", "review_date", "id"),
+    *[Index(f"ix_reports_{field}", field) for field in SEARCH_FIELDS],
+)
+
+# Columns shown in search results
+SUMMARY_COLUMNS = [
+    reports.c.id, reports.c.style_no, reports.c.factory, reports.c.brand, reports.c.last_no,
+    reports.c.review_date, reports.c.pdf_language, reports.c.created_at
+]
+
+
+def escape_like(text):
+    """Escape LIKE wildcards in user input"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def report_key(payload):
+    """Hash of a payload's report fields
+
+    Unlike the PDF cache key it leaves out photos and output settings, so
+    a report generated again with other settings is the same report.
+    """
+    normalized = {key: normalize_value(value) for key, value in payload.items() if key != "photos"}
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def report_row(payload):
+    """The reports row of a payload"""
+    review_date = payload.get("review_date")
+    if isinstance(review_date, datetime):
+        review_date = review_date.date()
+    row = {field: str(payload.get(field, "") or "").strip() for field in INFO_FIELDS}
+    row.update(
+        payload_key=report_key(payload),
+        created_at=datetime.now(),
+        review_date=review_date if isinstance(review_date, date) else None,
+        measurements={
+            item_key: values for item_key, fields in MEASUREMENT_ITEM_FIELDS.items()
+            if any(values := [str(payload.get(field, "") or "") for field in fields])
+        },
+    )
+    return row
+
+
+def row_payload(row):
+    """The payload of a reports row"""
+    payload = {field: row[field] for field in INFO_FIELDS}
+    for item_key, fields in MEASUREMENT_ITEM_FIELDS.items():
+        values = row["measurements"].get(item_key) or [""] * len(fields)
+        payload.update(zip(fields, values))
+    payload["review_date"] = row["review_date"]
+    return payload
+
+
+class ReportHistory:
+    """SQLite store of report payloads with indexed, paginated search"""
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.engine = create_engine(
+            f"sqlite:///{path}", connect_args={"check_same_thread": False},
+            # Every connection to ":memory:" would be a separate database
+            poolclass=StaticPool if path == ":memory:" else None
+        )
+        event.listen(self.engine, "connect", self._configure_connection)
+        metadata.create_all(self.engine)
+        with self.engine.begin() as connection:
+            if "measurement_values" not in {column["name"] for column in inspect(connection).get_columns("reports")}:
+                # Histories from before parsed measurements were stored; they are parsed on first read
+                connection.exec_driver_sql("ALTER TABLE reports ADD COLUMN measurement_values BLOB")
+
+    @classmethod
+    def from_env(cls):
+        """Create a store at REPORT_HISTORY_PATH"""
+        return cls(path=os.getenv("REPORT_HISTORY_PATH", DEFAULT_HISTORY_PATH))
+
+    @staticmethod
+    def _configure_connection(connection, _):
+        cursor = connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    def save(self, payload):
+        """Store a generated report; an identical payload is stored only once"""
+        self.save_many([payload])
+
+    def save_many(self, payloads):
+        """Store several reports in one transaction"""
+        rows = [report_row(payload) for payload in payloads]
+        if not rows:
+            return
+        with self.engine.begin() as connection:
+            connection.execute(insert(reports).on_conflict_do_nothing(index_elements=["payload_key"]), rows)
+
+    def search(self, date_from=None, date_to=None, page=1, page_size=DEFAULT_PAGE_SIZE, **prefixes):
+        """Return (one page of matching report summaries, total matches)
+
+        prefixes are search fields (style_no, factory, brand, last_no)
+        matched case-insensitively by prefix; empty values are ignored.
+        """
+        prefix_conditions = []
+        conditions = []
+        for field, prefix in prefixes.items():
+            if field not in SEARCH_FIELDS:
+                raise ValueError(f"unknown search field {field!r}")
+            prefix = (prefix or "").strip()
+            if prefix:
+                prefix_conditions.append(reports.c[field].like(f"{escape_like(prefix)}%", escape="\\"))
+        if date_from is not None:
+            conditions.append(reports.c.review_date >= date_from)
+        if date_to is not None:
+            conditions.append(reports.c.review_date <= date_to)
+
+        with self.engine.connect() as connection:
+            total = connection.execute(
+                select(func.count()).select_from(reports).where(*prefix_conditions, *conditions)
+            ).scalar_one()
+            if total > SORT_MATCH_LIMIT:
+                # A broad prefix such as a brand name would otherwise be
+                # read through its own index and sorted in full
+                prefix_conditions = [func.likely(condition) for condition in prefix_conditions]
+            query = (
+                select(*SUMMARY_COLUMNS).where(*prefix_conditions, *conditions)
+                .order_by(reports.c.review_date.desc(), reports.c.id.desc())
+                .limit(page_size).offset((max(page, 1) - 1) * page_size)
+            )
+            rows = [row._asdict() for row in connection.execute(query)]
+        return rows, total
+
+    def get(self, report_id):
+        """Return the payload of a stored report, or None"""
+        with self.engine.connect() as connection:
+            row = connection.execute(select(reports).where(reports.c.id == report_id)).first()
+        if row is None:
+            return None
+        return row_payload(row._asdict())
+
+    def stored_reports(self, after_id=0, batch_size=5000):
+        """Yield every report stored after after_id as its payload plus id,
+        payload_key, created_at and measurement_values, by review date
+
+        Rows are fetched batch_size at a time, so the whole history is never
+        in memory at once.
+        """
+        query = (
+            select(reports).where(reports.c.id > after_id)
+            .order_by(reports.c.review_date, reports.c.id)
+        )
+        with self.engine.connect() as connection:
+            for row in connection.execution_options(yield_per=batch_size).execute(query):
+                row = row._asdict()
+                record = row_payload(row)
+                record.update(
+                    id=row["id"], payload_key=row["payload_key"], created_at=row["created_at"],
+                    measurement_values=row["measurement_values"]
+                )
+                yield record
+
+    def measurement_rows(self, after_id=0, batch_size=5000):
+        """Yield the summary columns and parsed measurements of reports stored after after_id, oldest first"""
+        query = (
+            select(reports.c.id, reports.c.style_no, reports.c.factory, reports.c.brand, reports.c.last_no,
+                   # ISO text: parsed in bulk by the caller rather than row by row here
+                   type_coerce(reports.c.review_date, String).label("review_date"), reports.c.measurement_values)
+            .where(reports.c.id > after_id).order_by(reports.c.id)
+        )
+        with self.engine.connect() as connection:
+            for row in connection.execution_options(yield_per=batch_size).execute(query):
+                yield row._asdict()
+
+    def stored_measurements(self, report_ids):
+        """{id: measurements column (item -> values by round)} of the given reports"""
+        measurements = {}
+        with self.engine.connect() as connection:
+            # Chunked to stay under SQLite's bound-parameter limit
+            for start in range(0, len(report_ids), 900):
+                query = select(reports.c.id, reports.c.measurements).where(
+                    reports.c.id.in_(report_ids[start:start + 900])
+                )
+                measurements.update((row.id, row.measurements) for row in connection.execute(query))
+        return measurements
+
+    def store_measurement_values(self, values):
+        """Store parsed measurements, {id: float64 items x rounds as bytes}"""
+        if not values:
+            return
+        with self.engine.begin() as connection:
+            connection.execute(
+                reports.update().where(reports.c.id == bindparam("report_id"))
+                .values(measurement_values=bindparam("values")),
+                [{"report_id": report_id, "values": data} for report_id, data in values.items()]
+            )
+
+    def count(self):
+        """Number of stored reports"""
+        with self.engine.connect() as connection:
+            return connection.execute(select(func.count()).select_from(reports)).scalar_one()
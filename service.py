@@ -0,0 +1,304 @@
+"""HTTP report-generation service.
+
+    uvicorn service:app --host 0.0.0.0 --port 8000
+
+POST /reports takes a JSON report payload (the fields generate_pdf() reads
+plus pdf_language and selected_city) and streams the PDF back. Translation
+runs in the shared Translator's thread pool and rendering in a process
+pool, so the event loop only coordinates. A semaphore bounds the reports
+being rendered and a queue limit rejects excess load with 503 instead of
+letting latency grow without bound. GET /stats exposes both.
+
+POST /bundles takes a list of such payloads and streams them back as one
+PDF with continuous page numbers and an optional table of contents (see
+pdf_bundle). Each report is sent on as soon as it is rendered, so a
+bundle's memory stays that of one report however many it holds.
+"""
+import asyncio
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Literal, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import create_model
+
+from pdf_bundle import ReportBundle
+from pdf_cache import PDFCache, report_cache_key
+from report import render_bundle_report, render_report_pdf
+from report_data import (
+    CHINESE_CITIES, REPORT_TEXT_FIELDS, PDF_DETERMINISTIC, PDF_LANGUAGES, SOURCE_LANGUAGE, get_report_texts,
+    payload_from_mapping
+)
+from translation import Translator
+
+# Concurrency limits (MAX_CONCURRENT bounds renders, MAX_QUEUE the requests waiting for one)
+RENDER_WORKERS = int(os.getenv("REPORT_SERVICE_RENDER_WORKERS", os.cpu_count() or 1))
+MAX_CONCURRENT = int(os.getenv("REPORT_SERVICE_MAX_CONCURRENT", RENDER_WORKERS * 4))
+MAX_QUEUE = int(os.getenv("REPORT_SERVICE_MAX_QUEUE", 200))
+# Threads that wait on translate_many(); kept apart from the default
+# executor so reports waiting on the API never starve cache lookups
+MAX_TRANSLATING = int(os.getenv("REPORT_SERVICE_MAX_TRANSLATING", 64))
+STREAM_CHUNK_SIZE = 64 * 1024
+MAX_BUNDLE_REPORTS = int(os.getenv("REPORT_SERVICE_MAX_BUNDLE_REPORTS", 1000))
+
+# Request body: every report field is an optional string
+ReportRequest = create_model(
+    "ReportRequest",
+    **{key: (str, "") for key in REPORT_TEXT_FIELDS},
+    purpose=(str, ""),
+    review_date=(Optional[date], None),
+    pdf_language=(Literal[tuple(PDF_LANGUAGES)], SOURCE_LANGUAGE),
+    selected_city=(str, "Shanghai"),
+    batch_translation=(bool, True),
+)
+
+BundleRequest = create_model(
+    "BundleRequest",
+    reports=(list[ReportRequest], ...),
+    table_of_contents=(bool, False),
+)
+
+
+class ServiceState:
+    """Process-wide pools and counters"""
+
+    def __init__(self):
+        self.translator = None
+        self.render_pool = None
+        self.translation_waiters = None
+        self.pdf_cache = None
+        self.slots = None
+        self.translating = 0
+        self.in_flight = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.cache_hits = 0
+
+
+state = ServiceState()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    state.translator = Translator.from_env()
+    state.render_pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS)
+    state.translation_waiters = ThreadPoolExecutor(max_workers=MAX_TRANSLATING, thread_name_prefix="report-translate")
+    state.pdf_cache = PDFCache.from_env()
+    state.slots = asyncio.Semaphore(MAX_CONCURRENT)
+    yield
+    state.render_pool.shutdown(cancel_futures=True)
+    state.translation_waiters.shutdown(wait=False, cancel_futures=True)
+    state.translator.executor.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(title="Factory Sample Review Report Service", lifespan=lifespan)
+
+
+def _render(payload, report_texts, deterministic):
+    """Process-pool worker: render one report to bytes"""
+    return render_report_pdf(payload, report_texts, deterministic).getvalue()
+
+
+async def translate_report(payload, batched=True):
+    """Translate a report's user content in the translator's thread pool
+
+    Returns (report_texts, whether every translation completed). Counted
+    in state.translating while it runs, one per report.
+    """
+    report_texts = get_report_texts(payload)
+    if payload['pdf_language'] != SOURCE_LANGUAGE:
+        loop = asyncio.get_running_loop()
+        state.translating += 1
+        try:
+            result = await loop.run_in_executor(
+                state.translation_waiters, state.translator.translate_many, report_texts, payload['pdf_language'],
+                batched
+            )
+        finally:
+            state.translating -= 1
+        return result.texts, result.complete
+    return report_texts, True
+
+
+async def render_report(payload, report_texts):
+    """Render in the process pool, holding one of the bounded render slots"""
+    return await render_in_pool(_render, payload, report_texts, PDF_DETERMINISTIC)
+
+
+async def render_in_pool(function, *args):
+    """Run function(*args) in the process pool, holding one of the bounded render slots"""
+    if state.queued >= MAX_QUEUE:
+        state.rejected += 1
+        raise HTTPException(status_code=503, detail="Report queue is full", headers={"Retry-After": "5"})
+
+    state.queued += 1
+    try:
+        await state.slots.acquire()
+    finally:
+        state.queued -= 1
+
+    state.in_flight += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(state.render_pool, function, *args)
+    finally:
+        state.in_flight -= 1
+        state.slots.release()
+
+
+def _stream(data):
+    for start in range(0, len(data), STREAM_CHUNK_SIZE):
+        yield data[start:start + STREAM_CHUNK_SIZE]
+
+
+@app.post("/reports", response_class=StreamingResponse)
+async def create_report(request: ReportRequest):
+    """Render one report and stream the PDF"""
+    values = request.model_dump()
+    batched = values.pop("batch_translation")
+    try:
+        payload = payload_from_mapping(values)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    start = time.perf_counter()
+    # Only deterministic PDFs are cached; others carry the time they were made
+    cache_key = report_cache_key(payload, deterministic=True) if PDF_DETERMINISTIC else None
+    data = await asyncio.to_thread(state.pdf_cache.get, cache_key) if cache_key else None
+    if data is not None:
+        state.cache_hits += 1
+    else:
+        # Translation is not counted against the render slots: it waits on
+        # the API, bounded by the translator's own pool and deadline, so a
+        # slow translation never holds up reports that are ready to render
+        report_texts, complete = await translate_report(payload, batched)
+        try:
+            data = await render_report(payload, report_texts)
+        except HTTPException:
+            raise
+        except Exception as e:
+            state.failed += 1
+            raise HTTPException(status_code=500, detail=f"Error generating PDF: {e}")
+        # A PDF with values left untranslated is rendered again next time
+        if cache_key and complete:
+            await asyncio.to_thread(state.pdf_cache.put, cache_key, data)
+    state.completed += 1
+
+    style_no = re.sub(r"[^0-9A-Za-z._-]+", "_", payload['style_no']).strip("_") or "report"
+    filename = f"Sample_Review_{style_no}_{payload['selected_city']}.pdf"
+    return StreamingResponse(
+        _stream(data),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Content-Length": str(len(data)),
+            "X-Render-Seconds": f"{time.perf_counter() - start:.3f}",
+        },
+    )
+
+
+async def render_bundle(bundle, payload, report_texts):
+    """Render the next report of a bundle and append it; returns the PDF bytes written for it"""
+    data = await render_in_pool(
+        render_bundle_report, payload, report_texts, bundle.pages, bundle.generated_at, PDF_DETERMINISTIC
+    )
+    # Copying the objects is a few milliseconds of parsing; keep it off the event loop
+    await asyncio.to_thread(bundle.add_rendered, data, payload, report_texts)
+    return bundle.take_output()
+
+
+async def _stream_bundle(bundle, reports, first):
+    """Yield the bundle's bytes report by report, the first already rendered"""
+    try:
+        yield first
+        for payload, report_texts in reports:
+            yield await render_bundle(bundle, payload, report_texts)
+        await asyncio.to_thread(bundle.close)
+        yield bundle.take_output()
+    except Exception:
+        # The response has started; all that is left is to cut it short
+        state.failed += 1
+        raise
+    state.completed += 1
+
+
+@app.post("/bundles", response_class=StreamingResponse)
+async def create_bundle(request: BundleRequest):
+    """Render several reports into one PDF and stream it as the reports are rendered"""
+    if not request.reports:
+        raise HTTPException(status_code=422, detail="No reports")
+    if len(request.reports) > MAX_BUNDLE_REPORTS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_BUNDLE_REPORTS} reports per bundle")
+    payloads = []
+    for index, report in enumerate(request.reports):
+        values = report.model_dump()
+        batched = values.pop("batch_translation")
+        try:
+            payloads.append((payload_from_mapping(values), batched))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"reports[{index}]: {e}")
+
+    texts = await asyncio.gather(*(translate_report(payload, batched) for payload, batched in payloads))
+    reports = [(payload, report_texts) for (payload, _), (report_texts, _) in zip(payloads, texts)]
+
+    # Page numbers continue from report to report, so they are rendered in
+    # order. The first is rendered before responding, so a full queue or a
+    # broken report still gets a proper status code.
+    bundle = ReportBundle(None, request.table_of_contents, deterministic=PDF_DETERMINISTIC)
+    try:
+        first = await render_bundle(bundle, *reports[0])
+    except HTTPException:
+        raise
+    except Exception as e:
+        state.failed += 1
+        raise HTTPException(status_code=500, detail=f"Error generating PDF: {e}")
+
+    return StreamingResponse(
+        _stream_bundle(bundle, reports[1:], first),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f'attachment; filename="Sample_Review_bundle_{len(reports)}.pdf"',
+        },
+    )
+
+
+@app.get("/stats")
+async def stats():
+    """Concurrency limits, queue depth and counters"""
+    return {
+        "render_workers": RENDER_WORKERS,
+        "max_concurrent": MAX_CONCURRENT,
+        "max_queue": MAX_QUEUE,
+        "max_translating": MAX_TRANSLATING,
+        "translating": state.translating,
+        "in_flight": state.in_flight,
+        "queued": state.queued,
+        "completed": state.completed,
+        "failed": state.failed,
+        "rejected": state.rejected,
+        "pdf_cache_hits": state.cache_hits,
+        "translation_cache": state.translator.cache.stats(),
+        "translation_prefiltered": state.translator.prefiltered,
+        "translation_memory": state.translator.memory.stats() if state.translator.memory else None,
+        "translation_api": state.translator.available,
+        "translation_breaker": state.translator.breaker.stats(),
+    }
+
+
+@app.get("/cities")
+async def cities():
+    """Valid values for selected_city"""
+    return CHINESE_CITIES
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=os.getenv("REPORT_SERVICE_HOST", "127.0.0.1"), port=int(os.getenv("REPORT_SERVICE_PORT", 8000)))
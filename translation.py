@@ -0,0 +1,578 @@
+"""GPT translation of report content, independent of Streamlit.
+
+Translator owns the OpenAI client, the shared TranslationCache, the
+optional TranslationMemory (glossary and learned translations) and a bounded
+worker pool. Requests are retried with jittered backoff, and a circuit
+breaker stops sending them for a cool-down period once the API keeps
+failing, so a report fails fast instead of waiting out every field. The
+Streamlit app, the batch CLI and the HTTP service each create one per
+process and share it between reports.
+
+BackgroundTranslator translates field values while a report is still being
+edited, so generating it mostly finds the translations in the cache.
+"""
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+from translation_filter import local_translation
+
+TRANSLATION_MODEL = "gpt-4o-mini"
+
+LANGUAGE_NAMES = {
+    "zh": "Chinese (Mandarin)",
+    "en": "English",
+    "vi": "Vietnamese"
+}
+
+# Batched translation limits - one request per chunk
+TRANSLATION_BATCH_MAX_ITEMS = 60
+TRANSLATION_BATCH_MAX_CHARS = 6000
+
+# Concurrent translation settings - worker count and per-report deadline
+TRANSLATION_MAX_WORKERS = int(os.getenv("TRANSLATION_MAX_WORKERS", 8))
+TRANSLATION_DEADLINE_SECONDS = float(os.getenv("TRANSLATION_DEADLINE_SECONDS", 20))
+
+# Resilience settings - per-request timeout, retries with jittered backoff,
+# and the failures that open the circuit breaker for a cool-down period
+TRANSLATION_REQUEST_TIMEOUT = float(os.getenv("TRANSLATION_REQUEST_TIMEOUT", 15))
+TRANSLATION_RETRIES = int(os.getenv("TRANSLATION_RETRIES", 2))
+TRANSLATION_RETRY_BACKOFF = 0.5
+TRANSLATION_RETRY_MAX_WAIT = 8
+TRANSLATION_BREAKER_FAILURES = int(os.getenv("TRANSLATION_BREAKER_FAILURES", 5))
+TRANSLATION_BREAKER_COOLDOWN_SECONDS = float(os.getenv("TRANSLATION_BREAKER_COOLDOWN_SECONDS", 30))
+
+# Background pre-translation - workers shared by every session
+TRANSLATION_PRETRANSLATE_WORKERS = int(os.getenv("TRANSLATION_PRETRANSLATE_WORKERS", 2))
+
+
+def openai_client(api_key):
+    """Create the OpenAI client; retries are done here, so the SDK's own are off"""
+    from openai import OpenAI
+
+    return OpenAI(api_key=api_key, timeout=TRANSLATION_REQUEST_TIMEOUT, max_retries=0)
+
+
+def is_request_error(error):
+    """True for errors caused by the request itself (bad input, garbled JSON), not by the API"""
+    if isinstance(error, ValueError):
+        return True
+    return getattr(error, "status_code", None) in (400, 404, 413, 422)
+
+
+def is_transient(error):
+    """True for errors worth retrying: timeouts, connection errors, 408/409/429 and 5xx"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return status_code in (408, 409, 429) or status_code >= 500
+    # The SDK's connection and timeout errors carry no status code
+    from openai import APIConnectionError
+
+    return isinstance(error, APIConnectionError)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Opens after consecutive API failures and lets one trial request through after the cool-down
+
+    Requests arriving while the trial runs wait for its outcome instead of
+    being refused, so a report sent just after an outage is not lost.
+    """
+
+    def __init__(self, failure_threshold=TRANSLATION_BREAKER_FAILURES, cooldown=TRANSLATION_BREAKER_COOLDOWN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Condition()
+        self.failures = 0
+        self.opened_at = None
+        self._trial_started = None
+        # Counters since startup
+        self.trips = 0
+        self.short_circuited = 0
+
+    @property
+    def is_open(self):
+        """True while requests are being refused"""
+        with self._lock:
+            return self.opened_at is not None and time.monotonic() - self.opened_at < self.cooldown
+
+    def retry_in(self):
+        """Seconds until the next trial request is allowed (0 when closed)"""
+        with self._lock:
+            if self.opened_at is None:
+                return 0.0
+            return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def allow(self):
+        """Return True if a request may be sent now"""
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                if self.opened_at is None:
+                    return True
+                if now - self.opened_at < self.cooldown:
+                    self.short_circuited += 1
+                    return False
+                # Half-open: one trial request decides whether to close
+                # again; a trial that never reports back is replaced
+                if self._trial_started is None or now - self._trial_started >= self.cooldown:
+                    self._trial_started = now
+                    return True
+                self._lock.wait(self.cooldown - (now - self._trial_started))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_started = None
+            self._lock.notify_all()
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_started is not None or (self.opened_at is None and self.failures >= self.failure_threshold):
+                if self.opened_at is None:
+                    self.trips += 1
+                self.opened_at = time.monotonic()
+            self._trial_started = None
+            self._lock.notify_all()
+
+    def stats(self):
+        """Return the breaker state and counters"""
+        return {
+            "open": self.is_open,
+            "retry_in": round(self.retry_in(), 1),
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+            "short_circuited": self.short_circuited,
+        }
+
+
+def chunk_translation_items(items):
+    """Split (key, text) pairs into chunks that fit a single request"""
+    chunks = []
+    current = {}
+    current_chars = 0
+    for key, text in items:
+        if current and (len(current) >= TRANSLATION_BATCH_MAX_ITEMS
+                        or current_chars + len(text) > TRANSLATION_BATCH_MAX_CHARS):
+            chunks.append(current)
+            current = {}
+            current_chars = 0
+        current[key] = text
+        current_chars += len(text)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class TranslationResult:
+    """Outcome of Translator.translate_many()"""
+
+    def __init__(self, texts, failed, timed_out, local, circuit_open=False):
+        # Same keys as the input; untranslated values keep their source text
+        self.texts = texts
+        # Source texts answered by the local pre-filter, without the cache or the API
+        self.local = local
+        # True if the circuit breaker refused requests for this call
+        self.circuit_open = circuit_open
+        # Source texts whose request failed
+        self.failed = failed
+        # Source texts still unfinished when the deadline expired
+        self.timed_out = timed_out
+
+    @property
+    def complete(self):
+        """True if no value kept its source text because of a failure, the deadline or the circuit breaker
+
+        Output built from an incomplete result must not be cached.
+        """
+        return not (self.failed or self.timed_out or self.circuit_open)
+
+
+class Translator:
+    """Cached, concurrent GPT translator"""
+
+    def __init__(self, client, cache, model=TRANSLATION_MODEL,
+                 max_workers=TRANSLATION_MAX_WORKERS, deadline=TRANSLATION_DEADLINE_SECONDS, client_factory=None,
+                 memory=None, retries=TRANSLATION_RETRIES, breaker=None):
+        # Either a client, or a factory that creates it on the first request
+        self._client = client
+        self._client_factory = client_factory
+        self._client_lock = threading.Lock()
+        self.cache = cache
+        # Glossary and learned translations, consulted before the cache
+        self.memory = memory
+        self.model = model
+        self.deadline = deadline
+        self.retries = retries
+        self.breaker = breaker or CircuitBreaker()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="translate")
+        # Texts answered by the local pre-filter since startup
+        self.prefiltered = 0
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """Create a translator from OPENAI_API_KEY, the shared on-disk cache and the translation memory"""
+        from dotenv import load_dotenv
+        from translation_cache import TranslationCache
+        from translation_memory import TranslationMemory
+
+        load_dotenv()
+        api_key = os.getenv("OPENAI_API_KEY")
+        client = openai_client(api_key) if api_key else None
+        kwargs.setdefault("memory", TranslationMemory.from_env())
+        return cls(client, TranslationCache.from_env(), **kwargs)
+
+    @property
+    def client(self):
+        if self._client is None and self._client_factory is not None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._client_factory()
+        return self._client
+
+    @property
+    def available(self):
+        return self._client is not None or self._client_factory is not None
+
+    def cached(self, text, target_language):
+        """Return the glossary, remembered or cached translation, or None"""
+        if self.memory is not None:
+            remembered = self.memory.get(text, target_language, self.model)
+            if remembered is not None:
+                return remembered
+        return self.cache.get(text, target_language, self.model)
+
+    def accept(self, text, target_language, translated):
+        """Store an API translation in the cache and the translation memory"""
+        self.cache.set(text, target_language, self.model, translated)
+        if self.memory is not None:
+            self.memory.learn(text, target_language, translated, self.model)
+
+    def _should_retry(self, error):
+        return is_transient(error) and not self.breaker.is_open
+
+    def send(self, request, *args):
+        """Send one API request through the circuit breaker, retrying transient errors
+
+        Raises CircuitOpenError without sending anything while the breaker
+        is open. Every failed attempt counts towards opening it, except
+        errors caused by the request itself. Transient errors are retried
+        with jittered exponential backoff until the breaker opens.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError("translation API paused after repeated failures")
+        retrying = Retrying(
+            stop=stop_after_attempt(self.retries + 1),
+            wait=wait_random_exponential(multiplier=TRANSLATION_RETRY_BACKOFF, max=TRANSLATION_RETRY_MAX_WAIT),
+            retry=retry_if_exception(self._should_retry),
+            reraise=True
+        )
+        for attempt in retrying:
+            with attempt:
+                try:
+                    result = request(*args)
+                except Exception as e:
+                    if is_request_error(e):
+                        # The API answered; the request was the problem
+                        self.breaker.record_success()
+                    else:
+                        self.breaker.record_failure()
+                    raise
+        self.breaker.record_success()
+        return result
+
+    def request_translation(self, text, target_language):
+        """Send one translation request and return the translated text"""
+        return self.send(self._request_translation, text, target_language)
+
+    def request_batch_translation(self, chunk, target_language):
+        """Send one JSON-keyed translation request and return the parsed object"""
+        return self.send(self._request_batch_translation, chunk, target_language)
+
+    def _request_translation(self, text, target_language):
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": (
+                    "You are a professional translator. Translate the following text to "
+                    f"{LANGUAGE_NAMES.get(target_language, target_language)}. Only return the translation, "
+                    "no explanations. Preserve any numbers, dates, and special formatting."
+                )},
+                {"role": "user", "content": text}
+            ],
+            temperature=0.1,
+            max_tokens=500
+        )
+        return response.choices[0].message.content.strip()
+
+    def _request_batch_translation(self, chunk, target_language):
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": (
+                    "You are a professional translator. Translate every value of the JSON object to "
+                    f"{LANGUAGE_NAMES.get(target_language, target_language)}. Return a JSON object with "
+                    "exactly the same keys and the translated strings as values. Do not add explanations. "
+                    "Preserve any numbers, dates, and special formatting."
+                )},
+                {"role": "user", "content": json.dumps(chunk, ensure_ascii=False)}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.1
+        )
+        return json.loads(response.choices[0].message.content)
+
+    def translate(self, text, target_language):
+        """Translate one text through the cache; raises if the request fails"""
+        local = local_translation(text, target_language)
+        if local is not None:
+            with self._stats_lock:
+                self.prefiltered += 1
+            return local
+        cached = self.cached(text, target_language)
+        if cached is not None:
+            return cached
+        if not self.available:
+            return text
+        translated = self.request_translation(text, target_language)
+        self.accept(text, target_language, translated)
+        return translated
+
+    # Worker jobs. Results go straight into the thread-safe shared cache and memory, so
+    # requests finishing after a report's deadline still help the next report.
+    def _translate_job(self, text, target_language):
+        """Worker: translate one text"""
+        translated = self.request_translation(text, target_language)
+        self.accept(text, target_language, translated)
+        return {text: translated}
+
+    def _translate_batch_job(self, chunk, target_language):
+        """Worker: translate a chunk, keeping only the keys returned intact"""
+        response = self.request_batch_translation(chunk, target_language)
+        translated = {}
+        if isinstance(response, dict):
+            for item_id, source_text in chunk.items():
+                value = response.get(item_id)
+                if isinstance(value, str) and value.strip():
+                    translated[source_text] = value.strip()
+                    self.accept(source_text, target_language, value.strip())
+        return translated
+
+    def translate_many(self, texts, target_language, batched=True, deadline=None):
+        """Translate a dict of texts concurrently with as few requests as possible
+
+        Empty values are kept as they are, codes, numbers and text already
+        in the target language are answered by the local pre-filter, and
+        glossary, remembered and cached values are reused. The rest is sent
+        to the worker pool, either as JSON-keyed chunks (batched) or one
+        request per text; any key a chunk drops or garbles is retried on its
+        own. Whatever is not finished when the deadline expires, or is
+        refused by the open circuit breaker, keeps its source text.
+        """
+        results = dict(texts)
+        if target_language == "en":
+            return TranslationResult(results, set(), set(), set())
+
+        # Only send values the pre-filter, the memory and the cache can't answer; identical texts are sent once
+        pending = {}
+        local = set()
+        for key, text in texts.items():
+            if not text or not text.strip():
+                continue
+            local_text = local_translation(text, target_language)
+            if local_text is not None:
+                results[key] = local_text
+                local.add(text)
+                continue
+            cached = self.cached(text, target_language)
+            if cached is not None:
+                results[key] = cached
+            else:
+                pending.setdefault(text, []).append(key)
+
+        translated = {}
+        failed = set()
+        timed_out = set()
+        circuit_open = False
+
+        if pending and self.available and self.breaker.is_open:
+            # The API keeps failing; don't wait on it until the cool-down ends
+            failed.update(pending)
+            circuit_open = True
+        elif pending and self.available:
+            # future -> (source texts, is batch job)
+            jobs = {}
+            if batched:
+                # Number the unique texts so the model sees short, stable keys
+                numbered = {str(i): text for i, text in enumerate(pending)}
+                for chunk in chunk_translation_items(numbered.items()):
+                    job = self.executor.submit(self._translate_batch_job, chunk, target_language)
+                    jobs[job] = (list(chunk.values()), True)
+            else:
+                for source_text in pending:
+                    job = self.executor.submit(self._translate_job, source_text, target_language)
+                    jobs[job] = ([source_text], False)
+
+            end_time = time.monotonic() + (self.deadline if deadline is None else deadline)
+            not_done = set(jobs)
+            while not_done:
+                remaining = end_time - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, not_done = wait(not_done, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    source_texts, is_batch = jobs[future]
+                    try:
+                        translated.update(future.result())
+                    except CircuitOpenError:
+                        failed.update(source_texts)
+                        circuit_open = True
+                        continue
+                    except Exception:
+                        if not is_batch:
+                            failed.update(source_texts)
+                    if is_batch:
+                        # Per-item fallback for anything missing from the batch response
+                        for source_text in source_texts:
+                            if source_text not in translated:
+                                retry = self.executor.submit(self._translate_job, source_text, target_language)
+                                jobs[retry] = ([source_text], False)
+                                not_done.add(retry)
+
+            # Deadline expired - drop queued work, running requests finish in the background
+            for future in not_done:
+                future.cancel()
+        else:
+            # Fallback to the source text if no API key
+            failed.update(pending)
+
+        for source_text, keys in pending.items():
+            value = translated.get(source_text)
+            if value is None:
+                value = source_text
+                if source_text not in failed:
+                    timed_out.add(source_text)
+            for key in keys:
+                results[key] = value
+
+        with self._stats_lock:
+            self.prefiltered += len(local)
+        return TranslationResult(results, failed, timed_out, local, circuit_open)
+
+    def translate_languages(self, texts, target_languages, batched=True, deadline=None):
+        """Translate a dict of texts into several languages at once
+
+        Each language runs translate_many() on its own thread, so their
+        requests share the worker pool and the deadline instead of queueing
+        behind each other. Returns {language: TranslationResult} in the
+        order of target_languages.
+        """
+        target_languages = list(dict.fromkeys(target_languages))
+        if len(target_languages) < 2:
+            return {
+                language: self.translate_many(texts, language, batched=batched, deadline=deadline)
+                for language in target_languages
+            }
+        # Waiting happens outside the worker pool, so the fan-out can't starve it
+        with ThreadPoolExecutor(max_workers=len(target_languages), thread_name_prefix="translate-language") as fan_out:
+            futures = {
+                language: fan_out.submit(self.translate_many, texts, language, batched, deadline)
+                for language in target_languages
+            }
+            return {language: future.result() for language, future in futures.items()}
+
+
+class BackgroundTranslator:
+    """Translate field values ahead of time, one pending value per field
+
+    submit() queues a field's current value; results land in the
+    translator's cache and memory. Submitting a new value for the same
+    field cancels the queued one, and a request already running for it is
+    superseded: it finishes in the background, but wait() no longer waits
+    for it. Fields are keyed by (owner, field, language), the owner being
+    e.g. a session id.
+    """
+
+    def __init__(self, translator, max_workers=TRANSLATION_PRETRANSLATE_WORKERS):
+        self.translator = translator
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pretranslate")
+        self._lock = threading.Lock()
+        # (owner, field, language) -> (job number, future)
+        self._jobs = {}
+        self._job_numbers = itertools.count()
+        # Counters
+        self.submitted = 0
+        self.cancelled = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, owner, field, text, target_language):
+        """Queue a field's value for translation, replacing its pending value"""
+        key = (owner, field, target_language)
+        with self._lock:
+            previous = self._jobs.pop(key, None)
+            if previous is not None and previous[1].cancel():
+                self.cancelled += 1
+            # Empty values, the source language and values the pre-filter answers need no request
+            if (not text or not text.strip() or target_language == "en"
+                    or local_translation(text, target_language) is not None):
+                return
+            if not self.translator.available or self.translator.breaker.is_open:
+                return
+            number = next(self._job_numbers)
+            self._jobs[key] = (number, self.executor.submit(self._translate, key, number, text))
+            self.submitted += 1
+
+    def _translate(self, key, number, text):
+        """Worker: translate one value into the cache"""
+        try:
+            self.translator.translate(text, key[2])
+        except Exception:
+            with self._lock:
+                self.failed += 1
+        else:
+            with self._lock:
+                self.completed += 1
+        finally:
+            with self._lock:
+                # Unless a newer value replaced this one
+                if self._jobs.get(key, (None,))[0] == number:
+                    del self._jobs[key]
+
+    def pending(self, owner):
+        """Number of an owner's values still queued or running"""
+        with self._lock:
+            return sum(1 for key in self._jobs if key[0] == owner)
+
+    def wait(self, owner, timeout):
+        """Wait up to timeout seconds for an owner's pending values; True if none are left"""
+        with self._lock:
+            futures = [future for key, (_, future) in self._jobs.items() if key[0] == owner]
+        if not futures:
+            return True
+        _, not_done = wait(futures, timeout=timeout)
+        return not not_done
+
+    def stats(self):
+        """Return the counters and the number of pending values"""
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "cancelled": self.cancelled,
+                "completed": self.completed,
+                "failed": self.failed,
+                "pending": len(self._jobs),
+            }
@@ -0,0 +1,193 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Defaults, overridable through environment variables (see .env)
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "translations.sqlite3")
+DEFAULT_MEMORY_MB = 16
+DEFAULT_TTL_DAYS = 90
+DEFAULT_MAX_ENTRIES = 200000
+
+
+def normalize_text(text):
+    """Normalize text for cache lookups (trim and collapse whitespace)"""
+    return " ".join(text.split())
+
+
+class TranslationCache:
+    """Process-wide translation store: in-memory LRU in front of SQLite
+
+    Entries are keyed by normalized text, target language and model. The
+    in-memory layer is capped by an approximate byte budget, the SQLite
+    layer by entry count, and both expire entries older than the TTL.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, memory_mb=DEFAULT_MEMORY_MB,
+                 ttl_days=DEFAULT_TTL_DAYS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.memory_limit = int(memory_mb * 1024 * 1024)
+        self.ttl = ttl_days * 24 * 3600 if ttl_days else None
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._writes_since_evict = 0
+        # Access times of memory hits, written to disk with the next write
+        self._pending_access = {}
+
+        # Hit/miss counters
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                text TEXT NOT NULL,
+                language TEXT NOT NULL,
+                model TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (text, language, model)
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_translations_accessed ON translations (accessed_at)")
+        self._db.commit()
+        self._evict_disk()
+
+    @classmethod
+    def from_env(cls):
+        """Create a cache configured by TRANSLATION_CACHE_* environment variables"""
+        return cls(
+            path=os.getenv("TRANSLATION_CACHE_PATH", DEFAULT_CACHE_PATH),
+            memory_mb=float(os.getenv("TRANSLATION_CACHE_MEMORY_MB", DEFAULT_MEMORY_MB)),
+            ttl_days=float(os.getenv("TRANSLATION_CACHE_TTL_DAYS", DEFAULT_TTL_DAYS)),
+            max_entries=int(os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        )
+
+    @staticmethod
+    def _entry_size(key, translation):
+        return len(key[0].encode("utf-8")) + len(translation.encode("utf-8")) + 64
+
+    def _expired(self, created_at, now):
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def _remember(self, key, translation, created_at):
+        """Put an entry in the memory layer and evict least recently used ones"""
+        if key in self._memory:
+            old_translation, _ = self._memory.pop(key)
+            self._memory_bytes -= self._entry_size(key, old_translation)
+        self._memory[key] = (translation, created_at)
+        self._memory_bytes += self._entry_size(key, translation)
+        while self._memory_bytes > self.memory_limit and self._memory:
+            old_key, (old_translation, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= self._entry_size(old_key, old_translation)
+
+    def get(self, text, language, model):
+        """Return the cached translation or None"""
+        key = (normalize_text(text), language, model)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                translation, created_at = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self._pending_access[key] = now
+                    self.memory_hits += 1
+                    return translation
+                self._memory.pop(key)
+                self._memory_bytes -= self._entry_size(key, translation)
+
+            row = self._db.execute(
+                "SELECT translation, created_at FROM translations WHERE text = ? AND language = ? AND model = ?",
+                key
+            ).fetchone()
+            if row is None or self._expired(row[1], now):
+                self.misses += 1
+                return None
+
+            translation, created_at = row
+            self._db.execute(
+                "UPDATE translations SET accessed_at = ? WHERE text = ? AND language = ? AND model = ?",
+                (now, *key)
+            )
+            self._db.commit()
+            self._remember(key, translation, created_at)
+            self.disk_hits += 1
+            return translation
+
+    def set(self, text, language, model, translation):
+        """Store a successful translation in memory and on disk"""
+        key = (normalize_text(text), language, model)
+        now = time.time()
+        with self._lock:
+            self._remember(key, translation, now)
+            self._pending_access.pop(key, None)
+            self._flush_access()
+            self._db.execute(
+                "INSERT OR REPLACE INTO translations (text, language, model, translation, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, translation, now, now)
+            )
+            self._db.commit()
+            self._writes_since_evict += 1
+            if self._writes_since_evict >= 500:
+                self._evict_disk()
+
+    def _flush_access(self):
+        """Write the access times of memory hits to disk, so eviction sees them; committed by the caller"""
+        if self._pending_access:
+            self._db.executemany(
+                "UPDATE translations SET accessed_at = ? WHERE text = ? AND language = ? AND model = ?",
+                [(accessed_at, *key) for key, accessed_at in self._pending_access.items()]
+            )
+            self._pending_access.clear()
+
+    def _evict_disk(self):
+        """Drop expired rows and the least recently used rows over the limit"""
+        self._writes_since_evict = 0
+        self._flush_access()
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM translations WHERE created_at < ?", (time.time() - self.ttl,))
+        if self.max_entries:
+            self._db.execute(
+                "DELETE FROM translations WHERE rowid IN ("
+                "SELECT rowid FROM translations ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+        self._db.commit()
+
+    def stats(self):
+        """Return hit/miss counters and sizes"""
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": entries,
+            }
+
+    def clear(self):
+        """Remove every cached translation"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._pending_access.clear()
+            self._db.execute("DELETE FROM translations")
+            self._db.commit()
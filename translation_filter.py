@@ -0,0 +1,99 @@
+"""Local pre-filter in front of the translation API.
+
+Most report values are measurements, codes and sizes that read the same in
+every language ("25.5mm", "+2", "OS-2024-001", "US 8, EU 41", "Last #12345").
+local_translation() recognises those, and text that is already Chinese, and
+returns them unchanged. Measurements with spelled-out unit words ("3 degrees")
+get the unit word from a small local table. Anything else returns None and
+is left to the API.
+"""
+import re
+
+# Spelled-out unit words, per target language
+UNIT_WORDS = {
+    "zh": {
+        "millimeter": "毫米", "millimeters": "毫米", "millimetre": "毫米", "millimetres": "毫米",
+        "centimeter": "厘米", "centimeters": "厘米", "centimetre": "厘米", "centimetres": "厘米",
+        "inch": "英寸", "inches": "英寸",
+        "degree": "度", "degrees": "度",
+        "gram": "克", "grams": "克",
+        "pair": "双", "pairs": "双",
+        "layer": "层", "layers": "层",
+    },
+    "vi": {
+        "millimeter": "mm", "millimeters": "mm", "millimetre": "mm", "millimetres": "mm",
+        "centimeter": "cm", "centimeters": "cm", "centimetre": "cm", "centimetres": "cm",
+        "inch": "inch", "inches": "inch",
+        "degree": "độ", "degrees": "độ",
+        "gram": "gam", "grams": "gam",
+        "pair": "đôi", "pairs": "đôi",
+        "layer": "lớp", "layers": "lớp",
+    }
+}
+
+NUMBER = r"[+\-±~≈<>]?\d+(?:[.,]\d+)*"
+
+# Tokens that read the same in every language
+PASS_TOKEN = re.compile("|".join([
+    # Numbers, ranges (24-25) and numbers with a unit sign (45°, 5%)
+    rf"{NUMBER}(?:[-~]{NUMBER})*(?:°|%|\"|')?",
+    # Unit symbols on their own (25.5 mm, 2 x 3)
+    r"(?i:mm|cm|m|in|ft|g|kg|oz|lbs?|pcs)|[°%x×\"']",
+    # Size systems (US 8, EU 41)
+    r"US|EUR?|UK|CN|JP|MX|BR|AU|KR",
+    # Codes with at least one digit (OS-2024-001, #12345, 25.5mm, 60A)
+    r"#?(?=\S*\d)[A-Za-z0-9]+(?:[-_.#][A-Za-z0-9]+)*",
+]))
+
+# Labels of the codes on a sample; other words in front of a number ("Too
+# tight no 2", "Sample no. 3") are remarks and get translated
+CODE_LABELS = r"style|last|outsole|insole|sole|article|art|model|mou?ld|item|po|order|lot|batch|sku"
+
+# A known label in front of a code (Last #12345, Style No. ST-2041, Outsole: OS-2024-001)
+LABELLED_CODE = re.compile(
+    rf"(?i:{CODE_LABELS})\.?\s*(?:#|(?i:no|nr|number|code)\.?)?\s*:?\s*"
+    r"#?(?=[-\w./#]*\d)[A-Za-z0-9]+(?:[-_./#][A-Za-z0-9]+)*"
+)
+
+TOKEN_SEPARATORS = re.compile(r"[\s,;/()\[\]]+")
+
+CJK_CHARS = re.compile(r"[㐀-鿿豈-﫿]")
+LATIN_LETTERS = re.compile(r"[A-Za-z]")
+
+
+def is_cjk_dominant(text):
+    """True if the text has at least as many CJK characters as Latin letters"""
+    cjk = len(CJK_CHARS.findall(text))
+    return cjk > 0 and cjk >= len(LATIN_LETTERS.findall(text))
+
+
+def local_translation(text, target_language):
+    """Return the text to use without calling the API, or None to translate it"""
+    stripped = text.strip()
+    if not stripped:
+        return text
+    if target_language == "zh" and is_cjk_dominant(stripped):
+        return text
+    if LABELLED_CODE.fullmatch(stripped):
+        return text
+
+    units = UNIT_WORDS.get(target_language, {})
+    unit_words = False
+    for token in TOKEN_SEPARATORS.split(stripped):
+        if not token or PASS_TOKEN.fullmatch(token):
+            continue
+        if token.lower() in units:
+            unit_words = True
+            continue
+        return None
+
+    if not unit_words:
+        return text
+    # Chinese unit words attach to the number in front of them: "3 degrees" -> "3度"
+    attach = target_language == "zh"
+    return re.sub(
+        r"(\s*)\b([A-Za-z]+)\b",
+        lambda match: ("" if attach else match.group(1)) + units[match.group(2).lower()]
+        if match.group(2).lower() in units else match.group(0),
+        text
+    )
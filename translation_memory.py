@@ -0,0 +1,308 @@
+"""Translation memory and footwear glossary, consulted before the cache and the API.
+
+The glossary holds curated domain terms: the editable glossary.json plus the
+app's own sample types and measurement items. The memory holds translations
+learned from accepted API results and is persisted as JSON lines; like the
+translation cache, learned entries belong to the model that produced them
+and expire after the same TTL. Lookups try an exact match, then a
+normalized match (case and whitespace ignored) and, when enabled, a fuzzy
+match for near-identical sentences: ones that only differ in punctuation or
+in small words such as articles, never in a word that carries meaning.
+"""
+import difflib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+from report_data import MEASUREMENT_ITEMS_EN, MEASUREMENT_ITEMS_ZH, SAMPLE_TYPES_EN, SAMPLE_TYPES_ZH
+from translation_cache import DEFAULT_TTL_DAYS
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Defaults, overridable through environment variables (see .env)
+DEFAULT_GLOSSARY_PATH = os.path.join(MODULE_DIR, "glossary.json")
+DEFAULT_MEMORY_PATH = os.path.join(MODULE_DIR, "translation_memory.jsonl")
+DEFAULT_MAX_ENTRIES = 50000
+
+# Fuzzy matching: minimum similarity, and only sentences at least this long
+FUZZY_CUTOFF = 0.9
+FUZZY_MIN_CHARS = 20
+
+# Words a near-identical sentence may add, drop or swap
+FUZZY_IGNORABLE_WORDS = {"a", "an", "the", "is", "are", "be", "to", "please", "and"}
+
+WORD = re.compile(r"\w+")
+
+
+def normalize_term(text):
+    """Normalize text for memory lookups (case and whitespace)
+
+    Punctuation is kept: "Pass?" is not "Pass", and the translation of one
+    would be wrong for the other.
+    """
+    return " ".join(text.casefold().split())
+
+
+def only_trivial_differences(text, other):
+    """True if two normalized sentences differ only in punctuation and ignorable words"""
+    words, other_words = WORD.findall(text), WORD.findall(other)
+    matcher = difflib.SequenceMatcher(None, words, other_words, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal" and not set(words[i1:i2] + other_words[j1:j2]) <= FUZZY_IGNORABLE_WORDS:
+            return False
+    return True
+
+
+def builtin_glossary():
+    """Terms the app already knows in Chinese: sample types and measurement items"""
+    terms = {}
+    for key, description in SAMPLE_TYPES_EN.items():
+        terms[key] = SAMPLE_TYPES_ZH[key]
+        terms[description] = SAMPLE_TYPES_ZH[key]
+    for side in ("left", "right"):
+        for (item_en, _), (item_zh, _) in zip(MEASUREMENT_ITEMS_EN[side], MEASUREMENT_ITEMS_ZH[side]):
+            terms[item_en] = item_zh
+    return {"zh": terms}
+
+
+class TranslationMemory:
+    """Glossary plus learned translations, with exact, normalized and fuzzy lookup
+
+    Glossary terms apply to every model; learned translations are kept per
+    language and model and expire ttl_days after they were learned.
+    """
+
+    def __init__(self, glossary_path=DEFAULT_GLOSSARY_PATH, memory_path=DEFAULT_MEMORY_PATH,
+                 max_entries=DEFAULT_MAX_ENTRIES, fuzzy=False, ttl_days=DEFAULT_TTL_DAYS):
+        self.glossary_path = glossary_path
+        self.memory_path = memory_path
+        self.max_entries = max_entries
+        self.fuzzy = fuzzy
+        self.ttl = ttl_days * 24 * 3600 if ttl_days else None
+
+        self._lock = threading.Lock()
+        # language -> {text: translation}, exact and normalized keys
+        self._glossary = {}
+        self._glossary_normalized = {}
+        # (language, model) -> OrderedDict of text -> (translation, learned_at), oldest first
+        self._memory = {}
+        self._memory_normalized = {}
+
+        # Hit/miss counters
+        self.glossary_hits = 0
+        self.exact_hits = 0
+        self.normalized_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+        for language, terms in builtin_glossary().items():
+            for text, translation in terms.items():
+                self._add_term(text, language, translation)
+        for language, terms in self.load_glossary().items():
+            for text, translation in terms.items():
+                self._add_term(text, language, translation)
+        self._load_memory()
+
+    @classmethod
+    def from_env(cls):
+        """Create a memory configured by TRANSLATION_GLOSSARY_PATH and TRANSLATION_MEMORY_* variables
+
+        Learned entries expire with the translation cache's TTL unless
+        TRANSLATION_MEMORY_TTL_DAYS sets another.
+        """
+        return cls(
+            glossary_path=os.getenv("TRANSLATION_GLOSSARY_PATH", DEFAULT_GLOSSARY_PATH),
+            memory_path=os.getenv("TRANSLATION_MEMORY_PATH", DEFAULT_MEMORY_PATH) or None,
+            max_entries=int(os.getenv("TRANSLATION_MEMORY_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            fuzzy=os.getenv("TRANSLATION_MEMORY_FUZZY", "0") == "1",
+            ttl_days=float(os.getenv(
+                "TRANSLATION_MEMORY_TTL_DAYS", os.getenv("TRANSLATION_CACHE_TTL_DAYS", DEFAULT_TTL_DAYS)
+            ))
+        )
+
+    def _expired(self, learned_at, now):
+        return self.ttl is not None and now - learned_at > self.ttl
+
+    @contextmanager
+    def _file_lock(self):
+        """Hold the memory file's lock, shared by every process appending to or compacting it"""
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.memory_path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _memory_line(text, language, model, translation, learned_at):
+        return json.dumps(
+            {"text": text, "language": language, "model": model, "translation": translation, "learned_at": learned_at},
+            ensure_ascii=False
+        ) + "\n"
+
+    def load_glossary(self):
+        """Read the editable glossary file: {language: {term: translation}}"""
+        if not self.glossary_path or not os.path.exists(self.glossary_path):
+            return {}
+        with open(self.glossary_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _add_term(self, text, language, translation):
+        self._glossary.setdefault(language, {})[text.strip()] = translation
+        self._glossary_normalized.setdefault(language, {})[normalize_term(text)] = translation
+
+    def add_term(self, text, language, translation):
+        """Add a term to the glossary and save it to the glossary file"""
+        with self._lock:
+            self._add_term(text, language, translation)
+            if self.glossary_path:
+                glossary = self.load_glossary()
+                glossary.setdefault(language, {})[text.strip()] = translation.strip()
+                temp_path = f"{self.glossary_path}.tmp"
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(glossary, f, ensure_ascii=False, indent=2, sort_keys=True)
+                    f.write("\n")
+                os.replace(temp_path, self.glossary_path)
+
+    def _load_memory(self):
+        if not self.memory_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.memory_path)), exist_ok=True)
+        # Under the lock no other process appends while the file is read and
+        # possibly rewritten, so no line is lost to the rewrite
+        with self._file_lock():
+            if not os.path.exists(self.memory_path):
+                return
+            now = time.time()
+            lines = 0
+            with open(self.memory_path, encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        entry = json.loads(line)
+                        if not self._expired(entry["learned_at"], now):
+                            self._learn(
+                                entry["text"], entry["language"], entry["model"], entry["translation"],
+                                entry["learned_at"]
+                            )
+                    except (ValueError, KeyError, TypeError):
+                        # A partly written last line, or one from before models were recorded
+                        continue
+            # The file is append-only; rewrite it once it is mostly replaced, expired or evicted entries
+            entries = sum(len(memory) for memory in self._memory.values())
+            if lines > 2 * entries + 100:
+                temp_path = f"{self.memory_path}.tmp"
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    for (language, model), memory in self._memory.items():
+                        for text, (translation, learned_at) in memory.items():
+                            f.write(self._memory_line(text, language, model, translation, learned_at))
+                os.replace(temp_path, self.memory_path)
+
+    def _learn(self, text, language, model, translation, learned_at):
+        memory = self._memory.setdefault((language, model), OrderedDict())
+        normalized = self._memory_normalized.setdefault((language, model), {})
+        text = text.strip()
+        memory.pop(text, None)
+        entry = memory[text] = (translation, learned_at)
+        normalized[normalize_term(text)] = entry
+        while len(memory) > self.max_entries:
+            old_text, old_entry = memory.popitem(last=False)
+            # A newer text with the same normalized form keeps its entry
+            old_key = normalize_term(old_text)
+            if normalized.get(old_key) is old_entry:
+                del normalized[old_key]
+
+    def learn(self, text, language, translation, model):
+        """Remember an accepted API translation by model"""
+        now = time.time()
+        with self._lock:
+            remembered = self._memory.get((language, model), {}).get(text.strip())
+            if remembered is not None and remembered[0] == translation and not self._expired(remembered[1], now):
+                return
+            self._learn(text, language, model, translation, now)
+            if self.memory_path:
+                with self._file_lock(), open(self.memory_path, "a", encoding="utf-8") as f:
+                    f.write(self._memory_line(text.strip(), language, model, translation, now))
+
+    def _remembered(self, entries, key, now):
+        """The translation of an unexpired learned entry, or None"""
+        entry = entries.get(key)
+        if entry is None or self._expired(entry[1], now):
+            return None
+        return entry[0]
+
+    def get(self, text, language, model=None):
+        """Return the glossary translation, or the one learned from model, or None"""
+        stripped = text.strip()
+        now = time.time()
+        with self._lock:
+            translation = self._glossary.get(language, {}).get(stripped)
+            if translation is not None:
+                self.glossary_hits += 1
+                return translation
+            translation = self._remembered(self._memory.get((language, model), {}), stripped, now)
+            if translation is not None:
+                self.exact_hits += 1
+                return translation
+
+            normalized = normalize_term(stripped)
+            translation = self._glossary_normalized.get(language, {}).get(normalized)
+            if translation is not None:
+                self.glossary_hits += 1
+                return translation
+            translation = self._remembered(self._memory_normalized.get((language, model), {}), normalized, now)
+            if translation is not None:
+                self.normalized_hits += 1
+                return translation
+
+            if not self.fuzzy or len(normalized) < FUZZY_MIN_CHARS:
+                self.misses += 1
+                return None
+            candidates = [
+                (key, translation) for key, (translation, learned_at) in
+                self._memory_normalized.get((language, model), {}).items() if not self._expired(learned_at, now)
+            ]
+
+        # Similar sentences of about the same length, scanned outside the lock;
+        # the closest one that differs only in ignorable words is used
+        translations = dict(candidates)
+        matches = difflib.get_close_matches(
+            normalized, [key for key in translations if abs(len(key) - len(normalized)) <= len(normalized) // 10],
+            n=3, cutoff=FUZZY_CUTOFF
+        )
+        match = next((key for key in matches if only_trivial_differences(normalized, key)), None)
+        with self._lock:
+            if match is None:
+                self.misses += 1
+                return None
+            self.fuzzy_hits += 1
+            return translations[match]
+
+    def stats(self):
+        """Return hit/miss counters and sizes"""
+        with self._lock:
+            hits = self.glossary_hits + self.exact_hits + self.normalized_hits + self.fuzzy_hits
+            lookups = hits + self.misses
+            return {
+                "hits": hits,
+                "glossary_hits": self.glossary_hits,
+                "exact_hits": self.exact_hits,
+                "normalized_hits": self.normalized_hits,
+                "fuzzy_hits": self.fuzzy_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "glossary_entries": sum(len(terms) for terms in self._glossary.values()),
+                "memory_entries": sum(len(memory) for memory in self._memory.values()),
+            }